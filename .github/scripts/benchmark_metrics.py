@@ -0,0 +1,575 @@
+#!/usr/bin/env python3
+"""
+Benchmark the metrics pipeline against synthetic large artifacts.
+
+Generates realistic Clover, PHPStan, PHPCS, security, PHPMD and jscpd
+reports plus a multi-year history file at a configurable scale, then
+measures wall time and peak traced memory of each pipeline stage and
+optionally compares the results with a stored baseline. Cold-start
+import time of the CLI is measured with ``python -X importtime``, and the
+bounded totals scans used by --summary-only are checked against the full
+parsers.
+
+Full scale (--scale 1) is 10^5 Clover files with 10^7 lines, 10^6 PHPCS
+messages, 10^5 PHPMD violations and 10^4 jscpd sources.
+"""
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import process_metrics as pm
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Artifact sizes at --scale 1
+FULL_SCALE = {
+    'clover_files': 10 ** 5,
+    'clover_lines': 10 ** 7,
+    'phpstan_errors': 10 ** 5,
+    'phpcs_messages': 10 ** 6,
+    'security_messages': 10 ** 4,
+    'phpmd_violations': 10 ** 5,
+    'jscpd_sources': 10 ** 4,
+    'junit_tests': 10 ** 5,
+}
+
+# Seed for the synthetic data so every run benchmarks the same inputs
+SEED = 20240101
+
+# Differences below these are treated as noise when comparing with a baseline
+MIN_DELTA = {'seconds': 0.005, 'peak_bytes': 1024 * 1024}
+
+SNIFFS = (
+    'CakePHP.WhiteSpace.LineLengthCheck.TooLong',
+    'CakePHP.Commenting.FunctionComment.Missing',
+    'CakePHP.WhiteSpace.ArgumentSpacing.NoSpaceAfterComma',
+    'CakePHP.NamingConventions.ValidFunctionName.NotCamelCaps',
+    'Generic.Files.LineEndings.InvalidEOLChar',
+)
+
+PHPMD_RULES = (
+    ('CyclomaticComplexity', 'Code Size Rules'),
+    ('NPathComplexity', 'Code Size Rules'),
+    ('ExcessiveMethodLength', 'Code Size Rules'),
+    ('UnusedPrivateField', 'Unused Code Rules'),
+    ('UnusedLocalVariable', 'Unused Code Rules'),
+    ('ShortVariable', 'Naming Rules'),
+    ('ElseExpression', 'Clean Code Rules'),
+)
+
+
+def scaled(name: str, scale: float) -> int:
+    return max(1, int(FULL_SCALE[name] * scale))
+
+
+def source_path(index: int) -> str:
+    """Return a plausible container path for synthetic source file ``index``."""
+    return f"/var/www/html/src/Module{index // 100}/Sub{index // 10 % 10}/Class{index}.php"
+
+
+def generate_clover(filepath: str, files: int, lines: int, rng: random.Random) -> None:
+    """Write a Clover report with ``files`` files and ``lines`` <line> entries in total."""
+    lines_per_file = max(1, lines // files)
+    total_statements = 0
+    total_covered = 0
+    total_methods = 0
+    total_covered_methods = 0
+
+    with open(filepath, 'w') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<coverage generated="1704067200">\n')
+        f.write('  <project timestamp="1704067200">\n')
+        for package in range(0, files, 100):
+            f.write(f'    <package name="App\\Module{package // 100}">\n')
+            for index in range(package, min(package + 100, files)):
+                chunk = []
+                statements = covered = methods = covered_methods = 0
+                for num in range(1, lines_per_file + 1):
+                    count = rng.choice((0, 1, 1, 1, 3))
+                    if num % 10 == 1:
+                        complexity = rng.randint(1, 15)
+                        methods += 1
+                        covered_methods += count > 0
+                        chunk.append(
+                            f'        <line num="{num}" type="method" name="method{num}" visibility="public" '
+                            f'complexity="{complexity}" crap="{complexity}" count="{count}"/>\n'
+                        )
+                    else:
+                        statements += 1
+                        covered += count > 0
+                        chunk.append(f'        <line num="{num}" type="stmt" count="{count}"/>\n')
+
+                f.write(f'      <file name="{source_path(index)}">\n')
+                f.write(f'        <class name="Class{index}" namespace="App\\Module{index // 100}">\n')
+                f.write(
+                    f'          <metrics complexity="{methods * 3}" methods="{methods}" '
+                    f'coveredmethods="{covered_methods}" conditionals="0" coveredconditionals="0" '
+                    f'statements="{statements}" coveredstatements="{covered}" '
+                    f'elements="{statements + methods}" coveredelements="{covered + covered_methods}"/>\n'
+                )
+                f.write('        </class>\n')
+                f.writelines(chunk)
+                f.write(
+                    f'        <metrics loc="{lines_per_file}" ncloc="{lines_per_file}" classes="1" '
+                    f'methods="{methods}" coveredmethods="{covered_methods}" conditionals="0" '
+                    f'coveredconditionals="0" statements="{statements}" coveredstatements="{covered}" '
+                    f'elements="{statements + methods}" coveredelements="{covered + covered_methods}"/>\n'
+                )
+                f.write('      </file>\n')
+
+                total_statements += statements
+                total_covered += covered
+                total_methods += methods
+                total_covered_methods += covered_methods
+            f.write('    </package>\n')
+
+        # PHPUnit writes the project totals after all packages
+        f.write(
+            f'    <metrics files="{files}" loc="{files * lines_per_file}" ncloc="{files * lines_per_file}" '
+            f'classes="{files}" methods="{total_methods}" coveredmethods="{total_covered_methods}" '
+            f'conditionals="0" coveredconditionals="0" statements="{total_statements}" '
+            f'coveredstatements="{total_covered}" elements="{total_statements + total_methods}" '
+            f'coveredelements="{total_covered + total_covered_methods}"/>\n'
+        )
+        f.write('  </project>\n</coverage>\n')
+
+
+def generate_phpcs(filepath: str, messages: int, rng: random.Random, sniffs: tuple = SNIFFS) -> None:
+    """Write a PHPCS JSON report with ``messages`` messages spread over files."""
+    per_file = 20
+    file_count = max(1, messages // per_file)
+    errors = warnings = 0
+
+    with open(filepath, 'w') as f:
+        f.write('{"files":{')
+        for index in range(file_count):
+            file_messages = []
+            file_errors = file_warnings = 0
+            for line in range(per_file):
+                is_error = rng.random() < 0.4
+                file_errors += is_error
+                file_warnings += not is_error
+                file_messages.append(json.dumps({
+                    'message': 'Synthetic message for benchmarking the metrics pipeline',
+                    'source': rng.choice(sniffs),
+                    'severity': 5,
+                    'fixable': rng.random() < 0.5,
+                    'type': 'ERROR' if is_error else 'WARNING',
+                    'line': line * 7 + 1,
+                    'column': 1,
+                }))
+            errors += file_errors
+            warnings += file_warnings
+            if index:
+                f.write(',')
+            f.write(f'{json.dumps(source_path(index))}:{{"errors":{file_errors},"warnings":{file_warnings},"messages":[')
+            f.write(','.join(file_messages))
+            f.write(']}')
+        f.write(f'}},"totals":{{"errors":{errors},"warnings":{warnings},"fixable":0}}}}')
+
+
+def generate_phpstan(filepath: str, errors: int, rng: random.Random) -> None:
+    """Write a PHPStan JSON report with ``errors`` errors spread over files."""
+    per_file = 5
+    file_count = max(1, errors // per_file)
+
+    with open(filepath, 'w') as f:
+        f.write(f'{{"totals":{{"errors":{file_count * per_file},"file_errors":{file_count}}},"files":{{')
+        for index in range(file_count):
+            messages = ','.join(
+                json.dumps({'message': 'Synthetic PHPStan error', 'line': rng.randint(1, 500), 'ignorable': True})
+                for _ in range(per_file)
+            )
+            if index:
+                f.write(',')
+            f.write(f'{json.dumps(source_path(index))}:{{"errors":{per_file},"messages":[{messages}]}}')
+        f.write('},"errors":[]}')
+
+
+def generate_phpmd(filepath: str, violations: int, rng: random.Random) -> None:
+    """Write a PHPMD JSON report with ``violations`` violations spread over files."""
+    per_file = 4
+    file_count = max(1, violations // per_file)
+
+    with open(filepath, 'w') as f:
+        f.write('{"version":"2.15.0","package":"phpmd","timestamp":"2024-01-01T12:00:00+00:00","files":[')
+        for index in range(file_count):
+            file_violations = []
+            for _ in range(per_file):
+                rule, ruleset = rng.choice(PHPMD_RULES)
+                begin = rng.randint(1, 500)
+                file_violations.append(json.dumps({
+                    'beginLine': begin,
+                    'endLine': begin + rng.randint(1, 80),
+                    'rule': rule,
+                    'ruleSet': ruleset,
+                    'priority': 3,
+                    'description': f'Synthetic {rule} violation',
+                }))
+            if index:
+                f.write(',')
+            f.write(f'{{"file":{json.dumps(source_path(index))},"violations":[{",".join(file_violations)}]}}')
+        f.write(']}')
+
+
+def generate_jscpd(filepath: str, sources: int, rng: random.Random) -> None:
+    """Write a jscpd report with ``sources`` per-file sources and clone pairs between them."""
+    formats = {}
+    duplicates = []
+    totals = {'sources': 0, 'clones': 0, 'duplicatedLines': 0, 'lines': 0}
+
+    for fmt, share in (('php', 0.8), ('javascript', 0.15), ('css', 0.05)):
+        fmt_sources = {}
+        for index in range(max(1, int(sources * share))):
+            name = source_path(index)[len('/var/www/html/'):].replace('.php', f'.{fmt}')
+            lines = rng.randint(50, 800)
+            clones = rng.randint(0, 4)
+            duplicated = min(lines, clones * rng.randint(5, 30))
+            fmt_sources[name] = {
+                'lines': lines, 'tokens': lines * 6, 'sources': 1, 'clones': clones,
+                'duplicatedLines': duplicated, 'duplicatedTokens': duplicated * 6,
+                'percentage': round(duplicated / lines * 100, 2), 'percentageTokens': 0,
+            }
+            totals['sources'] += 1
+            totals['clones'] += clones
+            totals['duplicatedLines'] += duplicated
+            totals['lines'] += lines
+
+        names = list(fmt_sources)
+        for _ in range(sum(s['clones'] for s in fmt_sources.values()) // 2):
+            first, second = rng.sample(names, 2) if len(names) > 1 else (names[0], names[0])
+            start = rng.randint(1, 40)
+            length = rng.randint(5, 30)
+            duplicates.append({
+                'format': fmt, 'lines': length, 'tokens': length * 6,
+                'firstFile': {'name': first, 'start': start, 'end': start + length},
+                'secondFile': {'name': second, 'start': start + 3, 'end': start + 3 + length},
+            })
+        formats[fmt] = {'sources': fmt_sources}
+
+    totals['percentage'] = round(totals['duplicatedLines'] / totals['lines'] * 100, 2)
+    with open(filepath, 'w') as f:
+        json.dump({'statistics': {'formats': formats, 'total': totals}, 'duplicates': duplicates}, f)
+
+
+def generate_junit(filepath: str, tests: int, rng: random.Random) -> None:
+    """Write a PHPUnit JUnit report with ``tests`` test cases, ten per test class."""
+    suites = []
+    total_time = 0.0
+    failures = 0
+    for start in range(0, tests, 10):
+        cls = f"App\\Test\\Module{start // 1000}\\Class{start // 10}Test"
+        cases = []
+        suite_time = 0.0
+        suite_failures = 0
+        for index in range(start, min(start + 10, tests)):
+            seconds = round(rng.lognormvariate(-4, 1.2), 6)
+            suite_time += seconds
+            failed = rng.random() < 0.002
+            suite_failures += failed
+            body = '><failure type="PHPUnit\\Framework\\ExpectationFailedException">Failed</failure></testcase>' if failed else '/>'
+            cases.append(f'      <testcase name="testCase{index}" class="{cls}" classname="{cls.replace(chr(92), ".")}" '
+                         f'file="/var/www/html/tests/Class{start // 10}Test.php" line="{index % 10 * 12 + 20}" '
+                         f'assertions="2" time="{seconds:.6f}"{body}')
+        total_time += suite_time
+        failures += suite_failures
+        suites.append(f'    <testsuite name="{cls}" file="/var/www/html/tests/Class{start // 10}Test.php" '
+                      f'tests="{len(cases)}" assertions="{len(cases) * 2}" errors="0" failures="{suite_failures}" skipped="0" '
+                      f'time="{suite_time:.6f}">\n' + '\n'.join(cases) + '\n    </testsuite>')
+
+    with open(filepath, 'w') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<testsuites>\n')
+        f.write(f'  <testsuite name="Willow" tests="{tests}" assertions="{tests * 2}" errors="0" '
+                f'failures="{failures}" skipped="0" time="{total_time:.6f}">\n')
+        f.write('\n'.join(suites))
+        f.write('\n  </testsuite>\n</testsuites>\n')
+
+
+def generate_history(filepath: str, years: float, runs_per_day: int, rng: random.Random) -> int:
+    """Write a history/all.json covering ``years`` of runs, returning the entry count."""
+    now = datetime.now()
+    start = now - timedelta(days=int(years * 365))
+    step = timedelta(hours=24 / runs_per_day)
+    entries = []
+    timestamp = start
+
+    while timestamp < now:
+        entries.append({
+            'timestamp': timestamp.isoformat(),
+            'date': timestamp.strftime('%Y-%m-%d'),
+            'commit': f"{rng.getrandbits(32):08x}",
+            'coverage': {'line_coverage': round(rng.uniform(55, 85), 2), 'lines_covered': 2000, 'lines_total': 3000, 'rating': 'B'},
+            'phpstan': {'errors': rng.randint(0, 40), 'files_with_errors': 3, 'rating': 'B'},
+            'phpcs': {'violations': rng.randint(0, 150), 'errors': 5, 'warnings': 10, 'rating': 'C'},
+            'security': {'issues': rng.randint(0, 5), 'high': 0, 'medium': 1, 'rating': 'B'},
+            'phpmd': {'violations': rng.randint(0, 80), 'files_affected': 5, 'by_ruleset': {'Code Size Rules': 8}, 'rating': 'C'},
+            'jscpd': {'percentage': round(rng.uniform(0.5, 6), 2), 'clones': 5, 'duplicated_lines': 100, 'rating': 'B'},
+            'junit': {'tests': 1200, 'total_seconds': round(rng.uniform(60, 90), 2), 'failures': 0, 'rating': 'B'},
+        })
+        timestamp += step
+
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    with open(filepath, 'w') as f:
+        json.dump(entries, f, indent=2)
+    return len(entries)
+
+
+def generate_artifacts(work_dir: str, scale: float, history_years: float) -> dict:
+    """Generate every synthetic artifact under ``work_dir`` and return their paths."""
+    rng = random.Random(SEED)
+    paths = {
+        'coverage': os.path.join(work_dir, 'coverage.xml'),
+        'phpstan': os.path.join(work_dir, 'phpstan.json'),
+        'phpcs': os.path.join(work_dir, 'phpcs.json'),
+        'security': os.path.join(work_dir, 'security-phpcs.json'),
+        'phpmd': os.path.join(work_dir, 'phpmd.json'),
+        'jscpd': os.path.join(work_dir, 'jscpd.json'),
+        'junit': os.path.join(work_dir, 'junit.xml'),
+        'history': os.path.join(work_dir, 'history', 'all.json'),
+    }
+
+    generate_clover(paths['coverage'], scaled('clover_files', scale), scaled('clover_lines', scale), rng)
+    generate_phpstan(paths['phpstan'], scaled('phpstan_errors', scale), rng)
+    generate_phpcs(paths['phpcs'], scaled('phpcs_messages', scale), rng)
+    generate_phpcs(paths['security'], scaled('security_messages', scale), rng,
+                   sniffs=('Security.BadFunctions.EasyXSS.EasyXSSwarn', 'Security.Drupal7.DynQueries.D7DynQueriesDirectVar'))
+    generate_phpmd(paths['phpmd'], scaled('phpmd_violations', scale), rng)
+    generate_jscpd(paths['jscpd'], scaled('jscpd_sources', scale), rng)
+    generate_junit(paths['junit'], scaled('junit_tests', scale), rng)
+    generate_history(paths['history'], history_years, 4, rng)
+
+    return paths
+
+
+def measure(func, repeat: int) -> dict:
+    """Return the best wall time over ``repeat`` runs and the peak traced memory of one run."""
+    times = []
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            gc.collect()
+            started = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - started)
+
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return {'seconds': round(min(times), 4), 'peak_bytes': peak}
+
+
+def build_benchmarks(paths: dict, work_dir: str, template: str) -> dict:
+    """Return benchmark name -> zero-argument callable for each pipeline stage."""
+    benchmarks = {}
+    for tool, spec in pm.PARSERS.items():
+        benchmarks[spec.function] = (lambda parser=spec.load(), path=paths[tool]: parser(path))
+    for tool, spec in pm.PARSERS.items():
+        if spec.summary is not None:
+            benchmarks[spec.summary] = (lambda spec=spec, path=paths[tool]: spec.scan_totals(path))
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        metrics = pm.parse_all({tool: paths[tool] for tool in pm.PARSERS})
+    history = pm.load_historical_data(paths['history'])
+    history_store = pm.JsonHistoryStore(paths['history'])
+    full_history = history_store.entries()
+    output_dir = os.path.join(work_dir, 'site')
+
+    benchmarks['load_historical_data'] = lambda: pm.load_historical_data(paths['history'])
+    benchmarks['export_history_json'] = lambda: history_store.export_json(
+        os.path.join(output_dir, 'history', 'all.json'))
+    benchmarks['detect_anomalies'] = lambda: pm.detect_anomalies(full_history, pm.CHART_SERIES)
+    benchmarks['generate_badges'] = lambda: pm.generate_badges(output_dir, metrics)
+
+    # Diff the run against a copy where every tenth file gained a PHPStan error
+    file_index = pm.build_file_index(metrics)
+    head = pm.build_snapshot('b' * 40, '2', pm.metric_totals(metrics), file_index, pm.SNAPSHOT_FIELDS)
+    base = pm.build_snapshot('a' * 40, '1', pm.metric_totals(metrics), file_index, pm.SNAPSHOT_FIELDS)
+    errors = pm.SNAPSHOT_FIELDS.index('phpstan_errors')
+    for position, path in enumerate(base['files']):
+        if position % 10 == 0:
+            base['files'][path] = list(base['files'][path])
+            base['files'][path][errors] += 1
+    benchmarks['diff_snapshots'] = lambda: pm.diff_snapshots(base, head)
+    benchmarks['render_api_treemap'] = lambda: pm.render_api_treemap(file_index, 'a' * 40)
+
+    if template and os.path.exists(template):
+        benchmarks['generate_dashboard_html'] = lambda: pm.generate_dashboard_html(
+            template, os.path.join(output_dir, 'index.html'), metrics, history, 'a' * 40)
+
+    return benchmarks
+
+
+def check_summaries(paths: dict) -> list:
+    """Compare each totals scan with the full parser's result, returning the mismatches.
+
+    A scan that does not find the totals is not a mismatch (the CLI falls
+    back to the full parser), but is reported.
+    """
+    mismatches = []
+    for tool, spec in pm.PARSERS.items():
+        if spec.summary is None:
+            continue
+        scanned = spec.scan_totals(paths[tool])
+        if scanned is None:
+            print(f"Note: {spec.summary} found no totals in {paths[tool]}; --summary-only will use the full parser")
+            continue
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            full = spec(paths[tool])
+        for key, value in scanned.items():
+            if full.get(key) != value:
+                mismatches.append(f"{tool}.{key}: scan {value!r} != full parse {full.get(key)!r}")
+    return mismatches
+
+
+def measure_imports(command: list, repeat: int) -> tuple:
+    """Run ``command`` under ``python -X importtime`` and return the best total import time and the modules imported."""
+    best = None
+    modules = set()
+    for _ in range(repeat):
+        completed = subprocess.run([sys.executable, '-X', 'importtime', *command], cwd=SCRIPTS_DIR,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+        total = 0
+        modules = set()
+        for line in completed.stderr.splitlines():
+            # "import time: self [us] | cumulative | <indent>module"; top-level imports have one space of indent
+            if not line.startswith('import time:') or line.endswith('imported package'):
+                continue
+            fields = line.split('|')
+            if len(fields) != 3 or not fields[1].strip().isdigit():
+                continue
+            name = fields[2]
+            modules.add(name.strip())
+            if not name.startswith('  '):
+                total += int(fields[1])
+        best = total if best is None else min(best, total)
+    return {'seconds': round(best / 1e6, 4), 'peak_bytes': 0}, modules
+
+
+def build_import_benchmarks(paths: dict, work_dir: str, repeat: int) -> dict:
+    """Measure cold-start imports of the module and of a CLI run that only processes PHPStan."""
+    results = {}
+    results['import_process_metrics'], _ = measure_imports(['-c', 'import process_metrics'], repeat)
+    results['cold_start_phpstan_only'], modules = measure_imports([
+        'process_metrics.py', '--phpstan', paths['phpstan'], '--output-dir', os.path.join(work_dir, 'cold-start'),
+    ], repeat)
+
+    # A PHPStan-only run must not pay for other parsers or the server
+    unexpected = sorted(modules & {'coverage_parser', 'junit_parser', 'defusedxml.ElementTree',
+                                   'metrics_server', 'concurrent.futures'})
+    if unexpected:
+        print(f"Warning: PHPStan-only run imported {', '.join(unexpected)}")
+    return results
+
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float) -> list:
+    """Return descriptions of benchmarks that regressed beyond ``tolerance`` versus ``baseline``."""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for key, unit in (('seconds', 's'), ('peak_bytes', ' bytes')):
+            if not previous.get(key) or result[key] - previous[key] < MIN_DELTA[key]:
+                continue
+            if result[key] > previous[key] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: {key} {previous[key]}{unit} -> {result[key]}{unit} "
+                    f"(+{(result[key] / previous[key] - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the metrics pipeline on synthetic artifacts')
+    parser.add_argument('--scale', type=float, default=0.01,
+                        help='Fraction of full scale (1.0 = 10^5 files / 10^7 Clover lines)')
+    parser.add_argument('--history-years', type=float, default=3, help='Years of history to generate')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per benchmark (best is kept)')
+    parser.add_argument('--only', action='append', help='Run only the named benchmark (repeatable)')
+    parser.add_argument('--template', default=os.path.join(os.path.dirname(__file__), '..', 'templates', 'dashboard.html'),
+                        help='Dashboard template used by generate_dashboard_html')
+    parser.add_argument('--work-dir', help='Directory for generated artifacts (default: temporary)')
+    parser.add_argument('--keep', action='store_true', help='Keep generated artifacts')
+    parser.add_argument('--output', help='Write results as JSON to this path')
+    parser.add_argument('--baseline', help='Compare against a previously saved results file')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown/memory growth versus baseline (0.25 = 25%%)')
+
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='metrics-bench-')
+    os.makedirs(work_dir, exist_ok=True)
+
+    try:
+        started = time.perf_counter()
+        paths = generate_artifacts(work_dir, args.scale, args.history_years)
+        sizes = {name: os.path.getsize(path) for name, path in paths.items()}
+        print(f"Generated artifacts in {time.perf_counter() - started:.1f}s at scale {args.scale}:")
+        for name, size in sizes.items():
+            print(f"  - {name}: {size / 1024 / 1024:.1f} MB")
+
+        mismatches = check_summaries(paths)
+        if mismatches:
+            print("\nSummary scans disagree with the full parsers:")
+            for mismatch in mismatches:
+                print(f"  - {mismatch}")
+            sys.exit(1)
+
+        benchmarks = build_benchmarks(paths, work_dir, args.template)
+        results = {}
+        print(f"\n{'benchmark':<28}{'seconds':>10}{'peak MB':>10}")
+        for name, func in benchmarks.items():
+            if args.only and name not in args.only:
+                continue
+            results[name] = measure(func, args.repeat)
+            print(f"{name:<28}{results[name]['seconds']:>10.4f}{results[name]['peak_bytes'] / 1024 / 1024:>10.1f}")
+
+        for name, result in build_import_benchmarks(paths, work_dir, args.repeat).items():
+            if args.only and name not in args.only:
+                continue
+            results[name] = result
+            print(f"{name:<28}{result['seconds']:>10.4f}{'-':>10}")
+
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump({
+                    'scale': args.scale,
+                    'history_years': args.history_years,
+                    'python': sys.version.split()[0],
+                    'results': results,
+                }, f, indent=2)
+            print(f"\nResults written to {args.output}")
+
+        if args.baseline:
+            with open(args.baseline, 'r') as f:
+                baseline = json.load(f)
+            if baseline.get('scale') != args.scale:
+                print(f"Warning: Baseline was recorded at scale {baseline.get('scale')}, not {args.scale}")
+            regressions = compare_to_baseline(results, baseline.get('results', {}), args.tolerance)
+            if regressions:
+                print("\nRegressions versus baseline:")
+                for regression in regressions:
+                    print(f"  - {regression}")
+                sys.exit(1)
+            print("\nNo regressions versus baseline")
+    finally:
+        if not args.keep and not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Index of jscpd clone pairs by file, for finding duplication hotspots.
+
+Each clone in the report's ``duplicates`` array links two fragments. The
+index folds them into per-file and per-pair totals in a single pass (the
+pair key is order-independent, so A<->B and B<->A are one pair), and only
+the top entries are ranked and kept for api/duplication.json.
+"""
+
+import heapq
+
+# Hotspots kept per ranking
+TOP_HOTSPOTS = 25
+
+
+class CloneIndex:
+    """Duplicated lines and clone counts per file and per file pair."""
+
+    def __init__(self):
+        # path -> [duplicated lines, clones, partner paths]
+        self.files = {}
+        # (path, path) -> [duplicated lines, clones, format]
+        self.pairs = {}
+
+    def add(self, first: str, second: str, lines: int, fmt: str) -> None:
+        for path, partner in ((first, second), (second, first)):
+            entry = self.files.get(path)
+            if entry is None:
+                entry = self.files[path] = [0, 0, set()]
+            entry[0] += lines
+            entry[1] += 1
+            if partner != path:
+                entry[2].add(partner)
+            if first == second:
+                # A clone within one file counts once for that file
+                break
+
+        key = (first, second) if first <= second else (second, first)
+        pair = self.pairs.get(key)
+        if pair is None:
+            self.pairs[key] = [lines, 1, fmt]
+        else:
+            pair[0] += lines
+            pair[1] += 1
+
+    def top_files(self, limit: int = TOP_HOTSPOTS, source_lines: dict = None) -> list:
+        """Files with the most duplicated lines, largest first."""
+        source_lines = source_lines or {}
+        ranked = heapq.nlargest(limit, self.files.items(), key=lambda item: (item[1][0], item[1][1]))
+        hotspots = []
+        for path, (lines, clones, partners) in ranked:
+            hotspot = {'file': path, 'duplicated_lines': lines, 'clones': clones, 'partners': len(partners)}
+            total = source_lines.get(path)
+            if total:
+                hotspot['percentage'] = round(min(lines, total) / total * 100, 2)
+            hotspots.append(hotspot)
+        return hotspots
+
+    def top_pairs(self, limit: int = TOP_HOTSPOTS) -> list:
+        """File pairs sharing the most duplicated lines, largest first."""
+        ranked = heapq.nlargest(limit, self.pairs.items(), key=lambda item: (item[1][0], item[1][1]))
+        return [
+            {'files': list(key), 'duplicated_lines': lines, 'clones': clones, 'format': fmt}
+            for key, (lines, clones, fmt) in ranked
+        ]
+
+    def summary(self, limit: int = TOP_HOTSPOTS, source_lines: dict = None) -> dict:
+        return {
+            'files_with_clones': len(self.files),
+            'pairs': len(self.pairs),
+            'top_files': self.top_files(limit, source_lines),
+            'top_pairs': self.top_pairs(limit),
+        }
@@ -0,0 +1,162 @@
+"""
+Parser for PHPUnit Clover coverage reports.
+
+Kept in its own module so the XML parser is only imported when a coverage
+report is actually processed.
+"""
+
+import os
+
+import defusedxml.ElementTree as ET
+
+from method_stats import MethodTable
+from metrics_common import calculate_rating, generate_badge_url, normalize_path
+from patch_coverage import LineBitmap
+
+# Number of highest-CRAP methods reported from the coverage data
+WORST_METHODS = 10
+
+
+def _coverage_counts(metrics_elem) -> dict:
+    """Extract statement/method coverage counts from a Clover <metrics> element."""
+    statements = int(metrics_elem.get('statements', 0))
+    covered_statements = int(metrics_elem.get('coveredstatements', 0))
+    methods = int(metrics_elem.get('methods', 0))
+    covered_methods = int(metrics_elem.get('coveredmethods', 0))
+
+    return {
+        'statements': statements,
+        'covered_statements': covered_statements,
+        'methods': methods,
+        'covered_methods': covered_methods,
+        'line_coverage': round((covered_statements / statements) * 100, 2) if statements > 0 else None,
+        'method_coverage': round((covered_methods / methods) * 100, 2) if methods > 0 else None,
+    }
+
+
+def parse_coverage_xml(filepath: str) -> dict:
+    """Parse PHPUnit Clover coverage XML.
+
+    The report is streamed with iterparse and every element is detached from
+    its parent and cleared once it has been consumed, so memory stays flat
+    regardless of how many <line> entries the file holds. Per-file and
+    per-class statement/method coverage is collected in the same pass, as
+    are per-method complexity and statement coverage, which feed the
+    complexity distribution and CRAP scores, and per-file bitmaps of
+    executable and covered lines for patch coverage.
+    """
+    result = {
+        'line_coverage': None,
+        'branch_coverage': None,
+        'lines_covered': 0,
+        'lines_total': 0,
+        'complexity': None,
+        'worst_methods': [],
+        'files': {},
+        'classes': {},
+        'line_bitmaps': {},
+        'rating': None,
+        'badge_url': None,
+    }
+
+    if not os.path.exists(filepath):
+        print(f"Warning: Coverage file not found: {filepath}")
+        return result
+
+    try:
+        project_metrics = None
+        current_file = None
+        current_class = None
+        stack = []
+        methods = MethodTable()
+        file_id = None
+        method_open = False
+        bitmap = None
+
+        for event, elem in ET.iterparse(filepath, events=('start', 'end')):
+            if event == 'start':
+                stack.append(elem)
+                if elem.tag == 'file':
+                    current_file = elem.get('name', '')
+                    file_id = methods.add_file(current_file)
+                    method_open = False
+                    bitmap = LineBitmap()
+                elif elem.tag == 'class':
+                    namespace = elem.get('namespace', '')
+                    name = elem.get('name', '')
+                    current_class = f"{namespace}\\{name}" if namespace and namespace != 'global' else name
+                continue
+
+            stack.pop()
+            tag = elem.tag
+
+            if tag == 'line':
+                # Statements following a method line belong to that method until the next one
+                line_type = elem.get('type')
+                if line_type == 'stmt':
+                    covered = elem.get('count', '0') != '0'
+                    if method_open:
+                        methods.add_statement(covered)
+                    if bitmap is not None:
+                        bitmap.add(int(elem.get('num', 0)), covered)
+                elif line_type == 'method' and file_id is not None:
+                    methods.add_method(file_id, elem.get('name', ''), int(elem.get('complexity', 0)),
+                                       elem.get('count', '0') != '0')
+                    method_open = True
+            elif tag == 'metrics':
+                parent = stack[-1].tag if stack else None
+                if parent == 'project':
+                    project_metrics = _coverage_counts(elem)
+                elif parent == 'file' and current_file is not None:
+                    result['files'][current_file] = _coverage_counts(elem)
+                elif parent == 'class' and current_class:
+                    class_counts = _coverage_counts(elem)
+                    class_counts['file'] = current_file
+                    class_counts['complexity'] = int(elem.get('complexity', 0))
+                    result['classes'][current_class] = class_counts
+            elif tag == 'file':
+                if bitmap is not None and bitmap.executable:
+                    result['line_bitmaps'][current_file] = bitmap.encode()
+                current_file = None
+                bitmap = None
+            elif tag == 'class':
+                current_class = None
+
+            # Detach the finished element so neither it nor its subtree is retained
+            if stack:
+                stack[-1].remove(elem)
+            elem.clear()
+
+        # Fall back to summing file metrics when the project totals are missing
+        if project_metrics is None and result['files']:
+            project_metrics = {
+                'statements': sum(f['statements'] for f in result['files'].values()),
+                'covered_statements': sum(f['covered_statements'] for f in result['files'].values()),
+            }
+
+        if project_metrics is not None and project_metrics['statements'] > 0:
+            statements = project_metrics['statements']
+            covered_statements = project_metrics['covered_statements']
+            result['line_coverage'] = round((covered_statements / statements) * 100, 2)
+            result['lines_covered'] = covered_statements
+            result['lines_total'] = statements
+
+        complexity, worst = methods.analyze(WORST_METHODS)
+        if complexity is not None:
+            complexity['rating'] = calculate_rating('complexity', complexity['mean'])
+            result['complexity'] = complexity
+            result['worst_methods'] = [dict(method, file=normalize_path(method['file'])) for method in worst]
+
+        if result['line_coverage'] is not None:
+            result['rating'] = calculate_rating('coverage', result['line_coverage'])
+            result['badge_url'] = generate_badge_url(
+                'coverage',
+                f"{result['line_coverage']}%",
+                result['rating']
+            )
+    except ET.ParseError as e:
+        print(f"Error parsing coverage XML: {e}")
+    except Exception as e:
+        print(f"Unexpected error parsing coverage: {e}")
+
+    return result
@@ -0,0 +1,181 @@
+"""
+Directory rollup of the per-file index, for treemaps.
+
+Every file's counts are added to each directory on its path as the file is
+inserted into a prefix trie, so a single pass over the files leaves every
+directory (``src``, ``src/Controller``, ``plugins/AdminTheme``...) holding
+the totals of its whole subtree.
+
+The published tree is pruned to a maximum depth and node budget. Directories
+are expanded largest first, so the budget goes to the biggest subsystems.
+When a directory has more subdirectories than the remaining budget allows,
+its largest ones are shown and the rest are merged into one ``(other)``
+node. Files that sit directly in an expanded directory are gathered in a
+``(files)`` leaf, so the children of every directory sum to its totals and
+each treemap rectangle is fully subdivided.
+"""
+
+import heapq
+from typing import Optional
+
+# Defaults for api/treemap.json
+TREEMAP_DEPTH = 4
+TREEMAP_NODES = 200
+
+# Weakest directories listed, and the size below which a directory is not ranked
+WEAKEST_DIRECTORIES = 10
+WEAKEST_MIN_STATEMENTS = 50
+
+
+class _Node:
+    __slots__ = ('totals', 'files', 'children')
+
+    def __init__(self, width: int):
+        self.totals = [0] * width
+        self.files = 0
+        self.children = {}
+
+
+class DirectoryTrie:
+    """Per-directory totals of the numeric ``fields`` of file records.
+
+    ``statements`` and ``covered_statements`` must be among the fields;
+    a directory's coverage is derived from them.
+    """
+
+    def __init__(self, fields: tuple):
+        self.fields = tuple(fields)
+        self.root = _Node(len(self.fields))
+        self._statements = self.fields.index('statements')
+        self._covered = self.fields.index('covered_statements')
+
+    def add(self, path: str, record: dict) -> None:
+        values = [record.get(field) or 0 for field in self.fields]
+        node = self.root
+        self._accumulate(node, values)
+        for part in path.strip('/').split('/')[:-1]:
+            child = node.children.get(part)
+            if child is None:
+                child = node.children[part] = _Node(len(self.fields))
+            node = child
+            self._accumulate(node, values)
+
+    @staticmethod
+    def _accumulate(node: _Node, values: list) -> None:
+        node.files += 1
+        totals = node.totals
+        for i, value in enumerate(values):
+            totals[i] += value
+
+    @classmethod
+    def from_index(cls, index: dict, fields: tuple) -> 'DirectoryTrie':
+        trie = cls(fields)
+        for path, record in index.items():
+            trie.add(path, record)
+        return trie
+
+    def _coverage(self, node: _Node) -> Optional[float]:
+        statements = node.totals[self._statements]
+        if not statements:
+            return None
+        return round(node.totals[self._covered] / statements * 100, 2)
+
+    def _record(self, name: str, path: str, node: _Node) -> dict:
+        record = {'name': name, 'path': path, 'files': node.files, 'coverage': self._coverage(node)}
+        record.update(zip(self.fields, node.totals))
+        return record
+
+    def directories(self):
+        """Yield ``(path, node)`` for every directory below the root."""
+        stack = [('', self.root)]
+        while stack:
+            path, node = stack.pop()
+            for name, child in node.children.items():
+                child_path = f"{path}/{name}" if path else name
+                yield child_path, child
+                stack.append((child_path, child))
+
+    def weakest(self, limit: int = WEAKEST_DIRECTORIES, min_statements: int = WEAKEST_MIN_STATEMENTS) -> list:
+        """Directories with the lowest coverage, ignoring ones under ``min_statements``.
+
+        A directory whose statements all sit in one subdirectory would repeat
+        that subdirectory's figures, so only the subdirectory is ranked.
+        """
+        statements = self._statements
+        candidates = (
+            (path, node) for path, node in self.directories()
+            if node.totals[statements] >= max(min_statements, 1)
+            and all(child.totals[statements] != node.totals[statements] for child in node.children.values())
+        )
+        ranked = heapq.nsmallest(limit, candidates, key=lambda item: (self._coverage(item[1]), item[0]))
+        return [self._record(path.rsplit('/', 1)[-1], path, node) for path, node in ranked]
+
+    def treemap(self, max_depth: int = TREEMAP_DEPTH, max_nodes: int = TREEMAP_NODES) -> dict:
+        """Nested ``{..., children: [...]}`` records pruned to ``max_depth`` and ``max_nodes``.
+
+        A directory that was not expanded, and the ``(other)`` node of one
+        that was only partly expanded, report the number of subdirectories
+        left out as ``collapsed``. The ``(files)`` leaf of an expanded
+        directory holds the files directly inside it.
+        """
+        root = self._record('', '', self.root)
+        emitted = 1
+        # (-size, path, depth, node, record): largest directories are expanded first
+        queue = [(-self._size(self.root), '', 0, self.root, root)]
+
+        while queue:
+            _, path, depth, node, record = heapq.heappop(queue)
+            if not node.children:
+                continue
+            own = self._own_files(node)
+            # The (files) leaf takes one of the remaining slots
+            remaining = max_nodes - emitted - (1 if own.files else 0)
+            if depth >= max_depth or remaining < min(2, len(node.children)):
+                record['collapsed'] = len(node.children)
+                continue
+
+            names = sorted(node.children)
+            other = None
+            if len(names) > remaining:
+                # Keep the largest subdirectories and leave one slot for the rest
+                shown = set(heapq.nlargest(remaining - 1, names, key=lambda name: self._size(node.children[name])))
+                other = self._merge([node.children[name] for name in names if name not in shown])
+                other_count = len(names) - len(shown)
+                names = [name for name in names if name in shown]
+
+            record['children'] = []
+            for name in names:
+                child = node.children[name]
+                child_path = f"{path}/{name}" if path else name
+                child_record = self._record(name, child_path, child)
+                record['children'].append(child_record)
+                heapq.heappush(queue, (-self._size(child), child_path, depth + 1, child, child_record))
+            if other is not None:
+                other_path = f"{path}/(other)" if path else '(other)'
+                record['children'].append({**self._record('(other)', other_path, other), 'collapsed': other_count})
+            if own.files:
+                files_path = f"{path}/(files)" if path else '(files)'
+                record['children'].append(self._record('(files)', files_path, own))
+            emitted += len(record['children'])
+
+        return root
+
+    def _merge(self, nodes: list) -> _Node:
+        merged = _Node(len(self.fields))
+        for node in nodes:
+            merged.files += node.files
+            for i, value in enumerate(node.totals):
+                merged.totals[i] += value
+        return merged
+
+    def _own_files(self, node: _Node) -> _Node:
+        """Totals of the files directly in ``node``, outside its subdirectories."""
+        subdirectories = self._merge(list(node.children.values()))
+        own = _Node(len(self.fields))
+        own.files = node.files - subdirectories.files
+        own.totals = [total - nested for total, nested in zip(node.totals, subdirectories.totals)]
+        return own
+
+    def _size(self, node: _Node) -> int:
+        # Statements when there is coverage data, otherwise the number of files
+        return node.totals[self._statements] or node.files
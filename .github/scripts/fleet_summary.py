@@ -0,0 +1,114 @@
+"""
+Organisation-level summary of several repositories' metrics.
+
+Each repository gets an overall rating from the A-D ratings that
+calculate_rating gave its tools: the ratings are averaged as grade points
+and the mean is rounded back to a letter. Repositories are ranked by that
+score, best first, for api/fleet.json and the fleet overview page.
+"""
+
+import html
+from typing import Optional
+
+# Grade points of each rating; the overall rating is the nearest letter to the mean
+RATING_POINTS = {'A': 4, 'B': 3, 'C': 2, 'D': 1}
+
+# Columns of the overview table: (tool, headline metric key, column title, unit)
+FLEET_COLUMNS = (
+    ('coverage', 'line_coverage', 'Coverage', '%'),
+    ('phpstan', 'errors', 'PHPStan', ''),
+    ('phpcs', 'violations', 'Code Style', ''),
+    ('security', 'issues', 'Security', ''),
+    ('phpmd', 'violations', 'PHPMD', ''),
+    ('jscpd', 'percentage', 'Duplication', '%'),
+    ('junit', 'total_seconds', 'Test Runtime', 's'),
+)
+
+
+def overall_rating(ratings: dict) -> tuple:
+    """Return ``(score, rating)`` for a tool -> rating map, or ``(None, None)`` if none are rated."""
+    points = [RATING_POINTS[rating] for rating in ratings.values() if rating in RATING_POINTS]
+    if not points:
+        return None, None
+    score = round(sum(points) / len(points), 2)
+    for rating, value in RATING_POINTS.items():
+        if score >= value - 0.5:
+            return score, rating
+    return score, 'D'
+
+
+def fleet_entry(name: str, commit: str, metrics: dict, url: str) -> dict:
+    """Summarize one repository's run for the fleet."""
+    ratings = {}
+    totals = {}
+    for tool, key, _, _ in FLEET_COLUMNS:
+        tool_metrics = metrics.get(tool) or {}
+        if tool_metrics.get('rating'):
+            ratings[tool] = tool_metrics['rating']
+        totals[tool] = tool_metrics.get(key)
+    score, rating = overall_rating(ratings)
+    return {
+        'name': name,
+        'commit': commit,
+        'url': url,
+        'score': score,
+        'rating': rating,
+        'ratings': ratings,
+        'totals': totals,
+    }
+
+
+def rank_fleet(entries: list) -> list:
+    """Order entries best first (unrated last, then by name) and number them."""
+    ranked = sorted(entries, key=lambda entry: (entry['score'] is None, -(entry['score'] or 0), entry['name']))
+    return [{'rank': rank, **entry} for rank, entry in enumerate(ranked, 1)]
+
+
+def build_fleet(entries: list, generated_at: str) -> dict:
+    """Build the api/fleet.json document."""
+    ranked = rank_fleet(entries)
+    by_rating = {rating: 0 for rating in RATING_POINTS}
+    for entry in ranked:
+        if entry['rating'] in by_rating:
+            by_rating[entry['rating']] += 1
+    return {
+        'generated_at': generated_at,
+        'repos': ranked,
+        'by_rating': by_rating,
+    }
+
+
+def _grade(rating: Optional[str]) -> str:
+    rating = rating or 'N/A'
+    css = rating if rating in RATING_POINTS else 'NA'
+    return f'<span class="grade grade-{css}">{rating}</span>'
+
+
+def format_fleet_rows(fleet: dict) -> str:
+    """Format the ranked repositories as HTML table rows."""
+    rows = []
+    for entry in fleet['repos']:
+        name = html.escape(entry['name'])
+        link = f'<a href="{html.escape(entry["url"])}">{name}</a>' if entry['url'] else name
+        score = entry['score'] if entry['score'] is not None else 'N/A'
+        cells = [
+            f"<td>{entry['rank']}</td>",
+            f"<td>{link}</td>",
+            f"<td>{_grade(entry['rating'])} {score}</td>",
+        ]
+        for tool, _, _, unit in FLEET_COLUMNS:
+            value = entry['totals'].get(tool)
+            if value is None:
+                cells.append('<td>N/A</td>')
+            else:
+                cells.append(f"<td>{_grade(entry['ratings'].get(tool))} {value}{unit}</td>")
+        rows.append('<tr>' + ''.join(cells) + '</tr>')
+    return '\n'.join(rows)
+
+
+def format_fleet_headers() -> str:
+    return ''.join(f'<th>{title}</th>' for _, _, title, _ in FLEET_COLUMNS)
+
+
+def format_rating_counts(fleet: dict) -> str:
+    return ' | '.join(f"<strong>{rating}</strong>: {count}" for rating, count in fleet['by_rating'].items())
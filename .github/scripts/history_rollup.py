@@ -0,0 +1,190 @@
+"""
+Long-term rollups and downsampling for metrics history.
+
+Raw history entries are only kept for a limited window. Before they expire
+they are folded into daily aggregates, which age into weekly and then
+monthly aggregates, so the trend for any metric survives indefinitely at a
+bounded size. Each aggregate keeps min/max/sum/count/last so buckets can be
+merged exactly.
+"""
+
+import json
+import os
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+# Coarsening order of aggregate buckets
+RESOLUTIONS = ('day', 'week', 'month')
+
+
+def series_values(entry: dict, series: dict) -> dict:
+    """Extract ``{name: value}`` from a history entry for each ``name: (tool, key)`` in ``series``."""
+    values = {}
+    for name, (tool, key) in series.items():
+        value = (entry.get(tool) or {}).get(key)
+        if value is not None:
+            values[name] = value
+    return values
+
+
+def bucket_start(day: date, resolution: str) -> date:
+    """Return the first day of the ``resolution`` bucket containing ``day``."""
+    if resolution == 'day':
+        return day
+    if resolution == 'week':
+        return day - timedelta(days=day.weekday())
+    if resolution == 'month':
+        return day.replace(day=1)
+    raise ValueError(f"Unknown rollup resolution: {resolution}")
+
+
+def _merge_aggregate(target: dict, source: dict) -> None:
+    target['min'] = min(target['min'], source['min'])
+    target['max'] = max(target['max'], source['max'])
+    target['sum'] += source['sum']
+    target['count'] += source['count']
+    if source['last_ts'] >= target['last_ts']:
+        target['last'] = source['last']
+        target['last_ts'] = source['last_ts']
+
+
+class HistoryRollup:
+    """Day/week/month aggregates of history entries that have aged out of the raw window."""
+
+    def __init__(self, buckets: Optional[dict] = None):
+        self.buckets = {resolution: {} for resolution in RESOLUTIONS}
+        if buckets:
+            for resolution in RESOLUTIONS:
+                self.buckets[resolution].update(buckets.get(resolution, {}))
+
+    @classmethod
+    def load(cls, filepath: str) -> 'HistoryRollup':
+        if os.path.exists(filepath):
+            try:
+                with open(filepath, 'r') as f:
+                    return cls(json.load(f))
+            except (json.JSONDecodeError, IOError):
+                pass
+        return cls()
+
+    def save(self, filepath: str) -> None:
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(filepath, 'w') as f:
+            json.dump(self.buckets, f, sort_keys=True, separators=(',', ':'))
+
+    def add_entry(self, entry: dict, series: dict) -> None:
+        """Fold one raw history entry into its daily bucket."""
+        timestamp = entry.get('timestamp', '')
+        if not timestamp:
+            return
+
+        key = timestamp[:10]
+        bucket = self.buckets['day'].setdefault(key, {'runs': 0, 'commit': None, 'last_ts': '', 'series': {}})
+        bucket['runs'] += 1
+        if timestamp >= bucket['last_ts']:
+            bucket['commit'] = entry.get('commit')
+            bucket['last_ts'] = timestamp
+
+        for name, value in series_values(entry, series).items():
+            aggregate = {'min': value, 'max': value, 'sum': value, 'count': 1, 'last': value, 'last_ts': timestamp}
+            if name in bucket['series']:
+                _merge_aggregate(bucket['series'][name], aggregate)
+            else:
+                bucket['series'][name] = aggregate
+
+    def compact(self, now: datetime, daily_days: int, weekly_days: int) -> None:
+        """Move daily buckets older than ``daily_days`` into weeks, and weeks older than ``weekly_days`` into months."""
+        limits = {
+            'day': (now - timedelta(days=daily_days)).date(),
+            'week': (now - timedelta(days=weekly_days)).date(),
+        }
+
+        for finer, coarser in zip(RESOLUTIONS, RESOLUTIONS[1:]):
+            limit = bucket_start(limits[finer], coarser)
+            for key in sorted(self.buckets[finer]):
+                start = date.fromisoformat(key)
+                if start >= limit:
+                    break
+                self._merge_bucket(coarser, bucket_start(start, coarser).isoformat(), self.buckets[finer].pop(key))
+
+    def _merge_bucket(self, resolution: str, key: str, source: dict) -> None:
+        target = self.buckets[resolution].get(key)
+        if target is None:
+            self.buckets[resolution][key] = source
+            return
+
+        target['runs'] += source['runs']
+        if source['last_ts'] >= target['last_ts']:
+            target['commit'] = source['commit']
+            target['last_ts'] = source['last_ts']
+        for name, aggregate in source['series'].items():
+            if name in target['series']:
+                _merge_aggregate(target['series'][name], aggregate)
+            else:
+                target['series'][name] = aggregate
+
+    def points(self) -> list:
+        """Return all buckets oldest first with min/max/mean/last per series."""
+        points = []
+        for resolution in RESOLUTIONS:
+            for key, bucket in self.buckets[resolution].items():
+                points.append({
+                    'date': key,
+                    'resolution': resolution,
+                    'runs': bucket['runs'],
+                    'commit': bucket['commit'],
+                    'series': {
+                        name: {
+                            'min': agg['min'],
+                            'max': agg['max'],
+                            'mean': round(agg['sum'] / agg['count'], 2),
+                            'last': agg['last'],
+                        }
+                        for name, agg in bucket['series'].items()
+                    },
+                })
+
+        points.sort(key=lambda p: p['date'])
+        return points
+
+
+def lttb_indices(xs: list, ys: list, budget: int) -> list:
+    """Select up to ``budget`` indices preserving the visual shape (Largest-Triangle-Three-Buckets).
+
+    Points whose y is None are ignored. Indices are returned in ascending order.
+    """
+    valid = [i for i, y in enumerate(ys) if y is not None]
+    if budget <= 0 or len(valid) <= budget:
+        return valid
+    if budget < 3:
+        return [valid[0], valid[-1]][:budget]
+
+    selected = [valid[0]]
+    bucket_size = (len(valid) - 2) / (budget - 2)
+    previous = valid[0]
+
+    for b in range(budget - 2):
+        start = int(b * bucket_size) + 1
+        end = int((b + 1) * bucket_size) + 1
+
+        # Average of the next bucket is the third vertex of the triangle
+        next_start = end
+        next_end = min(int((b + 2) * bucket_size) + 1, len(valid))
+        next_points = valid[next_start:next_end] or [valid[-1]]
+        avg_x = sum(xs[i] for i in next_points) / len(next_points)
+        avg_y = sum(ys[i] for i in next_points) / len(next_points)
+
+        best_index = valid[start]
+        best_area = -1.0
+        px, py = xs[previous], ys[previous]
+        for i in valid[start:end]:
+            area = abs((px - avg_x) * (ys[i] - py) - (px - xs[i]) * (avg_y - py))
+            if area > best_area:
+                best_area = area
+                best_index = i
+
+        selected.append(best_index)
+        previous = best_index
+
+    selected.append(valid[-1])
+    return selected
@@ -0,0 +1,169 @@
+"""
+Pluggable storage backends for metrics history.
+
+The JSON backend keeps the original history/all.json behaviour. The SQLite
+backend stores one row per run, indexed by timestamp and commit, so appends
+and pruning touch only the affected rows and range queries use the index.
+"""
+
+import bisect
+import json
+import os
+from typing import Optional
+
+
+class HistoryStore:
+    """Base interface shared by all history backends."""
+
+    def append(self, entry: dict) -> None:
+        raise NotImplementedError
+
+    def extend(self, entries: list) -> None:
+        for entry in entries:
+            self.append(entry)
+
+    def prune(self, cutoff: str) -> int:
+        """Drop entries with a timestamp older than ``cutoff`` (ISO string)."""
+        raise NotImplementedError
+
+    def entries(self, since: Optional[str] = None, until: Optional[str] = None) -> list:
+        """Return entries in timestamp order, optionally bounded by ISO timestamps."""
+        raise NotImplementedError
+
+    def export_json(self, filepath: str, since: Optional[str] = None) -> None:
+        """Write entries to a history/all.json compatible file."""
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(filepath, 'w') as f:
+            json.dump(self.entries(since=since), f, indent=2)
+
+    def close(self) -> None:
+        pass
+
+
+class JsonHistoryStore(HistoryStore):
+    """History kept as a single JSON array, rewritten in full on close()."""
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self._entries = []
+        self._dirty = False
+
+        if os.path.exists(filepath):
+            try:
+                with open(filepath, 'r') as f:
+                    self._entries = json.load(f)
+            except (json.JSONDecodeError, IOError):
+                self._entries = []
+
+    def append(self, entry: dict) -> None:
+        # Backfilled entries may be older than existing ones; keep the list in timestamp order
+        timestamp = entry.get('timestamp', '')
+        if self._entries and timestamp < self._entries[-1].get('timestamp', ''):
+            bisect.insort(self._entries, entry, key=lambda e: e.get('timestamp', ''))
+        else:
+            self._entries.append(entry)
+        self._dirty = True
+
+    def prune(self, cutoff: str) -> int:
+        before = len(self._entries)
+        self._entries = [e for e in self._entries if e.get('timestamp', '') >= cutoff]
+        removed = before - len(self._entries)
+        if removed:
+            self._dirty = True
+        return removed
+
+    def entries(self, since: Optional[str] = None, until: Optional[str] = None) -> list:
+        return [
+            e for e in self._entries
+            if (since is None or e.get('timestamp', '') >= since)
+            and (until is None or e.get('timestamp', '') <= until)
+        ]
+
+    def close(self) -> None:
+        if self._dirty:
+            self.export_json(self.filepath)
+            self._dirty = False
+
+
+class SqliteHistoryStore(HistoryStore):
+    """History kept in SQLite with one row per run.
+
+    Entries are stored as compact JSON alongside indexed ``timestamp`` and
+    ``commit_sha`` columns. Appends are single INSERTs and pruning deletes
+    only the expired rows via the timestamp index.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            commit_sha TEXT NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history (timestamp);
+        CREATE INDEX IF NOT EXISTS idx_history_commit ON history (commit_sha);
+    """
+
+    def __init__(self, filepath: str, legacy_json: Optional[str] = None):
+        self.filepath = filepath
+        os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+        is_new = not os.path.exists(filepath)
+
+        # Imported here so the default JSON backend does not load the sqlite3 extension
+        import sqlite3
+        self.conn = sqlite3.connect(filepath)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(self.SCHEMA)
+
+        # Seed a fresh database from an existing all.json so switching backends keeps history
+        if is_new and legacy_json and os.path.exists(legacy_json):
+            self.extend(JsonHistoryStore(legacy_json).entries())
+
+    def append(self, entry: dict) -> None:
+        self.extend([entry])
+
+    def extend(self, entries: list) -> None:
+        with self.conn:
+            self.conn.executemany(
+                'INSERT INTO history (timestamp, commit_sha, data) VALUES (?, ?, ?)',
+                [
+                    (e.get('timestamp', ''), e.get('commit', ''), json.dumps(e, separators=(',', ':')))
+                    for e in entries
+                ],
+            )
+
+    def prune(self, cutoff: str) -> int:
+        with self.conn:
+            cursor = self.conn.execute('DELETE FROM history WHERE timestamp < ?', (cutoff,))
+        return cursor.rowcount
+
+    def entries(self, since: Optional[str] = None, until: Optional[str] = None) -> list:
+        query = 'SELECT data FROM history'
+        clauses = []
+        params = []
+        if since is not None:
+            clauses.append('timestamp >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('timestamp <= ?')
+            params.append(until)
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+        query += ' ORDER BY timestamp, id'
+
+        return [json.loads(row[0]) for row in self.conn.execute(query, params)]
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def open_history_store(backend: str, history_dir: str) -> HistoryStore:
+    """Open the history store for ``backend`` ('json' or 'sqlite') under ``history_dir``."""
+    json_path = os.path.join(history_dir, 'all.json')
+
+    if backend == 'sqlite':
+        return SqliteHistoryStore(os.path.join(history_dir, 'history.sqlite'), legacy_json=json_path)
+    if backend == 'json':
+        return JsonHistoryStore(json_path)
+
+    raise ValueError(f"Unknown history backend: {backend}")
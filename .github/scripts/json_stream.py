@@ -0,0 +1,171 @@
+"""
+Incremental, stdlib-only JSON reader for large analysis reports.
+
+The reader walks a document from a file in fixed-size chunks. Containers are
+iterated key by key or element by element, so the caller decides at every
+level whether to descend, decode a (small) value with the C decoder, or skip
+it. Memory is bounded by the largest single value the caller decodes, never
+by the size of the document.
+
+    with open(path) as f:
+        reader = JsonStreamReader(f)
+        for key in reader.iter_object():
+            if key == 'totals':
+                totals = reader.read_value()
+            else:
+                reader.skip_value()
+"""
+
+import json
+import re
+
+# Characters read from the file per refill
+CHUNK_SIZE = 64 * 1024
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# Buffered input that could still be the rest of a number cut at a chunk edge
+NUMBER_TAIL = re.compile(r'[0-9.eE+-]*\Z')
+
+_decoder = json.JSONDecoder()
+
+
+class JsonStreamReader:
+    """Pull-based cursor over a JSON document read incrementally from a text file."""
+
+    def __init__(self, fileobj, chunk_size: int = CHUNK_SIZE):
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _error(self, message: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(message, self.buf, self.pos)
+
+    def _fill(self) -> bool:
+        """Read another chunk, dropping consumed input. Returns False at end of file."""
+        if self.eof:
+            return False
+
+        chunk = self.fileobj.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _peek(self) -> str:
+        """Skip whitespace and return the next character ('' at end of input)."""
+        while True:
+            self.pos = WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, char: str) -> None:
+        if self._peek() != char:
+            raise self._error(f"Expecting '{char}'")
+        self.pos += 1
+
+    def peek_type(self) -> str:
+        """Return the type of the next value: object, array, string, number, literal or ''."""
+        char = self._peek()
+        if char == '{':
+            return 'object'
+        if char == '[':
+            return 'array'
+        if char == '"':
+            return 'string'
+        if char in '-0123456789':
+            return 'number'
+        return 'literal' if char else ''
+
+    def read_value(self):
+        """Decode the next complete value with the C decoder and advance past it."""
+        if not self._peek():
+            raise self._error('Unexpected end of input')
+
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # The value may continue past the buffered input
+                if self._fill():
+                    continue
+                raise
+
+            # A number cut at the buffer edge (e.g. '1.' or '2e') decodes as a
+            # shorter one, so read on while the rest of the buffer could extend it
+            if (isinstance(value, (int, float)) and not isinstance(value, bool) and not self.eof
+                    and NUMBER_TAIL.match(self.buf, end) and self._fill()):
+                continue
+
+            self.pos = end
+            return value
+
+    def iter_object(self):
+        """Iterate the keys of the next object.
+
+        After each key is yielded the cursor sits on its value, which the
+        caller must consume (read_value, skip_value or a nested iteration)
+        before requesting the next key.
+        """
+        self._expect('{')
+        if self._peek() == '}':
+            self.pos += 1
+            return
+
+        while True:
+            if self._peek() != '"':
+                raise self._error('Expecting property name enclosed in double quotes')
+            key = self.read_value()
+            self._expect(':')
+            yield key
+
+            char = self._peek()
+            self.pos += 1
+            if char == '}':
+                return
+            if char != ',':
+                self.pos -= 1
+                raise self._error("Expecting ',' delimiter")
+
+    def iter_array(self):
+        """Iterate the elements of the next array, yielding their index.
+
+        As with iter_object(), the caller consumes each element before the
+        iteration continues.
+        """
+        self._expect('[')
+        if self._peek() == ']':
+            self.pos += 1
+            return
+
+        index = 0
+        while True:
+            yield index
+            index += 1
+
+            char = self._peek()
+            self.pos += 1
+            if char == ']':
+                return
+            if char != ',':
+                self.pos -= 1
+                raise self._error("Expecting ',' delimiter")
+
+    def skip_value(self) -> None:
+        """Consume the next value without keeping it."""
+        value_type = self.peek_type()
+        if value_type == 'object':
+            for _ in self.iter_object():
+                self.skip_value()
+        elif value_type == 'array':
+            for _ in self.iter_array():
+                self.skip_value()
+        else:
+            self.read_value()
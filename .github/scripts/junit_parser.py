@@ -0,0 +1,117 @@
+"""
+Parser for PHPUnit JUnit XML reports (test durations).
+
+Kept in its own module so the XML parser is only imported when a JUnit
+report is actually processed.
+"""
+
+import heapq
+import math
+import os
+from array import array
+from operator import itemgetter
+
+import defusedxml.ElementTree as ET
+
+from method_stats import percentile
+from metrics_common import calculate_rating, generate_badge_url
+
+# Number of slowest tests and suites reported
+TOP_SLOWEST = 10
+
+
+def parse_junit_xml(filepath: str) -> dict:
+    """Parse PHPUnit JUnit XML.
+
+    The report is streamed with iterparse and each <testcase> is detached
+    from its suite and cleared once read, so memory holds only one duration
+    and name per test. Suite
+    durations are summed per test class, which also folds data-provider
+    sub-suites into their class. The slowest tests and suites are selected
+    with a heap rather than a full sort.
+    """
+    result = {
+        'tests': None,
+        'failures': 0,
+        'errors': 0,
+        'skipped': 0,
+        'total_seconds': None,
+        'p50': None,
+        'p95': None,
+        'max': None,
+        'slowest': [],
+        'slowest_suites': [],
+        'timings': {},
+        'rating': None,
+        'badge_url': None,
+    }
+
+    if not os.path.exists(filepath):
+        print(f"Warning: JUnit file not found: {filepath}")
+        return result
+
+    try:
+        names = []
+        durations = array('d')
+        suites = {}
+        outcomes = {'failure': 0, 'error': 0, 'skipped': 0}
+
+        stack = []
+
+        for event, elem in ET.iterparse(filepath, events=('start', 'end')):
+            if event == 'start':
+                stack.append(elem)
+                continue
+
+            stack.pop()
+            tag = elem.tag
+            if tag == 'testcase':
+                suite = elem.get('class') or elem.get('classname', '')
+                name = elem.get('name', '')
+                seconds = float(elem.get('time') or 0)
+                names.append(f"{suite}::{name}" if suite else name)
+                durations.append(seconds)
+                suites[suite] = suites.get(suite, 0.0) + seconds
+            elif tag in outcomes and stack and stack[-1].tag == 'testcase':
+                # Outcome children end (and are detached) before their test case
+                outcomes[tag] += 1
+
+            # Detach the finished element so neither it nor its subtree is retained
+            if stack:
+                stack[-1].remove(elem)
+            elem.clear()
+
+        result['failures'] = outcomes['failure']
+        result['errors'] = outcomes['error']
+        result['skipped'] = outcomes['skipped']
+
+        if durations:
+            ordered = sorted(durations)
+            total = math.fsum(durations)
+            result['tests'] = len(durations)
+            result['total_seconds'] = round(total, 2)
+            result['p50'] = round(percentile(ordered, 50), 4)
+            result['p95'] = round(percentile(ordered, 95), 4)
+            result['max'] = round(ordered[-1], 4)
+
+            slowest = heapq.nlargest(TOP_SLOWEST, range(len(durations)), key=durations.__getitem__)
+            result['slowest'] = [{'test': names[i], 'seconds': round(durations[i], 4)} for i in slowest]
+            result['slowest_suites'] = [
+                {'suite': suite, 'seconds': round(seconds, 3)}
+                for suite, seconds in heapq.nlargest(TOP_SLOWEST, suites.items(), key=itemgetter(1))
+            ]
+
+            timings = result['timings']
+            for name, seconds in zip(names, durations):
+                timings[name] = round(timings.get(name, 0.0) + seconds, 4)
+
+            result['rating'] = calculate_rating('test_runtime', result['total_seconds'])
+            result['badge_url'] = generate_badge_url('tests', f"{result['total_seconds']}s", result['rating'])
+        else:
+            result['tests'] = 0
+    except ET.ParseError as e:
+        print(f"Error parsing JUnit XML: {e}")
+    except Exception as e:
+        print(f"Unexpected error parsing JUnit: {e}")
+
+    return result
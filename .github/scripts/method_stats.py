@@ -0,0 +1,170 @@
+"""
+Per-method complexity and CRAP statistics from Clover coverage data.
+
+Method rows are collected into compact ``array`` columns while the Clover
+report is streamed, then analysed in one vectorized pass: with NumPy when it
+is installed, otherwise with plain Python over the same arrays.
+
+CRAP (Change Risk Anti-Patterns) follows PHPUnit's definition:
+``complexity^2 * (1 - coverage)^3 + complexity`` with coverage as a fraction
+of the method's executable statements.
+"""
+
+import heapq
+import math
+from array import array
+
+# Lower bounds of the complexity histogram buckets
+COMPLEXITY_BUCKETS = (1, 2, 5, 10, 20, 50)
+
+# Methods scoring above this are conventionally considered risky to change
+CRAP_THRESHOLD = 30
+
+
+def _numpy():
+    """Import NumPy lazily; it is optional and slow to import."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def bucket_labels(buckets: tuple = COMPLEXITY_BUCKETS) -> list:
+    labels = []
+    for low, high in zip(buckets, buckets[1:]):
+        labels.append(str(low) if high - low == 1 else f"{low}-{high - 1}")
+    labels.append(f"{buckets[-1]}+")
+    return labels
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """Linear-interpolated percentile of pre-sorted values (NumPy's default method)."""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * q / 100
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+class MethodTable:
+    """Column store of per-method rows: file, name, complexity and statement coverage."""
+
+    def __init__(self):
+        self.files = []
+        self.file_ids = array('I')
+        self.names = []
+        self.complexity = array('I')
+        self.statements = array('I')
+        self.covered = array('I')
+        self.executed = array('B')
+
+    def __len__(self) -> int:
+        return len(self.complexity)
+
+    def add_file(self, path: str) -> int:
+        self.files.append(path)
+        return len(self.files) - 1
+
+    def add_method(self, file_id: int, name: str, complexity: int, executed: bool) -> None:
+        self.file_ids.append(file_id)
+        self.names.append(name)
+        self.complexity.append(complexity)
+        self.statements.append(0)
+        self.covered.append(0)
+        self.executed.append(1 if executed else 0)
+
+    def add_statement(self, covered: bool) -> None:
+        """Attribute a statement to the most recently added method."""
+        self.statements[-1] += 1
+        if covered:
+            self.covered[-1] += 1
+
+    def _coverage_and_crap(self) -> tuple:
+        """Return per-method coverage fractions and CRAP scores as sequences."""
+        np = _numpy()
+        if np is not None:
+            complexity = np.asarray(self.complexity, dtype=np.float64)
+            statements = np.asarray(self.statements, dtype=np.float64)
+            covered = np.asarray(self.covered, dtype=np.float64)
+            executed = np.asarray(self.executed, dtype=np.float64)
+            coverage = np.divide(covered, statements, out=executed.copy(), where=statements > 0)
+            crap = complexity ** 2 * (1 - coverage) ** 3 + complexity
+            return coverage, crap
+
+        coverage = [
+            covered / statements if statements else float(executed)
+            for covered, statements, executed in zip(self.covered, self.statements, self.executed)
+        ]
+        crap = [c * c * (1 - p) ** 3 + c for c, p in zip(self.complexity, coverage)]
+        return coverage, crap
+
+    def analyze(self, top_n: int = 10) -> tuple:
+        """Compute the complexity distribution, CRAP summary and the ``top_n`` riskiest methods.
+
+        Returns ``(stats, worst)`` where ``worst`` is selected by CRAP score
+        with a heap rather than a full sort.
+        """
+        count = len(self)
+        if not count:
+            return None, []
+
+        coverage, crap = self._coverage_and_crap()
+        np = _numpy()
+        labels = bucket_labels()
+
+        if np is not None:
+            complexity = np.asarray(self.complexity, dtype=np.float64)
+            p50, p90, p99 = np.percentile(complexity, [50, 90, 99])
+            bucket_index = np.clip(np.searchsorted(COMPLEXITY_BUCKETS, complexity, side='right') - 1, 0, None)
+            histogram = np.bincount(bucket_index, minlength=len(COMPLEXITY_BUCKETS)).tolist()
+            crap_p50, crap_p90 = np.percentile(crap, [50, 90])
+            complexity_max = float(complexity.max())
+            complexity_mean = float(complexity.mean())
+            crap_max = float(crap.max())
+            risky = int((crap > CRAP_THRESHOLD).sum())
+            crap = crap.tolist()
+            coverage = coverage.tolist()
+        else:
+            sorted_complexity = sorted(self.complexity)
+            p50, p90, p99 = (percentile(sorted_complexity, q) for q in (50, 90, 99))
+            histogram = [0] * len(COMPLEXITY_BUCKETS)
+            for value in self.complexity:
+                index = 0
+                while index + 1 < len(COMPLEXITY_BUCKETS) and value >= COMPLEXITY_BUCKETS[index + 1]:
+                    index += 1
+                histogram[index] += 1
+            sorted_crap = sorted(crap)
+            crap_p50, crap_p90 = (percentile(sorted_crap, q) for q in (50, 90))
+            complexity_max = float(sorted_complexity[-1])
+            complexity_mean = sum(self.complexity) / count
+            crap_max = sorted_crap[-1]
+            risky = sum(1 for value in crap if value > CRAP_THRESHOLD)
+
+        stats = {
+            'methods': count,
+            'mean': round(complexity_mean, 2),
+            'p50': round(float(p50), 2),
+            'p90': round(float(p90), 2),
+            'p99': round(float(p99), 2),
+            'max': int(complexity_max),
+            'histogram': dict(zip(labels, histogram)),
+            'crap_p50': round(float(crap_p50), 2),
+            'crap_p90': round(float(crap_p90), 2),
+            'crap_max': round(float(crap_max), 2),
+            'crap_above_threshold': risky,
+        }
+
+        worst = [
+            {
+                'file': self.files[self.file_ids[i]],
+                'method': self.names[i],
+                'complexity': self.complexity[i],
+                'coverage': round(coverage[i] * 100, 2),
+                'crap': round(crap[i], 2),
+            }
+            for i in heapq.nlargest(top_n, range(count), key=crap.__getitem__)
+        ]
+
+        return stats, worst
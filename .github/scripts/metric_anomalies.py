@@ -0,0 +1,212 @@
+"""
+Rolling-statistics anomaly detection over metrics history.
+
+History entries are loaded into one ``array('d')`` column per chart series,
+with NaN where a run did not report that tool; those runs are masked out
+rather than treated as zero. Each remaining point is compared with the
+ANOMALY_WINDOW points before it:
+
+- a spike is a point more than ``z`` standard deviations from the trailing
+  mean;
+- a drift is an EWMA that has moved more than ``drift_z`` of its own
+  standard deviations (``std * sqrt(alpha / (2 - alpha))``) from the
+  trailing mean, which catches slow changes that no single run makes
+  stand out.
+
+The trailing means and deviations come from prefix sums in one vectorized
+pass (with NumPy when it is installed, otherwise plain Python over the same
+columns), so the cost is linear in the history length whatever the window.
+The EWMA is a recurrence and is a single loop in both cases.
+
+Deviations are floored before scoring, so a perfectly flat history does not
+turn the smallest change into a huge z-score: count series (whole numbers
+only) use a floor of one, and other series a fraction of their trailing
+mean.
+"""
+
+import math
+from array import array
+from itertools import accumulate
+from typing import Optional
+
+from snapshot_diff import HIGHER_IS_BETTER
+
+# Trailing runs a point is compared with, and the fewest needed to judge it
+ANOMALY_WINDOW = 20
+MIN_PERIODS = 5
+
+# Default z-score limits for spikes and for EWMA drift
+ANOMALY_Z = 3.0
+DRIFT_Z = 3.0
+
+EWMA_SPAN = 10
+
+# Smallest deviation scored against: metrics are reported to two decimals,
+# a change of one is the smallest step of a count, and otherwise changes
+# within STD_FLOOR_RATIO of the trailing mean are noise
+STD_FLOOR = 0.01
+COUNT_STD_FLOOR = 1.0
+STD_FLOOR_RATIO = 0.01
+
+# Flagged points kept per series, most recent last
+RECENT_ANOMALIES = 5
+
+
+def _numpy():
+    """Import NumPy lazily; it is optional and slow to import."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def load_columns(entries: list, series: dict) -> dict:
+    """Return ``{name: array('d')}`` for each ``name: (tool, key)`` in ``series``, NaN where missing."""
+    nan = math.nan
+    columns = {name: array('d') for name in series}
+    for entry in entries:
+        for name, (tool, key) in series.items():
+            value = (entry.get(tool) or {}).get(key)
+            columns[name].append(nan if value is None else value)
+    return columns
+
+
+def ewma(values: list, span: int = EWMA_SPAN) -> list:
+    """Exponentially weighted moving average with ``alpha = 2 / (span + 1)``."""
+    alpha = 2 / (span + 1)
+    averages = []
+    average = values[0] if values else 0.0
+    for value in values:
+        average += alpha * (value - average)
+        averages.append(average)
+    return averages
+
+
+def std_floor(values: list) -> tuple:
+    """Return ``(absolute, relative)`` deviation floors for a series.
+
+    Scores divide by at least ``max(absolute, relative * |trailing mean|)``.
+    """
+    if all(float(value).is_integer() for value in values):
+        return COUNT_STD_FLOOR, STD_FLOOR_RATIO
+    return STD_FLOOR, STD_FLOOR_RATIO
+
+
+def rolling_scores(values: list, window: int = ANOMALY_WINDOW, span: int = EWMA_SPAN,
+                   floor: tuple = (STD_FLOOR, STD_FLOOR_RATIO)) -> tuple:
+    """Score each value against the up to ``window`` values before it.
+
+    Returns ``(means, stds, averages, z_scores, drift_scores)`` as lists:
+    the trailing mean and sample standard deviation, the EWMA, the value's
+    z-score and the EWMA's distance from the mean in EWMA standard
+    deviations. Scores divide by the deviation raised to ``floor`` (see
+    std_floor). Values are shifted by the first one before the prefix sums,
+    which keeps the sum-of-squares variance accurate for series far from
+    zero. Positions with fewer than two earlier values have a NaN mean.
+    """
+    averages = ewma(values, span)
+    alpha = 2 / (span + 1)
+    ewma_scale = math.sqrt(alpha / (2 - alpha))
+    first = values[0]
+    absolute_floor, relative_floor = floor
+
+    np = _numpy()
+    if np is not None:
+        shifted = np.asarray(values, dtype=np.float64) - first
+        sums = np.concatenate(([0.0], np.cumsum(shifted)))
+        squares = np.concatenate(([0.0], np.cumsum(shifted * shifted)))
+        end = np.arange(len(values))
+        size = end - np.maximum(end - window, 0)
+        start = end - size
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = (sums[end] - sums[start]) / size
+            variance = ((squares[end] - squares[start]) - size * mean * mean) / (size - 1)
+            mean = np.where(size > 1, mean + first, np.nan)
+        std = np.sqrt(np.clip(np.where(size > 1, variance, 0.0), 0, None))
+        floored = np.maximum(std, np.maximum(absolute_floor, relative_floor * np.abs(mean)))
+        z_scores = (shifted + first - mean) / floored
+        drift_scores = (np.asarray(averages) - mean) / (floored * ewma_scale)
+        return mean.tolist(), std.tolist(), averages, z_scores.tolist(), drift_scores.tolist()
+
+    sums = list(accumulate((value - first for value in values), initial=0.0))
+    squares = list(accumulate(((value - first) ** 2 for value in values), initial=0.0))
+    means, stds, z_scores, drift_scores = [], [], [], []
+    for end, (value, average) in enumerate(zip(values, averages)):
+        size = min(end, window)
+        start = end - size
+        if size < 2:
+            mean = variance = math.nan
+        else:
+            mean = (sums[end] - sums[start]) / size
+            variance = ((squares[end] - squares[start]) - size * mean * mean) / (size - 1)
+            mean += first
+        std = math.sqrt(variance) if variance > 0 else 0.0
+        floored = max(std, absolute_floor, relative_floor * abs(mean))
+        means.append(mean)
+        stds.append(std)
+        z_scores.append((value - mean) / floored)
+        drift_scores.append((average - mean) / (floored * ewma_scale))
+    return means, stds, averages, z_scores, drift_scores
+
+
+def analyze_series(values: array, name: str, window: int = ANOMALY_WINDOW, z: float = ANOMALY_Z,
+                   drift_z: float = DRIFT_Z, span: int = EWMA_SPAN, min_periods: int = MIN_PERIODS) -> list:
+    """Return ``(position, stats)`` for the flagged points of one column and for its last point.
+
+    ``stats`` holds the value, trailing mean/std, EWMA, z-score, the
+    ``flags`` raised ('spike', 'drift') and whether they move the metric in
+    the worse direction. Points with fewer than ``min_periods`` earlier
+    values are not judged.
+    """
+    positions = [i for i, value in enumerate(values) if not math.isnan(value)]
+    if len(positions) <= min_periods:
+        return []
+    observed = [values[i] for i in positions]
+
+    means, stds, averages, z_scores, drift_scores = rolling_scores(observed, window, span, std_floor(observed))
+    last = len(observed) - 1
+    higher_is_better = name in HIGHER_IS_BETTER
+
+    points = []
+    for i in range(max(min_periods, 2), len(observed)):
+        spike = abs(z_scores[i]) > z
+        drift = abs(drift_scores[i]) > drift_z
+        if not (spike or drift or i == last):
+            continue
+        flags = [flag for flag, raised in (('spike', spike), ('drift', drift)) if raised]
+        shift = z_scores[i] if spike else drift_scores[i]
+        points.append((positions[i], {
+            'value': observed[i],
+            'mean': round(means[i], 2),
+            'std': round(stds[i], 2),
+            'ewma': round(averages[i], 2),
+            'z': round(z_scores[i], 2),
+            'flags': flags,
+            'regression': bool(flags) and (shift < 0 if higher_is_better else shift > 0),
+        }))
+    return points
+
+
+def detect_anomalies(entries: list, series: dict, window: int = ANOMALY_WINDOW, z: float = ANOMALY_Z,
+                     drift_z: float = DRIFT_Z, span: int = EWMA_SPAN) -> dict:
+    """Analyse every series of ``entries`` (oldest first).
+
+    Returns ``{name: {'latest': stats or None, 'recent': [flagged points]}}``
+    where ``latest`` describes the newest entry and flagged points carry
+    their entry's date and commit.
+    """
+    columns = load_columns(entries, series)
+    results = {}
+    last = len(entries) - 1
+    for name, values in columns.items():
+        latest: Optional[dict] = None
+        flagged = []
+        for position, stats in analyze_series(values, name, window, z, drift_z, span):
+            if position == last:
+                latest = stats
+            if stats['flags']:
+                entry = entries[position]
+                flagged.append({'date': entry.get('date'), 'commit': entry.get('commit'), **stats})
+        results[name] = {'latest': latest, 'recent': flagged[-RECENT_ANOMALIES:]}
+    return results
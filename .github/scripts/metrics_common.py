@@ -0,0 +1,67 @@
+"""
+Rating thresholds and report path helpers shared by the parsers and the pipeline.
+"""
+
+# Rating thresholds
+THRESHOLDS = {
+    'coverage': {'A': 80, 'B': 60, 'C': 40},  # percentage
+    'phpstan': {'A': 0, 'B': 10, 'C': 50},    # error count
+    'phpcs': {'A': 0, 'B': 20, 'C': 100},     # violation count
+    'security': {'A': 0, 'B': 2, 'C': 10},    # issue count
+    'complexity': {'A': 5, 'B': 10, 'C': 20}, # average complexity
+    'duplication': {'A': 3, 'B': 5, 'C': 10}, # percentage
+    'test_runtime': {'A': 60, 'B': 300, 'C': 900},  # test suite seconds
+}
+
+# Badge colors
+COLORS = {
+    'A': 'brightgreen',
+    'B': 'green',
+    'C': 'yellow',
+    'D': 'red',
+}
+
+# Path prefix of the project inside the CI container, stripped from report paths
+CONTAINER_ROOT = '/var/www/html/'
+
+
+def calculate_rating(metric: str, value: float) -> str:
+    """Calculate A/B/C/D rating based on thresholds."""
+    thresholds = THRESHOLDS.get(metric, {})
+
+    # For coverage, higher is better
+    if metric == 'coverage':
+        if value >= thresholds.get('A', 80):
+            return 'A'
+        elif value >= thresholds.get('B', 60):
+            return 'B'
+        elif value >= thresholds.get('C', 40):
+            return 'C'
+        return 'D'
+
+    # For everything else, lower is better
+    if value <= thresholds.get('A', 0):
+        return 'A'
+    elif value <= thresholds.get('B', 10):
+        return 'B'
+    elif value <= thresholds.get('C', 50):
+        return 'C'
+    return 'D'
+
+
+def generate_badge_url(label: str, value: str, rating: str) -> str:
+    """Generate shields.io badge URL."""
+    color = COLORS.get(rating, 'lightgrey')
+    # URL encode spaces and special characters
+    label_encoded = label.replace(' ', '%20').replace('-', '--')
+    value_encoded = value.replace(' ', '%20').replace('-', '--').replace('%', '%25')
+    return f"https://img.shields.io/badge/{label_encoded}-{value_encoded}-{color}"
+
+
+def normalize_path(path: str) -> str:
+    """Normalize a report path to be relative to the project root."""
+    if path.startswith(CONTAINER_ROOT):
+        return path[len(CONTAINER_ROOT):]
+    if path.startswith('./'):
+        return path[2:]
+    return path
@@ -0,0 +1,264 @@
+"""
+Local development server for the metrics dashboard.
+
+Rendered pages are held in memory and served with strong ETags, so a
+browser revalidating an unchanged page gets a bodyless 304. Compressible
+responses are gzipped once when they are cached and sent to clients that
+accept gzip. Files not produced by the pipeline (e.g. the coverage HTML
+report) are served from the output directory through the same cache, but
+only from the locations that are published: top-level pages and the
+PUBLISHED_DIRS, never hidden directories or history store files.
+
+An ArtifactWatcher polls the artifact paths so the caller can re-run only
+the parsers whose input changed and swap in freshly rendered pages.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+from urllib.parse import unquote, urlsplit
+
+from static_output import COMPRESSIBLE_TYPES, DATA_DIR, GZIP_MIN_BYTES
+
+# Output subdirectories served from disk; coverage/ holds the copied coverage HTML report
+PUBLISHED_DIRS = frozenset({'api', 'badges', 'history', 'coverage', DATA_DIR})
+
+# History store files that live in the output directory but are not site content
+STORE_SUFFIXES = ('.sqlite', '.sqlite-wal', '.sqlite-shm', '.sqlite-journal')
+
+
+def is_published(relative: str) -> bool:
+    """Whether a normalized path relative to the output directory is site content."""
+    parts = relative.split('/')
+    if any(not part or part.startswith('.') for part in parts) or relative.endswith(STORE_SUFFIXES):
+        return False
+    return len(parts) == 1 or parts[0] in PUBLISHED_DIRS
+
+
+def _content_type(path: str) -> str:
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    if content_type.startswith('text/') or content_type == 'application/json':
+        content_type += '; charset=utf-8'
+    return content_type
+
+
+class CachedResponse:
+    """A response body with its strong ETag and, when worthwhile, a gzipped variant."""
+
+    __slots__ = ('body', 'content_type', 'etag', 'gzip_body', 'gzip_etag', 'stamp')
+
+    def __init__(self, body: bytes, content_type: str, stamp: Optional[tuple] = None):
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.body = body
+        self.content_type = content_type
+        self.etag = f'"{digest}"'
+        self.gzip_body = None
+        self.gzip_etag = None
+        self.stamp = stamp
+
+        if len(body) >= GZIP_MIN_BYTES and content_type.startswith(COMPRESSIBLE_TYPES):
+            compressed = gzip.compress(body, mtime=0)
+            if len(compressed) < len(body):
+                self.gzip_body = compressed
+                # Each representation needs its own strong validator
+                self.gzip_etag = f'"{digest}-gz"'
+
+
+class SiteCache:
+    """Thread-safe map of URL path to CachedResponse."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rendered = {}
+        self._disk = {}
+
+    def replace(self, files: dict) -> int:
+        """Swap in a new set of rendered files (``{relative path: bytes}``).
+
+        Entries whose bytes did not change keep their existing response, so
+        their ETag and compressed body are not recomputed. Returns how many
+        entries were (re)built.
+        """
+        with self._lock:
+            current = self._rendered
+
+        rendered = {}
+        built = 0
+        for path, body in files.items():
+            url = '/' + path.lstrip('/')
+            cached = current.get(url)
+            if cached is None or cached.body != body:
+                cached = CachedResponse(body, _content_type(url))
+                built += 1
+            rendered[url] = cached
+
+        with self._lock:
+            self._rendered = rendered
+        return built
+
+    def get(self, url: str, root: Optional[str] = None) -> Optional[CachedResponse]:
+        """Look up a rendered page, falling back to a file under ``root``."""
+        with self._lock:
+            cached = self._rendered.get(url)
+        if cached is not None or root is None:
+            return cached
+
+        # Resolve inside the output directory only, and only to published files
+        relative = posixpath.normpath(url).lstrip('/')
+        if relative.startswith('..') or not is_published(relative):
+            return None
+        path = os.path.join(root, *relative.split('/'))
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if not os.path.isfile(path):
+            return None
+
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._disk.get(url)
+        if cached is None or cached.stamp != stamp:
+            with open(path, 'rb') as f:
+                cached = CachedResponse(f.read(), _content_type(path), stamp)
+            with self._lock:
+                self._disk[url] = cached
+        return cached
+
+
+def accepts_gzip(header: str) -> bool:
+    """Whether an Accept-Encoding header allows gzip (honouring ``q=0``)."""
+    for part in header.split(','):
+        coding, *params = [item.strip() for item in part.split(';')]
+        if coding.lower() not in ('gzip', '*'):
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        return quality > 0
+    return False
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against ``etag`` (RFC 9110 13.1.2)."""
+    if header.strip() == '*':
+        return True
+    return any(candidate.strip().removeprefix('W/') == etag for candidate in header.split(','))
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """Serves GET/HEAD requests from a SiteCache."""
+
+    cache: SiteCache = None
+    root: Optional[str] = None
+
+    def _resolve(self) -> Optional[CachedResponse]:
+        url = unquote(urlsplit(self.path).path) or '/'
+        if url.endswith('/'):
+            url += 'index.html'
+        cached = self.cache.get(url, self.root)
+        if cached is None and not url.endswith('/index.html'):
+            # Directory URLs without a trailing slash
+            cached = self.cache.get(url + '/index.html', self.root)
+        return cached
+
+    def _respond(self, send_body: bool) -> None:
+        cached = self._resolve()
+        if cached is None:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+
+        use_gzip = cached.gzip_body is not None and accepts_gzip(self.headers.get('Accept-Encoding', ''))
+        body = cached.gzip_body if use_gzip else cached.body
+        etag = cached.gzip_etag if use_gzip else cached.etag
+
+        if etag_matches(self.headers.get('If-None-Match', ''), etag):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', etag)
+            self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+            return
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', cached.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        # Always revalidate so edits show up on the next refresh
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def log_request(self, code='-', size='-'):
+        # Keep the console for rebuild messages; only report failures
+        if isinstance(code, int) and code >= 400:
+            super().log_request(code, size)
+
+
+class ArtifactWatcher:
+    """Detects changes to a set of files by polling their mtime and size."""
+
+    def __init__(self, paths: dict):
+        self.paths = {name: path for name, path in paths.items() if path}
+        self._stamps = {name: self._stamp(path) for name, path in self.paths.items()}
+
+    @staticmethod
+    def _stamp(path: str) -> Optional[tuple]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def changed(self) -> list:
+        """Names whose file changed (or appeared/disappeared) since the last call."""
+        changed = []
+        for name, path in self.paths.items():
+            stamp = self._stamp(path)
+            if stamp != self._stamps[name]:
+                self._stamps[name] = stamp
+                changed.append(name)
+        return changed
+
+
+def serve(cache: SiteCache, root: str, host: str, port: int, watcher: ArtifactWatcher,
+          on_change: Callable[[list], None], interval: float = 0.5) -> None:
+    """Serve ``cache`` until interrupted, calling ``on_change`` with changed watcher names."""
+    handler = type('Handler', (MetricsRequestHandler,), {'cache': cache, 'root': root})
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    print(f"Serving {root} at http://{host}:{server.server_address[1]}/ (Ctrl+C to stop)")
+
+    try:
+        while True:
+            time.sleep(interval)
+            changed = watcher.changed()
+            if changed:
+                on_change(changed)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
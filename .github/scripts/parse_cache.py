@@ -0,0 +1,104 @@
+"""
+Content-addressed on-disk cache for parser results.
+
+Entries are keyed by (parser name, parser version, SHA-256 of the input
+file), so a byte-identical artifact is never parsed twice. The cache is
+bounded in size and evicts the least recently used entries first.
+"""
+
+import hashlib
+import json
+import os
+from typing import Optional
+
+# Read artifacts in 1 MiB chunks while hashing
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def default_cache_dir() -> str:
+    """Return the parse cache directory under ``$XDG_CACHE_HOME`` (default ``~/.cache``).
+
+    It is kept outside the output directory so cached results are never
+    published with the site.
+    """
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'willow-metrics', 'parse')
+
+
+def file_sha256(filepath: str) -> str:
+    """Return the hex SHA-256 digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """Size-bounded LRU cache of parser results stored as JSON files."""
+
+    def __init__(self, cache_dir: str, max_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, parser: str, version: int, filepath: str) -> str:
+        """Build the cache key for ``filepath`` as read by ``parser`` at ``version``."""
+        return f"{parser}-v{version}-{file_sha256(filepath)}"
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return the cached entry for ``key`` or None, counting the hit or miss."""
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            self.misses += 1
+            return None
+
+        # Refresh the access time used for LRU ordering
+        os.utime(path, None)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, entry: dict) -> None:
+        """Store ``entry`` under ``key`` and evict old entries if over budget."""
+        path = self._entry_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self) -> int:
+        """Remove least recently used entries until the cache fits ``max_bytes``."""
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for item in it:
+                if item.is_file() and item.name.endswith('.json'):
+                    stat = item.stat()
+                    entries.append((stat.st_mtime, stat.st_size, item.path))
+                    total += stat.st_size
+
+        removed = 0
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+
+        return removed
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses}
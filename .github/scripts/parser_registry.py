@@ -0,0 +1,157 @@
+"""
+Registry of the artifact parsers known to the metrics pipeline.
+
+Each tool declares its name, a cheap sniffer that recognises its report
+from the first few KB of a file, and the module and function that parse
+it. Parser modules are imported on first use only, so a run that
+processes a single report does not pay for importing the others (notably
+the XML stack used for coverage). Tools whose reports keep their totals in
+a known region also name a bounded totals scanner in summary_scan.
+"""
+
+import importlib
+import os
+import re
+from typing import Callable, Optional
+
+# Bytes read from the start of a file to classify it
+SNIFF_BYTES = 4096
+
+# Extensions considered when scanning an artifacts directory
+ARTIFACT_EXTENSIONS = ('.xml', '.json')
+
+
+class ParserSpec:
+    """How to recognise and parse one tool's report."""
+
+    def __init__(self, name: str, module: str, function: str, sniff: Callable[[bytes, str], bool],
+                 version: int, help: str, summary: Optional[str] = None):
+        self.name = name
+        self.module = module
+        self.function = function
+        self.sniff = sniff
+        # Bump whenever the parser's output changes so cached results are invalidated
+        self.version = version
+        self.help = help
+        self.summary = summary
+        self._parser = None
+
+    def load(self) -> Callable[[str], dict]:
+        """Import the parser module (once) and return the parse function."""
+        if self._parser is None:
+            self._parser = getattr(importlib.import_module(self.module), self.function)
+        return self._parser
+
+    def __call__(self, filepath: str) -> dict:
+        return self.load()(filepath)
+
+    def scan_totals(self, filepath: str) -> Optional[dict]:
+        """Extract only the totals with a bounded scan; None if unsupported or not found."""
+        if self.summary is None:
+            return None
+        return getattr(importlib.import_module('summary_scan'), self.summary)(filepath)
+
+
+def _sniff_clover(head: bytes, filename: str) -> bool:
+    return b'<coverage' in head and b'<project' in head
+
+
+def _sniff_junit(head: bytes, filename: str) -> bool:
+    return b'<testsuites' in head or (b'<testsuite' in head and b'<testcase' in head)
+
+
+def _sniff_phpstan(head: bytes, filename: str) -> bool:
+    return b'"file_errors"' in head
+
+
+SECURITY_SOURCE = re.compile(rb'"source"\s*:\s*"Security\.')
+
+
+def _sniff_security(head: bytes, filename: str) -> bool:
+    # Same format as PHPCS; told apart by the security sniffs' source names (or the file name)
+    return b'"fixable"' in head and (SECURITY_SOURCE.search(head) is not None or 'security' in filename.lower())
+
+
+def _sniff_phpcs(head: bytes, filename: str) -> bool:
+    return b'"fixable"' in head
+
+
+PHPMD_PACKAGE = re.compile(rb'"package"\s*:\s*"phpmd"')
+
+
+def _sniff_phpmd(head: bytes, filename: str) -> bool:
+    return PHPMD_PACKAGE.search(head) is not None
+
+
+def _sniff_jscpd(head: bytes, filename: str) -> bool:
+    return b'"statistics"' in head and (b'"duplicates"' in head or b'"formats"' in head)
+
+
+# Tool name -> parser spec, in the order results appear in the metrics dict.
+# Sniffing tries SNIFF_ORDER so more specific formats win (security before phpcs).
+PARSERS = {
+    spec.name: spec for spec in (
+        ParserSpec('coverage', 'coverage_parser', 'parse_coverage_xml', _sniff_clover, 4, 'Path to coverage.xml',
+                   summary='scan_coverage_totals'),
+        ParserSpec('phpstan', 'report_parsers', 'parse_phpstan_json', _sniff_phpstan, 2, 'Path to phpstan.json',
+                   summary='scan_phpstan_totals'),
+        ParserSpec('phpcs', 'report_parsers', 'parse_phpcs_json', _sniff_phpcs, 3, 'Path to phpcs.json',
+                   summary='scan_phpcs_totals'),
+        ParserSpec('security', 'report_parsers', 'parse_security_json', _sniff_security, 3,
+                   'Path to security-phpcs.json', summary='scan_security_totals'),
+        # PHPMD reports have no totals; summaries always use the full parser
+        ParserSpec('phpmd', 'report_parsers', 'parse_phpmd_json', _sniff_phpmd, 3, 'Path to phpmd.json'),
+        ParserSpec('jscpd', 'report_parsers', 'parse_jscpd_json', _sniff_jscpd, 2, 'Path to jscpd.json',
+                   summary='scan_jscpd_totals'),
+        ParserSpec('junit', 'junit_parser', 'parse_junit_xml', _sniff_junit, 1, 'Path to PHPUnit JUnit XML',
+                   summary='scan_junit_totals'),
+    )
+}
+
+SNIFF_ORDER = ('coverage', 'junit', 'phpstan', 'security', 'phpcs', 'phpmd', 'jscpd')
+
+
+def sniff_artifact(filepath: str) -> Optional[str]:
+    """Return the name of the tool that produced ``filepath``, or None if unrecognised."""
+    try:
+        with open(filepath, 'rb') as f:
+            head = f.read(SNIFF_BYTES)
+    except OSError:
+        return None
+
+    filename = os.path.basename(filepath)
+    for name in SNIFF_ORDER:
+        if PARSERS[name].sniff(head, filename):
+            return name
+    return None
+
+
+def discover_artifacts(directory: str) -> tuple:
+    """Classify the reports under ``directory`` by content.
+
+    Returns ``(found, ignored)``: tool name -> path, and ``(path, tool)``
+    pairs for extra files that looked like an already found tool's report.
+    When several files match the same tool the largest wins, as partial or
+    summary reports tend to be smaller.
+    """
+    candidates = {}
+    for root, dirs, filenames in os.walk(directory):
+        dirs.sort()
+        for filename in sorted(filenames):
+            if not filename.lower().endswith(ARTIFACT_EXTENSIONS):
+                continue
+            path = os.path.join(root, filename)
+            tool = sniff_artifact(path)
+            if tool is not None:
+                candidates.setdefault(tool, []).append(path)
+
+    found = {}
+    ignored = []
+    for tool in PARSERS:
+        paths = candidates.get(tool)
+        if not paths:
+            continue
+        paths.sort(key=os.path.getsize, reverse=True)
+        found[tool] = paths[0]
+        ignored.extend((path, tool) for path in paths[1:])
+    return found, ignored
@@ -0,0 +1,169 @@
+"""
+Coverage of the lines changed by a diff ("patch coverage").
+
+While the Clover report is streamed, each file's executable and covered
+line numbers are appended to ``array`` columns, and when the file ends they
+are packed into a pair of bitmaps (bit ``n`` set for line ``n``), so the
+whole report is kept in about two bits per line. The bitmaps are stored
+base64-encoded because parse results are cached as JSON.
+
+The lines added by a unified diff are then looked up bit by bit, which
+costs one byte index per changed line regardless of the report size.
+"""
+
+import re
+from array import array
+from base64 import b64decode, b64encode
+
+from metrics_common import normalize_path
+
+HUNK_HEADER = re.compile(r'@@ -\d+(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+
+
+def pack_lines(lines: array, size: int) -> bytes:
+    """Pack line numbers into a little-endian bitmap of ``size`` bytes."""
+    # One ASCII digit per line, read back as a base-2 integer: the only
+    # per-line work is a single byte store
+    digits = bytearray(b'0') * (size * 8)
+    for line in lines:
+        digits[line] = 49
+    return int(digits[::-1], 2).to_bytes(size, 'little')
+
+
+class LineBitmap:
+    """Executable and covered lines of one file."""
+
+    __slots__ = ('executable', 'covered')
+
+    def __init__(self):
+        self.executable = array('I')
+        self.covered = array('I')
+
+    def add(self, line: int, covered: bool) -> None:
+        self.executable.append(line)
+        if covered:
+            self.covered.append(line)
+
+    def encode(self) -> list:
+        size = (max(self.executable) >> 3) + 1
+        return [b64encode(pack_lines(lines, size)).decode('ascii') for lines in (self.executable, self.covered)]
+
+
+def _has_line(bitmap: bytes, line: int) -> bool:
+    index = line >> 3
+    return index < len(bitmap) and bool(bitmap[index] >> (line & 7) & 1)
+
+
+def _diff_path(header: str) -> str:
+    """Path from a ``+++`` header line, without the ``b/`` prefix or a trailing timestamp."""
+    path = header[4:].rstrip('\n').split('\t', 1)[0]
+    if path.startswith('b/'):
+        path = path[2:]
+    return path
+
+
+def parse_unified_diff(filepath: str) -> dict:
+    """Return ``{path: array of added line numbers}`` from a unified diff (e.g. ``git diff``).
+
+    Deleted files are skipped. Hunk line counts are tracked, so added lines
+    that happen to start with ``++`` are not mistaken for file headers.
+    """
+    changed = {}
+    current = None
+    old_remaining = new_remaining = 0
+    line_number = 0
+
+    with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if old_remaining > 0 or new_remaining > 0:
+                marker = line[:1]
+                if marker == '+':
+                    if current is not None:
+                        current.append(line_number)
+                    line_number += 1
+                    new_remaining -= 1
+                elif marker == '-':
+                    old_remaining -= 1
+                elif marker == '\\':
+                    # "\ No newline at end of file"
+                    pass
+                else:
+                    # Context line (an empty line is context with its leading space stripped)
+                    line_number += 1
+                    old_remaining -= 1
+                    new_remaining -= 1
+                continue
+
+            if line.startswith('+++ '):
+                path = _diff_path(line)
+                current = None if path == '/dev/null' else changed.setdefault(path, array('I'))
+            elif line.startswith('@@'):
+                match = HUNK_HEADER.match(line)
+                if match is not None:
+                    old_remaining = int(match.group(1) or 1)
+                    line_number = int(match.group(2))
+                    new_remaining = int(match.group(3) or 1)
+
+    return {path: lines for path, lines in changed.items() if lines}
+
+
+def line_ranges(lines: list) -> list:
+    """Collapse sorted line numbers into ``"start-end"`` range strings."""
+    ranges = []
+    start = previous = None
+    for line in lines:
+        if previous is not None and line == previous + 1:
+            previous = line
+            continue
+        if start is not None:
+            ranges.append(str(start) if start == previous else f"{start}-{previous}")
+        start = previous = line
+    if start is not None:
+        ranges.append(str(start) if start == previous else f"{start}-{previous}")
+    return ranges
+
+
+def compute_patch_coverage(bitmaps: dict, changed: dict) -> dict:
+    """Intersect changed lines with the coverage bitmaps (``{path: [executable, covered]}``)."""
+    lookup = {normalize_path(path): encoded for path, encoded in bitmaps.items()}
+    files = {}
+    not_in_report = []
+    total_executable = total_covered = 0
+
+    for path, lines in changed.items():
+        encoded = lookup.get(normalize_path(path))
+        if encoded is None:
+            not_in_report.append(path)
+            continue
+
+        executable, covered = (b64decode(value) for value in encoded)
+        changed_executable = 0
+        uncovered = []
+        for line in sorted(set(lines)):
+            if not _has_line(executable, line):
+                continue
+            changed_executable += 1
+            if not _has_line(covered, line):
+                uncovered.append(line)
+        if not changed_executable:
+            continue
+
+        changed_covered = changed_executable - len(uncovered)
+        total_executable += changed_executable
+        total_covered += changed_covered
+        files[normalize_path(path)] = {
+            'executable': changed_executable,
+            'covered': changed_covered,
+            'coverage': round(changed_covered / changed_executable * 100, 2),
+            'uncovered_lines': line_ranges(uncovered),
+        }
+
+    # Files with the most uncovered changed lines first
+    ordered = sorted(files.items(), key=lambda item: (item[1]['covered'] - item[1]['executable'], item[0]))
+    return {
+        'coverage': round(total_covered / total_executable * 100, 2) if total_executable else None,
+        'executable': total_executable,
+        'covered': total_covered,
+        'files': dict(ordered),
+        'files_not_in_report': sorted(normalize_path(path) for path in not_in_report),
+    }
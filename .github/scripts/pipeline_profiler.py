@@ -0,0 +1,135 @@
+"""
+Per-stage timing and peak-memory instrumentation for the metrics pipeline.
+
+Stages are timed with perf_counter and annotated with the process's peak
+RSS and the number of input bytes they consumed. Optionally every stage is
+also run under cProfile so the slowest one can be dumped for inspection
+with pstats/snakeviz.
+"""
+
+import contextlib
+import cProfile
+import json
+import marshal
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Return the peak resident set size of this process and its finished children."""
+    if resource is None:
+        return None
+
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+@contextlib.contextmanager
+def measure_stage(capture_profile: bool = False):
+    """Time the enclosed block, yielding a dict that receives its measurements.
+
+    With ``capture_profile`` the block also runs under cProfile and the raw
+    stats are stored under ``'_profile'`` (a picklable dict, so it can be
+    returned from worker processes).
+    """
+    record = {}
+    profile = cProfile.Profile() if capture_profile else None
+    started = time.perf_counter()
+    if profile is not None:
+        profile.enable()
+    try:
+        yield record
+    finally:
+        if profile is not None:
+            profile.disable()
+            profile.create_stats()
+            record['_profile'] = profile.stats
+        record['seconds'] = round(time.perf_counter() - started, 4)
+        record['peak_rss_bytes'] = peak_rss_bytes()
+
+
+class PipelineProfiler:
+    """Collects stage measurements for one pipeline run."""
+
+    def __init__(self, enabled: bool = False, capture_profile: bool = False):
+        self.enabled = enabled
+        self.capture_profile = enabled and capture_profile
+        self.stages = {}
+        self._profiles = {}
+        self._started = time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, name: str, input_bytes: Optional[int] = None):
+        """Measure the enclosed block as stage ``name``; a no-op when disabled."""
+        if not self.enabled:
+            yield
+            return
+
+        with measure_stage(self.capture_profile) as record:
+            yield
+        self.record(name, record, input_bytes)
+
+    def record(self, name: str, record: dict, input_bytes: Optional[int] = None) -> None:
+        """Store a measurement taken elsewhere, e.g. in a worker process."""
+        if not self.enabled:
+            return
+
+        record = dict(record)
+        profile = record.pop('_profile', None)
+        if profile is not None:
+            self._profiles[name] = profile
+        if input_bytes is not None:
+            record['input_bytes'] = input_bytes
+        self.stages[name] = record
+
+    def summary(self) -> dict:
+        peaks = [s['peak_rss_bytes'] for s in self.stages.values() if s.get('peak_rss_bytes')]
+        return {
+            'total_seconds': round(time.perf_counter() - self._started, 4),
+            'peak_rss_bytes': max(peaks) if peaks else peak_rss_bytes(),
+            'stages': self.stages,
+        }
+
+    def history_summary(self) -> dict:
+        """Compact per-stage seconds suitable for storing in every history entry."""
+        parse_seconds = sum(s.get('seconds', 0) for name, s in self.stages.items() if name.startswith('parse_'))
+        return {
+            'parse_seconds': round(parse_seconds, 4),
+            'input_bytes': sum(s.get('input_bytes', 0) for s in self.stages.values()),
+            'peak_rss_bytes': self.summary()['peak_rss_bytes'],
+            'stages': {name: s.get('seconds') for name, s in self.stages.items()},
+        }
+
+    def write(self, filepath: str, commit: str) -> None:
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(filepath, 'w') as f:
+            json.dump({
+                'generated_at': datetime.now().isoformat(),
+                'commit': commit,
+                **self.summary(),
+            }, f, indent=2)
+
+    def dump_slowest(self, filepath: str) -> Optional[str]:
+        """Write the cProfile stats of the slowest profiled stage, returning its name."""
+        profiled = [name for name in self.stages if name in self._profiles]
+        if not profiled:
+            return None
+
+        slowest = max(profiled, key=lambda name: self.stages[name].get('seconds', 0))
+        os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+        # Same format as cProfile.Profile.dump_stats, readable with pstats.Stats(filepath)
+        with open(filepath, 'wb') as f:
+            marshal.dump(self._profiles[slowest], f)
+        return slowest
@@ -5,476 +5,414 @@ Generates a metrics dashboard with badges, historical data, and trend charts.
 """
 
 import argparse
+import contextlib
+import functools
+import html
+import io
 import json
 import os
+import posixpath
+import re
 import sys
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Any, Optional
 
-import defusedxml.ElementTree as ET
-
-
-# Rating thresholds
-THRESHOLDS = {
-    'coverage': {'A': 80, 'B': 60, 'C': 40},  # percentage
-    'phpstan': {'A': 0, 'B': 10, 'C': 50},    # error count
-    'phpcs': {'A': 0, 'B': 20, 'C': 100},     # violation count
-    'security': {'A': 0, 'B': 2, 'C': 10},    # issue count
-    'complexity': {'A': 5, 'B': 10, 'C': 20}, # average complexity
-    'duplication': {'A': 3, 'B': 5, 'C': 10}, # percentage
+from directory_tree import TREEMAP_DEPTH, TREEMAP_NODES, DirectoryTrie
+from fleet_summary import build_fleet, fleet_entry, format_fleet_headers, format_fleet_rows, format_rating_counts
+from history_rollup import HistoryRollup, lttb_indices, series_values
+from history_store import JsonHistoryStore, open_history_store
+from metric_anomalies import ANOMALY_WINDOW, ANOMALY_Z, DRIFT_Z, detect_anomalies
+from metrics_common import COLORS, calculate_rating, normalize_path
+from parse_cache import ParseCache, default_cache_dir
+from parser_registry import PARSERS, discover_artifacts
+from patch_coverage import compute_patch_coverage, parse_unified_diff
+from pipeline_profiler import PipelineProfiler, measure_stage
+from snapshot_archive import SnapshotArchive
+from snapshot_diff import build_snapshot, diff_snapshots, has_regressions, short_commit
+from static_output import minify_json_files, publish_data_files, write_gzip_siblings, write_if_changed
+from timing_history import TimingHistory
+
+
+# Per-file/per-class breakdowns are published as sharded files under api/files/
+# and clone hotspots as api/duplication.json, rather than inline in api/metrics.json;
+# line bitmaps are only used to compute patch coverage and per-test timings
+# are kept in history/test_timings.json
+DETAIL_KEYS = ('files', 'classes', 'hotspots', 'line_bitmaps', 'timings')
+
+# History entries only need the totals to draw trend charts
+HISTORY_EXCLUDED_KEYS = DETAIL_KEYS + ('file_breakdown', 'by_source', 'worst_methods', 'slowest',
+                                       'slowest_suites', 'regressions')
+
+# How long raw history entries are kept
+HISTORY_MAX_DAYS = 90
+
+# Expired entries are rolled up into daily aggregates, which are coarsened to
+# weekly after ROLLUP_DAILY_DAYS and to monthly after ROLLUP_WEEKLY_DAYS
+ROLLUP_DAILY_DAYS = 365
+ROLLUP_WEEKLY_DAYS = 3 * 365
+
+# Chart series name -> (tool, metric key) in history entries
+CHART_SERIES = {
+    'coverage': ('coverage', 'line_coverage'),
+    'phpstan': ('phpstan', 'errors'),
+    'phpcs': ('phpcs', 'violations'),
+    'security': ('security', 'issues'),
+    'phpmd': ('phpmd', 'violations'),
+    'duplication': ('jscpd', 'percentage'),
+    'pipeline': ('pipeline', 'parse_seconds'),
 }
 
-# Badge colors
-COLORS = {
-    'A': 'brightgreen',
-    'B': 'green',
-    'C': 'yellow',
-    'D': 'red',
-}
-
-
-def calculate_rating(metric: str, value: float) -> str:
-    """Calculate A/B/C/D rating based on thresholds."""
-    thresholds = THRESHOLDS.get(metric, {})
-
-    # For coverage, higher is better
-    if metric == 'coverage':
-        if value >= thresholds.get('A', 80):
-            return 'A'
-        elif value >= thresholds.get('B', 60):
-            return 'B'
-        elif value >= thresholds.get('C', 40):
-            return 'C'
-        return 'D'
-
-    # For everything else, lower is better
-    if value <= thresholds.get('A', 0):
-        return 'A'
-    elif value <= thresholds.get('B', 10):
-        return 'B'
-    elif value <= thresholds.get('C', 50):
-        return 'C'
-    return 'D'
-
-
-def generate_badge_url(label: str, value: str, rating: str) -> str:
-    """Generate shields.io badge URL."""
-    color = COLORS.get(rating, 'lightgrey')
-    # URL encode spaces and special characters
-    label_encoded = label.replace(' ', '%20').replace('-', '--')
-    value_encoded = value.replace(' ', '%20').replace('-', '--').replace('%', '%25')
-    return f"https://img.shields.io/badge/{label_encoded}-{value_encoded}-{color}"
-
-
-def parse_coverage_xml(filepath: str) -> dict:
-    """Parse PHPUnit Clover coverage XML."""
-    result = {
-        'line_coverage': None,
-        'branch_coverage': None,
-        'lines_covered': 0,
-        'lines_total': 0,
-        'rating': None,
-        'badge_url': None,
+# Default number of points each chart series is downsampled to
+CHART_POINTS = 120
+
+# Repository names in a fleet config double as output directory names
+FLEET_NAME = re.compile(r'^[\w.-]+$')
+
+DEFAULT_FLEET_TEMPLATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'templates', 'fleet.html')
+
+
+def _run_parser(tool: str, filepath: str, capture_profile: bool = False) -> tuple:
+    """Run one parser, capturing its console output so it can be replayed in order.
+
+    Returns ``(result, output, stage)`` where ``stage`` holds the parser's
+    timing and peak RSS as measured in the process that ran it.
+    """
+    buffer = io.StringIO()
+    with measure_stage(capture_profile) as stage, contextlib.redirect_stdout(buffer):
+        result = PARSERS[tool](filepath)
+    return result, buffer.getvalue(), stage
+
+
+def _run_parse_tasks(tasks: dict, jobs: int = 1, cache: Optional[ParseCache] = None,
+                     capture_profile: bool = False) -> dict:
+    """Run ``{key: (tool, path)}`` parse tasks, returning ``{key: (result, output, stage)}``.
+
+    Artifacts found in ``cache`` are not parsed again, and tasks whose
+    artifacts have identical content are parsed once. The rest run on a
+    pool of up to ``jobs`` processes, largest artifact first, so one big
+    report does not start last and hold up the whole pool.
+    """
+    outcomes = {}
+    # Cache key (or task key when uncached) -> tasks sharing that content
+    pending = {}
+    cache_keys = set()
+
+    for key, (tool, path) in tasks.items():
+        if cache is None or not os.path.isfile(path):
+            pending[key] = [key]
+            continue
+        cache_key = cache.key(tool, PARSERS[tool].version, path)
+        if cache_key in pending:
+            pending[cache_key].append(key)
+            continue
+        entry = cache.get(cache_key)
+        if entry is not None:
+            outcomes[key] = (entry['result'], entry['output'], {'seconds': 0.0, 'cached': True})
+        else:
+            pending[cache_key] = [key]
+            cache_keys.add(cache_key)
+
+    def artifact_size(group: str) -> int:
+        path = tasks[pending[group][0]][1]
+        return os.path.getsize(path) if os.path.isfile(path) else 0
+
+    order = sorted(pending, key=artifact_size, reverse=True)
+    results = {}
+    # Groups whose worker died; their placeholder results must not be cached
+    failed = set()
+    if jobs > 1 and len(order) > 1:
+        # Imported on demand: the process pool machinery is slow to import and only used here
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=min(jobs, len(order))) as pool:
+            futures = {group: pool.submit(_run_parser, *tasks[pending[group][0]], capture_profile) for group in order}
+            for group, future in futures.items():
+                try:
+                    results[group] = future.result()
+                except Exception as e:
+                    tool = tasks[pending[group][0]][0]
+                    results[group] = ({}, f"Error: {tool} parser failed: {e}\n", {})
+                    failed.add(group)
+    else:
+        for group in order:
+            results[group] = _run_parser(*tasks[pending[group][0]], capture_profile)
+
+    for group, outcome in results.items():
+        first = pending[group][0]
+        if group in cache_keys and group not in failed:
+            cache.put(group, {'result': outcome[0], 'output': outcome[1]})
+        for key in pending[group]:
+            outcomes[key] = outcome if key == first else (outcome[0], outcome[1], {'seconds': 0.0, 'cached': True})
+
+    return outcomes
+
+
+def collect_metrics(artifacts: dict, outcomes: dict, profiler: Optional[PipelineProfiler] = None) -> dict:
+    """Assemble per-tool results in tool order, replaying each parser's console output."""
+    metrics = {}
+    for tool in PARSERS:
+        result, output, stage = outcomes.get(tool, ({}, '', None))
+        if output:
+            sys.stdout.write(output)
+        if profiler is not None and stage:
+            path = artifacts.get(tool)
+            profiler.record(f"parse_{tool}", stage, os.path.getsize(path) if os.path.isfile(path) else 0)
+        metrics[tool] = result
+
+    return metrics
+
+
+def parse_all(artifacts: dict, jobs: int = 1, cache: Optional[ParseCache] = None,
+              profiler: Optional[PipelineProfiler] = None) -> dict:
+    """Parse every tool's artifact, optionally fanning out over a process pool.
+
+    ``artifacts`` maps tool name to artifact path (or None to skip the tool).
+    Each parser keeps its own error handling, and warnings are printed in
+    tool order once all parsers have finished, so output is identical
+    whatever order the workers complete in. When a ``cache`` is given,
+    artifacts whose content was parsed before are served from it. Each
+    parser is recorded as a ``parse_<tool>`` stage on ``profiler``.
+    """
+    capture_profile = profiler is not None and profiler.capture_profile
+    tasks = {tool: (tool, artifacts[tool]) for tool in PARSERS if artifacts.get(tool)}
+    outcomes = _run_parse_tasks(tasks, jobs=jobs, cache=cache, capture_profile=capture_profile)
+    return collect_metrics(artifacts, outcomes, profiler)
+
+
+def parse_summaries(artifacts: dict) -> dict:
+    """Read only the totals of each artifact, falling back to the full parser where the scan fails.
+
+    Summaries are cheap enough that neither the parse cache nor worker
+    processes are used.
+    """
+    metrics = {}
+    for tool, spec in PARSERS.items():
+        path = artifacts.get(tool)
+        if not path:
+            metrics[tool] = {}
+            continue
+        result = spec.scan_totals(path)
+        if result is None:
+            if spec.summary is not None and os.path.exists(path):
+                print(f"Note: No {tool} totals found near the start or end of {path}, parsing the full report")
+            result = spec(path)
+        metrics[tool] = result
+    return metrics
+
+
+def summarize_for_history(tool_metrics: dict) -> dict:
+    """Strip bulky per-file breakdowns from a tool's metrics before storing in history."""
+    return {k: v for k, v in tool_metrics.items() if k not in HISTORY_EXCLUDED_KEYS}
+
+
+def summarize_for_api(metrics: dict) -> dict:
+    """Strip per-file details from all tools' metrics for api/metrics.json."""
+    return {
+        tool: {k: v for k, v in tool_metrics.items() if k not in DETAIL_KEYS}
+        for tool, tool_metrics in metrics.items()
     }
 
-    if not os.path.exists(filepath):
-        print(f"Warning: Coverage file not found: {filepath}")
-        return result
 
-    try:
-        tree = ET.parse(filepath)
-        root = tree.getroot()
-
-        # Find metrics element (clover format)
-        metrics = root.find('.//metrics')
-        if metrics is not None:
-            statements = int(metrics.get('statements', 0))
-            covered_statements = int(metrics.get('coveredstatements', 0))
-
-            if statements > 0:
-                result['line_coverage'] = round((covered_statements / statements) * 100, 2)
-                result['lines_covered'] = covered_statements
-                result['lines_total'] = statements
-
-        # Also check for project-level metrics
-        project_metrics = root.find('.//project/metrics')
-        if project_metrics is not None and result['line_coverage'] is None:
-            statements = int(project_metrics.get('statements', 0))
-            covered_statements = int(project_metrics.get('coveredstatements', 0))
-
-            if statements > 0:
-                result['line_coverage'] = round((covered_statements / statements) * 100, 2)
-                result['lines_covered'] = covered_statements
-                result['lines_total'] = statements
-
-        if result['line_coverage'] is not None:
-            result['rating'] = calculate_rating('coverage', result['line_coverage'])
-            result['badge_url'] = generate_badge_url(
-                'coverage',
-                f"{result['line_coverage']}%",
-                result['rating']
-            )
-    except ET.ParseError as e:
-        print(f"Error parsing coverage XML: {e}")
-    except Exception as e:
-        print(f"Unexpected error parsing coverage: {e}")
-
-    return result
-
-
-def parse_phpstan_json(filepath: str) -> dict:
-    """Parse PHPStan JSON output."""
-    result = {
-        'errors': None,
-        'files_with_errors': 0,
-        'file_breakdown': [],
-        'rating': None,
-        'badge_url': None,
+# (tool, per-file count key, file index field) joined into the per-file index
+FILE_INDEX_FIELDS = (
+    ('phpstan', 'errors', 'phpstan_errors'),
+    ('phpcs', 'errors', 'phpcs_errors'),
+    ('phpcs', 'warnings', 'phpcs_warnings'),
+    ('security', 'high', 'security_high'),
+    ('security', 'medium', 'security_medium'),
+    ('phpmd', 'violations', 'phpmd_violations'),
+)
+
+
+# Per-file values kept in run snapshots for --compare-to
+SNAPSHOT_FIELDS = ('coverage',) + tuple(field for _, _, field in FILE_INDEX_FIELDS)
+
+
+# Per-file values summed for every directory in api/treemap.json
+TREEMAP_FIELDS = ('statements', 'covered_statements') + tuple(field for _, _, field in FILE_INDEX_FIELDS)
+
+
+def _empty_file_record() -> dict:
+    record = {'coverage': None, 'statements': 0, 'covered_statements': 0}
+    for _, _, field in FILE_INDEX_FIELDS:
+        record[field] = 0
+    return record
+
+
+def render_api_metrics(metrics: dict, commit_sha: str) -> str:
+    """Render the api/metrics.json document."""
+    return json.dumps({
+        'generated_at': datetime.now().isoformat(),
+        'commit': commit_sha,
+        'metrics': summarize_for_api(metrics),
+    }, indent=2)
+
+
+def render_api_duplication(metrics: dict, commit_sha: str) -> Optional[str]:
+    """Render api/duplication.json, or None when the run has no jscpd clone data."""
+    hotspots = metrics.get('jscpd', {}).get('hotspots')
+    if not hotspots:
+        return None
+    return json.dumps({
+        'commit': commit_sha,
+        'clones': metrics['jscpd'].get('clones', 0),
+        'duplicated_lines': metrics['jscpd'].get('duplicated_lines', 0),
+        **hotspots,
+    }, indent=2)
+
+
+def build_file_index(metrics: dict) -> dict:
+    """Join every tool's per-file data into one record per normalized path."""
+    index = {}
+
+    for path, counts in metrics.get('coverage', {}).get('files', {}).items():
+        record = index.setdefault(normalize_path(path), _empty_file_record())
+        record['coverage'] = counts.get('line_coverage')
+        record['statements'] = counts.get('statements', 0)
+        record['covered_statements'] = counts.get('covered_statements', 0)
+
+    for tool, key, field in FILE_INDEX_FIELDS:
+        for path, counts in metrics.get(tool, {}).get('files', {}).items():
+            record = index.get(normalize_path(path))
+            if record is None:
+                record = index[normalize_path(path)] = _empty_file_record()
+            record[field] += counts.get(key, 0)
+
+    return index
+
+
+def render_api_treemap(index: dict, commit_sha: str, max_depth: int = TREEMAP_DEPTH,
+                       max_nodes: int = TREEMAP_NODES) -> Optional[str]:
+    """Render api/treemap.json from the per-file index, or None when there are no files."""
+    if not index:
+        return None
+    trie = DirectoryTrie.from_index(index, TREEMAP_FIELDS)
+    return json.dumps({
+        'commit': commit_sha,
+        'max_depth': max_depth,
+        'max_nodes': max_nodes,
+        'weakest': trie.weakest(),
+        'tree': trie.treemap(max_depth, max_nodes),
+    }, separators=(',', ':'))
+
+
+def shard_file_path(path: str) -> Optional[str]:
+    """Return ``path`` as a relative POSIX path for the file shards, or None if it escapes the tree.
+
+    Absolute paths that were not under the container root are re-rooted at
+    the top of the tree; paths that still climb out with ``..`` are rejected.
+    """
+    relative = posixpath.normpath(path.replace('\\', '/')).lstrip('/')
+    if relative in ('', '.', '..') or relative.startswith('../'):
+        return None
+    return relative
+
+
+def build_file_shards(index: dict) -> dict:
+    """Split the per-file index into one JSON shard per directory.
+
+    Each shard (``<dir>/index.json``, the root at ``index.json``) lists the
+    records of the files directly in that directory plus the names of its
+    subdirectories, so the dashboard can load only the part of the tree
+    being browsed. Returns shard contents keyed by path relative to api/files/.
+    Files whose path escapes the tree (see shard_file_path) are left out.
+    """
+    shards = {}
+
+    def shard_for(directory: str) -> dict:
+        shard = shards.get(directory)
+        if shard is None:
+            shard = shards[directory] = {'directories': set(), 'files': {}}
+            if directory:
+                parent, child = posixpath.split(directory)
+                shard_for(parent)['directories'].add(child)
+        return shard
+
+    shard_for('')
+    skipped = 0
+    for path, record in index.items():
+        relative = shard_file_path(path)
+        if relative is None:
+            skipped += 1
+            continue
+        directory, name = posixpath.split(relative)
+        shard_for(directory)['files'][name] = record
+    if skipped:
+        print(f"Warning: Left {skipped} file(s) with paths outside the project out of api/files/")
+
+    return {
+        posixpath.join(directory, 'index.json'): json.dumps({
+            'path': directory,
+            'directories': sorted(shard['directories']),
+            'files': shard['files'],
+        }, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        for directory, shard in shards.items()
     }
 
-    if not os.path.exists(filepath):
-        print(f"Warning: PHPStan file not found: {filepath}")
-        return result
 
-    try:
-        with open(filepath, 'r') as f:
-            data = json.load(f)
-
-        result['errors'] = data.get('totals', {}).get('errors', 0)
-
-        # Count files with errors
-        files = data.get('files', {})
-        result['files_with_errors'] = len([f for f, d in files.items() if d.get('errors', 0) > 0])
-
-        # Get top files by error count
-        file_errors = [(f, d.get('errors', 0)) for f, d in files.items()]
-        file_errors.sort(key=lambda x: x[1], reverse=True)
-        result['file_breakdown'] = file_errors[:10]
-
-        if result['errors'] is not None:
-            result['rating'] = calculate_rating('phpstan', result['errors'])
-            result['badge_url'] = generate_badge_url(
-                'PHPStan',
-                str(result['errors']) + ' errors' if result['errors'] != 1 else '1 error',
-                result['rating']
-            )
-    except json.JSONDecodeError as e:
-        print(f"Error parsing PHPStan JSON: {e}")
-    except Exception as e:
-        print(f"Unexpected error parsing PHPStan: {e}")
-
-    return result
-
-
-def parse_phpcs_json(filepath: str) -> dict:
-    """Parse PHP CodeSniffer JSON output."""
-    result = {
-        'violations': None,
-        'errors': 0,
-        'warnings': 0,
-        'files_affected': 0,
-        'rating': None,
-        'badge_url': None,
-    }
+def write_file_index(output_dir: str, index: dict) -> int:
+    """Write the per-file index as one JSON shard per directory under api/files/.
 
-    if not os.path.exists(filepath):
-        print(f"Warning: PHPCS file not found: {filepath}")
-        return result
+    Shards for directories that no longer exist are removed. Returns the
+    number of shards written.
+    """
+    files_dir = os.path.join(output_dir, 'api', 'files')
 
-    try:
-        with open(filepath, 'r') as f:
-            data = json.load(f)
-
-        totals = data.get('totals', {})
-        result['errors'] = totals.get('errors', 0)
-        result['warnings'] = totals.get('warnings', 0)
-        result['violations'] = result['errors'] + result['warnings']
-
-        # Count files affected
-        files = data.get('files', {})
-        result['files_affected'] = len([f for f, d in files.items()
-                                        if d.get('errors', 0) > 0 or d.get('warnings', 0) > 0])
-
-        if result['violations'] is not None:
-            result['rating'] = calculate_rating('phpcs', result['violations'])
-            result['badge_url'] = generate_badge_url(
-                'code%20style',
-                str(result['violations']) + ' issues',
-                result['rating']
-            )
-    except json.JSONDecodeError as e:
-        print(f"Error parsing PHPCS JSON: {e}")
-    except Exception as e:
-        print(f"Unexpected error parsing PHPCS: {e}")
-
-    return result
-
-
-def parse_security_json(filepath: str) -> dict:
-    """Parse security audit JSON output (phpcs-security-audit format)."""
-    result = {
-        'issues': None,
-        'high': 0,
-        'medium': 0,
-        'low': 0,
-        'rating': None,
-        'badge_url': None,
-    }
+    written = set()
+    for relative_path, content in build_file_shards(index).items():
+        shard_path = os.path.join(files_dir, *relative_path.split('/'))
+        os.makedirs(os.path.dirname(shard_path), exist_ok=True)
+        write_if_changed(shard_path, content)
+        written.add(os.path.normpath(shard_path))
 
-    if not os.path.exists(filepath):
-        print(f"Warning: Security file not found: {filepath}")
-        return result
+    # Drop shards left behind by directories that have disappeared
+    for root, _, filenames in os.walk(files_dir):
+        for filename in filenames:
+            path = os.path.normpath(os.path.join(root, filename))
+            if filename == 'index.json' and path not in written:
+                os.remove(path)
 
-    try:
-        with open(filepath, 'r') as f:
-            data = json.load(f)
-
-        totals = data.get('totals', {})
-        result['high'] = totals.get('errors', 0)
-        result['medium'] = totals.get('warnings', 0)
-        result['issues'] = result['high'] + result['medium']
-
-        if result['issues'] is not None:
-            result['rating'] = calculate_rating('security', result['issues'])
-            result['badge_url'] = generate_badge_url(
-                'security',
-                str(result['issues']) + ' issues',
-                result['rating']
-            )
-    except json.JSONDecodeError as e:
-        print(f"Error parsing security JSON: {e}")
-    except Exception as e:
-        print(f"Unexpected error parsing security: {e}")
-
-    return result
-
-
-def parse_phploc_json(filepath: str) -> dict:
-    """Parse PHPLOC JSON output."""
-    result = {
-        'loc': None,
-        'lloc': None,
-        'classes': None,
-        'methods': None,
-        'avg_complexity': None,
-        'max_complexity': None,
-        'rating': None,
-        'badge_url': None,
-    }
+    return len(written)
 
-    if not os.path.exists(filepath):
-        print(f"Warning: PHPLOC file not found: {filepath}")
-        return result
 
-    try:
-        with open(filepath, 'r') as f:
-            data = json.load(f)
-
-        result['loc'] = data.get('loc', 0)
-        result['lloc'] = data.get('lloc', 0)
-        result['classes'] = data.get('classes', 0)
-        result['methods'] = data.get('methods', 0)
-
-        # Complexity metrics
-        result['avg_complexity'] = data.get('ccnByLloc', 0)
-        if result['avg_complexity'] == 0:
-            # Try alternative key
-            methods = data.get('methods', 1)
-            ccn = data.get('ccn', 0)
-            if methods > 0:
-                result['avg_complexity'] = round(ccn / methods, 2)
-
-        result['max_complexity'] = data.get('ccnMax', 0)
-
-        if result['avg_complexity'] is not None:
-            result['rating'] = calculate_rating('complexity', result['avg_complexity'])
-            result['badge_url'] = generate_badge_url(
-                'complexity',
-                f"avg {result['avg_complexity']}",
-                result['rating']
-            )
-    except json.JSONDecodeError as e:
-        print(f"Error parsing PHPLOC JSON: {e}")
-    except Exception as e:
-        print(f"Unexpected error parsing PHPLOC: {e}")
-
-    return result
-
-
-def parse_phpmd_json(filepath: str) -> dict:
-    """Parse PHPMD JSON output."""
-    result = {
-        'violations': None,
-        'by_ruleset': {},
-        'files_affected': 0,
-        'rating': None,
-        'badge_url': None,
+def metric_totals(metrics: dict) -> dict:
+    """Headline value of every charted tool, keyed by series name."""
+    return {
+        name: metrics.get(tool, {}).get(key)
+        for name, (tool, key) in CHART_SERIES.items()
+        if tool in metrics
     }
 
-    if not os.path.exists(filepath):
-        print(f"Warning: PHPMD file not found: {filepath}")
-        return result
 
-    try:
-        with open(filepath, 'r') as f:
-            data = json.load(f)
-
-        # PHPMD JSON format may vary
-        if isinstance(data, dict):
-            files = data.get('files', [])
-            total_violations = 0
-            rulesets = {}
-            affected_files = set()
-
-            for file_info in files:
-                violations = file_info.get('violations', [])
-                total_violations += len(violations)
-                affected_files.add(file_info.get('file', ''))
-
-                for v in violations:
-                    ruleset = v.get('ruleSet', 'unknown')
-                    rulesets[ruleset] = rulesets.get(ruleset, 0) + 1
-
-            result['violations'] = total_violations
-            result['by_ruleset'] = rulesets
-            result['files_affected'] = len(affected_files)
-
-            # Calculate rating based on violations (using same thresholds as phpcs)
-            if result['violations'] is not None:
-                result['rating'] = calculate_rating('phpcs', result['violations'])
-                result['badge_url'] = generate_badge_url(
-                    'PHPMD',
-                    str(result['violations']) + ' issues',
-                    result['rating']
-                )
-    except json.JSONDecodeError as e:
-        print(f"Error parsing PHPMD JSON: {e}")
-    except Exception as e:
-        print(f"Unexpected error parsing PHPMD: {e}")
-
-    return result
-
-
-def parse_jscpd_json(filepath: str) -> dict:
-    """Parse jscpd JSON output."""
-    result = {
-        'duplicates': None,
-        'percentage': None,
-        'clones': 0,
-        'duplicated_lines': 0,
-        'total_lines': 0,
-        'by_language': {},
-        'rating': None,
-        'badge_url': None,
+def build_history_entry(metrics: dict, commit_sha: str, timestamp: Optional[datetime] = None) -> dict:
+    """Build the history entry recorded for one run."""
+    timestamp = timestamp or datetime.now()
+
+    return {
+        'timestamp': timestamp.isoformat(),
+        'date': timestamp.strftime('%Y-%m-%d'),
+        'commit': commit_sha[:8] if commit_sha else 'unknown',
+        'coverage': summarize_for_history(metrics.get('coverage', {})),
+        'phpstan': summarize_for_history(metrics.get('phpstan', {})),
+        'phpcs': summarize_for_history(metrics.get('phpcs', {})),
+        'security': summarize_for_history(metrics.get('security', {})),
+        'phpmd': summarize_for_history(metrics.get('phpmd', {})),
+        'jscpd': summarize_for_history(metrics.get('jscpd', {})),
+        'junit': summarize_for_history(metrics.get('junit', {})),
     }
 
-    if not os.path.exists(filepath):
-        print(f"Warning: jscpd file not found: {filepath}")
-        return result
-
-    try:
-        with open(filepath, 'r') as f:
-            data = json.load(f)
-
-        statistics = data.get('statistics', {})
-
-        # jscpd has totals either in statistics directly or in statistics.total
-        totals = statistics.get('total', statistics)
-
-        # jscpd format
-        result['clones'] = totals.get('clones', 0)
-        result['duplicated_lines'] = totals.get('duplicatedLines', 0)
-        result['total_lines'] = totals.get('lines', 0)
-
-        # Extract per-language breakdown
-        formats = statistics.get('formats', {})
-        for lang, lang_data in formats.items():
-            # Handle both formats: direct stats or nested in 'sources'
-            if isinstance(lang_data, dict):
-                # Check if it has direct stats or sources
-                if 'sources' in lang_data and isinstance(lang_data['sources'], dict):
-                    # Real jscpd output: aggregate from sources
-                    lang_clones = sum(s.get('clones', 0) for s in lang_data['sources'].values())
-                    lang_dup_lines = sum(s.get('duplicatedLines', 0) for s in lang_data['sources'].values())
-                    lang_lines = sum(s.get('lines', 0) for s in lang_data['sources'].values())
-                    lang_pct = round((lang_dup_lines / lang_lines * 100) if lang_lines > 0 else 0, 2)
-                else:
-                    # Fixture format: direct stats
-                    lang_clones = lang_data.get('clones', 0)
-                    lang_dup_lines = lang_data.get('duplicatedLines', 0)
-                    lang_lines = lang_data.get('lines', 0)
-                    lang_pct = round(lang_data.get('percentage', 0), 2)
-
-                result['by_language'][lang] = {
-                    'clones': lang_clones,
-                    'duplicated_lines': lang_dup_lines,
-                    'lines': lang_lines,
-                    'percentage': lang_pct
-                }
-
-        # Calculate percentage
-        if 'percentage' in totals:
-            result['percentage'] = round(totals['percentage'], 2)
-        elif result['total_lines'] > 0:
-            result['percentage'] = round(
-                (result['duplicated_lines'] / result['total_lines']) * 100, 2
-            )
-        else:
-            result['percentage'] = 0
 
-        result['duplicates'] = result['clones']
-
-        if result['percentage'] is not None:
-            result['rating'] = calculate_rating('duplication', result['percentage'])
-            result['badge_url'] = generate_badge_url(
-                'duplication',
-                f"{result['percentage']}%",
-                result['rating']
-            )
-    except json.JSONDecodeError as e:
-        print(f"Error parsing jscpd JSON: {e}")
-    except Exception as e:
-        print(f"Unexpected error parsing jscpd: {e}")
-
-    return result
-
-
-def load_historical_data(filepath: str, max_days: int = 90) -> list:
+def load_historical_data(filepath: str, max_days: int = HISTORY_MAX_DAYS) -> list:
     """Load and prune historical data."""
-    history = []
-
-    if os.path.exists(filepath):
-        try:
-            with open(filepath, 'r') as f:
-                history = json.load(f)
-        except (json.JSONDecodeError, IOError):
-            history = []
-
     # Prune old entries (keep last max_days)
     cutoff = datetime.now() - timedelta(days=max_days)
-    cutoff_str = cutoff.isoformat()
-
-    history = [
-        entry for entry in history
-        if entry.get('timestamp', '') >= cutoff_str
-    ]
-
-    return history
 
+    return JsonHistoryStore(filepath).entries(since=cutoff.isoformat())
 
-def save_historical_data(filepath: str, history: list) -> None:
-    """Save historical data to JSON file."""
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
-    with open(filepath, 'w') as f:
-        json.dump(history, f, indent=2)
-
-
-def generate_badges(output_dir: str, metrics: dict) -> None:
-    """Generate SVG badge files locally."""
-    badges_dir = os.path.join(output_dir, 'badges')
-    os.makedirs(badges_dir, exist_ok=True)
 
+def build_badges(metrics: dict) -> dict:
+    """Render the SVG badges for ``metrics``, keyed by file name."""
     badge_configs = [
         ('coverage', metrics.get('coverage', {}).get('line_coverage'), '%', 'coverage'),
         ('phpstan', metrics.get('phpstan', {}).get('errors'), ' errors', 'phpstan'),
@@ -482,23 +420,65 @@ def generate_badges(output_dir: str, metrics: dict) -> None:
         ('security', metrics.get('security', {}).get('issues'), ' issues', 'security'),
         ('phpmd', metrics.get('phpmd', {}).get('violations'), ' issues', 'phpcs'),  # Use phpcs thresholds
         ('duplication', metrics.get('jscpd', {}).get('percentage'), '%', 'duplication'),
+        ('tests', metrics.get('junit', {}).get('total_seconds'), 's', 'test_runtime'),
     ]
 
+    badges = {}
     for label, value, suffix, metric_key in badge_configs:
         if value is not None:
             rating = calculate_rating(metric_key, value)
             color = COLORS.get(rating, 'lightgrey')
 
             # Create simple SVG badge
-            svg = create_svg_badge(label, f"{value}{suffix}", color)
+            badges[f"{label}.svg"] = create_svg_badge(label, f"{value}{suffix}", color)
+
+    return badges
 
-            badge_path = os.path.join(badges_dir, f"{label}.svg")
-            with open(badge_path, 'w') as f:
-                f.write(svg)
 
+def generate_badges(output_dir: str, metrics: dict) -> int:
+    """Generate SVG badge files locally, returning how many files were rewritten."""
+    badges_dir = os.path.join(output_dir, 'badges')
+    os.makedirs(badges_dir, exist_ok=True)
+
+    rewritten = 0
+    for filename, svg in build_badges(metrics).items():
+        if write_if_changed(os.path.join(badges_dir, filename), svg.encode('utf-8')):
+            rewritten += 1
+
+    return rewritten
+
+
+# Approximate advance widths (px) of Verdana at 11px, as used by shields.io badges
+CHAR_WIDTHS = {
+    ' ': 3.87, '!': 4.33, '%': 11.87, '(': 4.99, ')': 4.99, '-': 4.99, '.': 3.87, '/': 4.99,
+    ':': 4.99, '_': 7.0,
+    'a': 6.65, 'b': 6.83, 'c': 5.73, 'd': 6.83, 'e': 6.59, 'f': 3.78, 'g': 6.83, 'h': 6.97,
+    'i': 3.01, 'j': 3.78, 'k': 6.35, 'l': 3.01, 'm': 10.7, 'n': 6.97, 'o': 6.68, 'p': 6.83,
+    'q': 6.83, 'r': 4.69, 's': 5.73, 't': 4.33, 'u': 6.97, 'v': 6.35, 'w': 9.0, 'x': 6.35,
+    'y': 6.35, 'z': 5.63,
+    'A': 7.5, 'B': 7.54, 'C': 7.66, 'D': 8.48, 'E': 6.95, 'F': 6.32, 'G': 8.5, 'H': 8.27,
+    'I': 4.62, 'J': 4.62, 'K': 7.62, 'L': 6.16, 'M': 9.27, 'N': 8.22, 'O': 8.65, 'P': 6.64,
+    'Q': 8.65, 'R': 7.65, 'S': 7.5, 'T': 6.78, 'U': 8.05, 'V': 7.5, 'W': 10.87, 'X': 7.54,
+    'Y': 6.77, 'Z': 7.54,
+    **{digit: 7.0 for digit in '0123456789'},
+}
 
+# Width used for characters missing from CHAR_WIDTHS
+DEFAULT_CHAR_WIDTH = 7.0
+
+
+def text_width(text: str) -> int:
+    """Estimate the rendered width of ``text`` in pixels from the character width table."""
+    return round(sum(CHAR_WIDTHS.get(char, DEFAULT_CHAR_WIDTH) for char in text))
+
+
+@functools.lru_cache(maxsize=256)
 def create_svg_badge(label: str, value: str, color: str) -> str:
-    """Create a simple SVG badge."""
+    """Create a simple SVG badge.
+
+    Output depends only on the arguments, so results are memoized and
+    identical inputs always produce byte-identical SVG.
+    """
     color_map = {
         'brightgreen': '#4c1',
         'green': '#97ca00',
@@ -508,9 +488,11 @@ def create_svg_badge(label: str, value: str, color: str) -> str:
     }
     hex_color = color_map.get(color, '#9f9f9f')
 
-    label_width = len(label) * 7 + 10
-    value_width = len(value) * 7 + 10
+    label_width = text_width(label) + 10
+    value_width = text_width(value) + 10
     total_width = label_width + value_width
+    label = html.escape(label)
+    value = html.escape(value)
 
     return f'''<svg xmlns="http://www.w3.org/2000/svg" width="{total_width}" height="20">
   <linearGradient id="b" x2="0" y2="100%">
@@ -562,11 +544,189 @@ def format_ruleset_breakdown(by_ruleset: dict) -> str:
     return ' | '.join(parts)
 
 
-def generate_dashboard_html(template_path: str, output_path: str, metrics: dict, history: list, commit_sha: str) -> None:
-    """Generate the dashboard HTML from template."""
-    # Read template
-    with open(template_path, 'r') as f:
-        template = f.read()
+def format_complexity_histogram(histogram: dict) -> str:
+    """Format the method complexity histogram as HTML."""
+    if not histogram:
+        return ''
+
+    return ' | '.join(f"<strong>{bucket}</strong>: {count}" for bucket, count in histogram.items())
+
+
+def format_test_durations(tests: list, limit: int = 5) -> str:
+    """Format the slowest tests as an HTML list."""
+    if not tests:
+        return ''
+
+    items = []
+    for test in tests[:limit]:
+        name = test['test'].rsplit('\\', 1)[-1]
+        items.append(f"<li title=\"{html.escape(test['test'])}\"><code>{html.escape(name)}</code> "
+                     f"{test['seconds']}s</li>")
+
+    return '<ol>' + ''.join(items) + '</ol>'
+
+
+def format_test_regressions(regressions: list, limit: int = 5) -> str:
+    """Format tests slower than their rolling median as an HTML list."""
+    if not regressions:
+        return ''
+
+    items = []
+    for test in regressions[:limit]:
+        name = test['test'].rsplit('\\', 1)[-1]
+        items.append(f"<li title=\"{html.escape(test['test'])}\"><code>{html.escape(name)}</code> "
+                     f"{test['seconds']}s (median {test['median_seconds']}s)</li>")
+
+    more = f" and {len(regressions) - limit} more" if len(regressions) > limit else ''
+    return f'<strong>Slower than usual{more}:</strong><ul>' + ''.join(items) + '</ul>'
+
+
+def format_anomaly(tool_metrics: dict) -> str:
+    """Format the latest run's rolling-statistics flags for a dashboard card."""
+    anomaly = tool_metrics.get('anomaly') or {}
+    if not anomaly.get('flags'):
+        return ''
+
+    css = 'anomaly-regression' if anomaly['regression'] else 'anomaly-improvement'
+    if 'spike' in anomaly['flags']:
+        change = f"Unusual {'rise' if anomaly['z'] > 0 else 'drop'}"
+        if anomaly['std']:
+            text = f"{change}: {abs(anomaly['z'])}&sigma; from the recent mean of {anomaly['mean']}"
+        else:
+            # A flat history has no spread to measure the change against
+            text = f"{change}: {anomaly['value']} after a steady {anomaly['mean']}"
+    else:
+        text = (f"Drifting {'up' if anomaly['ewma'] > anomaly['mean'] else 'down'}: "
+                f"trend {anomaly['ewma']} vs recent mean {anomaly['mean']}")
+    return f'<div class="anomaly {css}">{text}</div>'
+
+
+def format_worst_methods(methods: list) -> str:
+    """Format the highest-CRAP methods as an HTML list."""
+    if not methods:
+        return ''
+
+    items = []
+    for method in methods:
+        name = html.escape(f"{posixpath.basename(method['file'])}::{method['method']}")
+        items.append(
+            f"<li title=\"{html.escape(method['file'])}\"><code>{name}</code> "
+            f"CRAP {method['crap']} (CC {method['complexity']}, {method['coverage']}%)</li>"
+        )
+
+    return '<ol>' + ''.join(items) + '</ol>'
+
+
+# Matches {{ name }} placeholders in dashboard templates
+PLACEHOLDER_PATTERN = re.compile(r'\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}')
+
+# Compiled templates keyed by (path, mtime, size)
+_template_cache = {}
+
+
+def compile_template(template: str) -> tuple:
+    """Compile a template into a render plan.
+
+    The plan alternates literal chunks (even indexes) and placeholder names
+    (odd indexes), so rendering is a single join with no rescanning.
+    """
+    return tuple(PLACEHOLDER_PATTERN.split(template))
+
+
+def load_template(template_path: str) -> tuple:
+    """Load and compile a template, reusing the cached plan while the file is unchanged."""
+    stat = os.stat(template_path)
+    key = (os.path.abspath(template_path), stat.st_mtime_ns, stat.st_size)
+
+    plan = _template_cache.get(key)
+    if plan is None:
+        with open(template_path, 'r') as f:
+            plan = compile_template(f.read())
+        _template_cache[key] = plan
+
+    return plan
+
+
+def render_template(plan: tuple, values: dict) -> str:
+    """Render a compiled template in one pass.
+
+    None values render as 'N/A'. Placeholders without a value are left in
+    place, and both they and values the template never uses are reported.
+    """
+    parts = list(plan)
+    missing = set()
+
+    for i in range(1, len(parts), 2):
+        name = parts[i]
+        if name in values:
+            value = values[name]
+            parts[i] = str(value) if value is not None else 'N/A'
+        else:
+            missing.add(name)
+            parts[i] = '{{ ' + name + ' }}'
+
+    unused = set(values) - set(plan[1::2])
+    if missing:
+        print(f"Warning: template placeholders without a value: {', '.join(sorted(missing))}")
+    if unused:
+        print(f"Warning: template values not used by the template: {', '.join(sorted(unused))}")
+
+    return ''.join(parts)
+
+
+def build_chart_data(history: list, rollup_points: Optional[list] = None, budget: int = CHART_POINTS) -> dict:
+    """Build chart series from rolled-up and raw history.
+
+    Aggregated buckets contribute their mean and precede the raw entries.
+    Each series is downsampled to ``budget`` points with LTTB, and the labels
+    are the union of the points kept for any series.
+    """
+    timeline = [
+        (point['date'], {name: aggregate['mean'] for name, aggregate in point['series'].items()})
+        for point in rollup_points or []
+    ]
+    timeline.extend((entry.get('date', '')[:10], series_values(entry, CHART_SERIES)) for entry in history)
+
+    # Points are evenly spaced on the dashboard's category axis, so use positions as x
+    xs = list(range(len(timeline)))
+    columns = [[values.get(name) for _, values in timeline] for name in CHART_SERIES]
+
+    # All series share one label axis, so the union of the points each keeps
+    # must fit the budget: shrink the per-series budget until it does (it
+    # always fits once each series keeps budget // len(CHART_SERIES) points)
+    per_series = budget
+    while True:
+        selected = set()
+        for ys in columns:
+            selected.update(lttb_indices(xs, ys, per_series))
+        if budget <= 0 or len(selected) <= budget or per_series <= 2:
+            break
+        # Every series keeps at least its first and last points
+        per_series = max(2, min(per_series - 1, per_series * budget // len(selected)))
+    selected = sorted(selected)
+    if budget > 0 and len(selected) > budget:
+        # Only reachable with a budget below two points per series; keep them evenly spaced
+        step = len(selected) / budget
+        selected = [selected[int(i * step)] for i in range(budget)]
+
+    chart_data = {'labels': [timeline[i][0] for i in selected]}
+    for name in CHART_SERIES:
+        chart_data[name] = [timeline[i][1].get(name) for i in selected]
+
+    return chart_data
+
+
+def render_dashboard_html(template_path: str, metrics: dict, history: list, commit_sha: str,
+                          rollup_points: Optional[list] = None, chart_points: int = CHART_POINTS,
+                          asset_urls: Optional[dict] = None) -> str:
+    """Render the dashboard HTML from template.
+
+    ``asset_urls`` is the manifest from publish_data_files(); chart data and
+    the history link then point at the published files instead of being
+    inlined.
+    """
+    asset_urls = asset_urls or {}
+    plan = load_template(template_path)
 
     # Prepare template variables
     coverage = metrics.get('coverage', {})
@@ -575,52 +735,73 @@ def generate_dashboard_html(template_path: str, output_path: str, metrics: dict,
     security = metrics.get('security', {})
     phpmd = metrics.get('phpmd', {})
     jscpd = metrics.get('jscpd', {})
-
-    # Format history for charts
-    chart_data = {
-        'labels': [entry.get('date', '')[:10] for entry in history[-30:]],
-        'coverage': [entry.get('coverage', {}).get('line_coverage') for entry in history[-30:]],
-        'phpstan': [entry.get('phpstan', {}).get('errors') for entry in history[-30:]],
-        'phpcs': [entry.get('phpcs', {}).get('violations') for entry in history[-30:]],
-        'security': [entry.get('security', {}).get('issues') for entry in history[-30:]],
-        'phpmd': [entry.get('phpmd', {}).get('violations') for entry in history[-30:]],
-        'duplication': [entry.get('jscpd', {}).get('percentage') for entry in history[-30:]],
+    complexity = coverage.get('complexity') or {}
+    junit = metrics.get('junit', {})
+
+    chart_data_url = asset_urls.get('chart_data', '')
+    chart_data = None if chart_data_url else build_chart_data(history, rollup_points, chart_points)
+
+    # Template values, keyed by placeholder name
+    values = {
+        'coverage_value': str(coverage.get('line_coverage', 'N/A')),
+        'coverage_rating': coverage.get('rating', 'N/A'),
+        'coverage_lines': f"{coverage.get('lines_covered', 0)}/{coverage.get('lines_total', 0)}",
+        'phpstan_errors': str(phpstan.get('errors', 'N/A')),
+        'phpstan_rating': phpstan.get('rating', 'N/A'),
+        'phpstan_files': str(phpstan.get('files_with_errors', 0)),
+        'phpcs_violations': str(phpcs.get('violations', 'N/A')),
+        'phpcs_rating': phpcs.get('rating', 'N/A'),
+        'phpcs_errors': str(phpcs.get('errors', 0)),
+        'phpcs_warnings': str(phpcs.get('warnings', 0)),
+        'security_issues': str(security.get('issues', 'N/A')),
+        'security_rating': security.get('rating', 'N/A'),
+        'security_high': str(security.get('high', 0)),
+        'security_medium': str(security.get('medium', 0)),
+        'phpmd_violations': str(phpmd.get('violations', 'N/A')),
+        'phpmd_rating': phpmd.get('rating', 'N/A'),
+        'phpmd_files': str(phpmd.get('files_affected', 0)),
+        'phpmd_rulesets': format_ruleset_breakdown(phpmd.get('by_ruleset', {})),
+        'duplication_percentage': str(jscpd.get('percentage', 'N/A')),
+        'duplication_rating': jscpd.get('rating', 'N/A'),
+        'duplication_clones': str(jscpd.get('clones', 0)),
+        'duplication_lines': str(jscpd.get('duplicated_lines', 0)),
+        'duplication_by_language': format_language_breakdown(jscpd.get('by_language', {})),
+        'complexity_mean': str(complexity.get('mean', 'N/A')),
+        'complexity_rating': complexity.get('rating', 'N/A'),
+        'complexity_percentiles': f"{complexity.get('p50', 'N/A')} / {complexity.get('p90', 'N/A')} / {complexity.get('p99', 'N/A')}",
+        'complexity_max': str(complexity.get('max', 'N/A')),
+        'complexity_crap_risky': str(complexity.get('crap_above_threshold', 0)),
+        'complexity_histogram': format_complexity_histogram(complexity.get('histogram', {})),
+        'complexity_worst_methods': format_worst_methods(coverage.get('worst_methods', [])),
+        'tests_total': str(junit.get('total_seconds', 'N/A')),
+        'tests_rating': junit.get('rating', 'N/A'),
+        'tests_count': str(junit.get('tests', 'N/A')),
+        'tests_percentiles': f"{junit.get('p50', 'N/A')}s / {junit.get('p95', 'N/A')}s",
+        'tests_failures': str(junit.get('failures', 0) + junit.get('errors', 0)),
+        'tests_slowest': format_test_durations(junit.get('slowest', [])),
+        'tests_regressions': format_test_regressions(junit.get('regressions', [])),
+        'coverage_anomaly': format_anomaly(coverage),
+        'phpstan_anomaly': format_anomaly(phpstan),
+        'phpcs_anomaly': format_anomaly(phpcs),
+        'security_anomaly': format_anomaly(security),
+        'phpmd_anomaly': format_anomaly(phpmd),
+        'duplication_anomaly': format_anomaly(jscpd),
+        'chart_data_json': json.dumps(chart_data),
+        'chart_data_url': chart_data_url,
+        'history_url': asset_urls.get('history', 'history/all.json'),
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC'),
+        'commit_sha': commit_sha[:8] if commit_sha else 'unknown',
+        'commit_sha_full': commit_sha or 'unknown',
     }
 
-    # Replace template variables
-    replacements = {
-        '{{ coverage_value }}': str(coverage.get('line_coverage', 'N/A')),
-        '{{ coverage_rating }}': coverage.get('rating', 'N/A'),
-        '{{ coverage_lines }}': f"{coverage.get('lines_covered', 0)}/{coverage.get('lines_total', 0)}",
-        '{{ phpstan_errors }}': str(phpstan.get('errors', 'N/A')),
-        '{{ phpstan_rating }}': phpstan.get('rating', 'N/A'),
-        '{{ phpstan_files }}': str(phpstan.get('files_with_errors', 0)),
-        '{{ phpcs_violations }}': str(phpcs.get('violations', 'N/A')),
-        '{{ phpcs_rating }}': phpcs.get('rating', 'N/A'),
-        '{{ phpcs_errors }}': str(phpcs.get('errors', 0)),
-        '{{ phpcs_warnings }}': str(phpcs.get('warnings', 0)),
-        '{{ security_issues }}': str(security.get('issues', 'N/A')),
-        '{{ security_rating }}': security.get('rating', 'N/A'),
-        '{{ security_high }}': str(security.get('high', 0)),
-        '{{ security_medium }}': str(security.get('medium', 0)),
-        '{{ phpmd_violations }}': str(phpmd.get('violations', 'N/A')),
-        '{{ phpmd_rating }}': phpmd.get('rating', 'N/A'),
-        '{{ phpmd_files }}': str(phpmd.get('files_affected', 0)),
-        '{{ phpmd_rulesets }}': format_ruleset_breakdown(phpmd.get('by_ruleset', {})),
-        '{{ duplication_percentage }}': str(jscpd.get('percentage', 'N/A')),
-        '{{ duplication_rating }}': jscpd.get('rating', 'N/A'),
-        '{{ duplication_clones }}': str(jscpd.get('clones', 0)),
-        '{{ duplication_lines }}': str(jscpd.get('duplicated_lines', 0)),
-        '{{ duplication_by_language }}': format_language_breakdown(jscpd.get('by_language', {})),
-        '{{ chart_data_json }}': json.dumps(chart_data),
-        '{{ generated_at }}': datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC'),
-        '{{ commit_sha }}': commit_sha[:8] if commit_sha else 'unknown',
-        '{{ commit_sha_full }}': commit_sha or 'unknown',
-    }
+    return render_template(plan, values)
 
-    html = template
-    for key, value in replacements.items():
-        html = html.replace(key, str(value) if value is not None else 'N/A')
+
+def generate_dashboard_html(template_path: str, output_path: str, metrics: dict, history: list, commit_sha: str,
+                            rollup_points: Optional[list] = None, chart_points: int = CHART_POINTS,
+                            asset_urls: Optional[dict] = None) -> None:
+    """Generate the dashboard HTML from template."""
+    html = render_dashboard_html(template_path, metrics, history, commit_sha, rollup_points, chart_points, asset_urls)
 
     # Write output
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
@@ -628,84 +809,583 @@ def generate_dashboard_html(template_path: str, output_path: str, metrics: dict,
         f.write(html)
 
 
-def main():
-    parser = argparse.ArgumentParser(description='Process PHP metrics and generate dashboard')
-    parser.add_argument('--coverage', help='Path to coverage.xml')
-    parser.add_argument('--phpstan', help='Path to phpstan.json')
-    parser.add_argument('--phpcs', help='Path to phpcs.json')
-    parser.add_argument('--security', help='Path to security-phpcs.json')
-    parser.add_argument('--phpmd', help='Path to phpmd.json')
-    parser.add_argument('--jscpd', help='Path to jscpd.json')
-    parser.add_argument('--template', help='Path to dashboard HTML template')
-    parser.add_argument('--output-dir', default='site/metrics', help='Output directory')
-    parser.add_argument('--commit-sha', default='', help='Git commit SHA')
-    parser.add_argument('--mock-data', action='store_true', help='Use mock data for testing')
-
-    args = parser.parse_args()
-
-    # Parse all metrics
-    if args.mock_data:
-        metrics = {
-            'coverage': {'line_coverage': 75.5, 'lines_covered': 1500, 'lines_total': 2000, 'rating': 'B'},
-            'phpstan': {'errors': 5, 'files_with_errors': 3, 'rating': 'B'},
-            'phpcs': {'violations': 15, 'errors': 5, 'warnings': 10, 'rating': 'B'},
-            'security': {'issues': 1, 'high': 0, 'medium': 1, 'rating': 'B'},
-            'phpmd': {'violations': 10, 'files_affected': 5, 'by_ruleset': {'Code Size Rules': 8, 'Unused Code Rules': 2}, 'rating': 'B'},
-            'jscpd': {'percentage': 2.5, 'clones': 5, 'duplicated_lines': 100, 'rating': 'A'},
-        }
+def _directory_size(path: str) -> int:
+    """Total size in bytes of the regular files directly inside ``path``."""
+    if not os.path.isdir(path):
+        return 0
+    with os.scandir(path) as it:
+        return sum(item.stat().st_size for item in it if item.is_file())
+
+
+def annotate_anomalies(metrics: dict, history: list, window: int = ANOMALY_WINDOW, z: float = ANOMALY_Z,
+                       drift_z: float = DRIFT_Z) -> list:
+    """Attach the rolling-statistics verdict on the newest history entry to each charted tool as ``anomaly``.
+
+    Returns the names of the series whose newest point was flagged.
+    """
+    flagged = []
+    for name, result in detect_anomalies(history, CHART_SERIES, window, z, drift_z).items():
+        tool = CHART_SERIES[name][0]
+        if tool not in metrics or result['latest'] is None:
+            continue
+        metrics[tool]['anomaly'] = {**result['latest'], 'recent': result['recent']}
+        if result['latest']['flags']:
+            flagged.append(name)
+    return flagged
+
+
+def update_history(history_dir: str, backend: str, new_entries: list,
+                   profiler: Optional[PipelineProfiler] = None) -> tuple:
+    """Add entries to the history store, roll up and prune expired ones.
+
+    Returns the raw history within the retention window, oldest first, and
+    the rollup points that precede it.
+    """
+    profiler = profiler or PipelineProfiler()
+    cutoff = (datetime.now() - timedelta(days=HISTORY_MAX_DAYS)).isoformat()
+    rollup_path = os.path.join(history_dir, 'rollup.json')
+
+    with profiler.stage('history_load', _directory_size(history_dir)):
+        rollup = HistoryRollup.load(rollup_path)
+        store = open_history_store(backend, history_dir)
+    try:
+        with profiler.stage('history_prune'):
+            store.extend(new_entries)
+
+            # Fold entries about to be pruned into the long-term rollup
+            for entry in store.entries(until=cutoff):
+                if entry.get('timestamp', '') < cutoff:
+                    rollup.add_entry(entry, CHART_SERIES)
+            rollup.compact(datetime.now(), ROLLUP_DAILY_DAYS, ROLLUP_WEEKLY_DAYS)
+
+            store.prune(cutoff)
+            history = store.entries(since=cutoff)
+
+        with profiler.stage('history_save'):
+            rollup.save(rollup_path)
+
+            # Keep history/all.json published for the dashboard and API consumers
+            if backend != 'json':
+                store.export_json(os.path.join(history_dir, 'all.json'), since=cutoff)
+            store.close()
+    except Exception:
+        store.close()
+        raise
+
+    return history, rollup.points()
+
+
+def load_batch_manifest(manifest_path: str) -> list:
+    """Load a JSONL backfill manifest.
+
+    Each line is an object with ``commit``, ``timestamp`` (ISO 8601) and
+    ``artifacts`` mapping tool name to artifact path. Relative paths are
+    resolved against the manifest's directory. Invalid lines are skipped
+    with a warning.
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    items = []
+
+    with open(manifest_path, 'r') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+                timestamp = datetime.fromisoformat(item['timestamp'])
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+                print(f"Warning: Skipping invalid manifest line {line_number}: {e}")
+                continue
+
+            # History timestamps are naive local time, so convert aware ones to match
+            if timestamp.tzinfo is not None:
+                timestamp = timestamp.astimezone().replace(tzinfo=None)
+
+            artifacts = {
+                tool: os.path.join(base_dir, path)
+                for tool, path in (item.get('artifacts') or {}).items()
+                if tool in PARSERS and path
+            }
+            items.append({'commit': item.get('commit', ''), 'timestamp': timestamp, 'artifacts': artifacts})
+
+    return items
+
+
+def _parse_batch_item(artifacts: dict, cache_dir: Optional[str], cache_max_bytes: int) -> tuple:
+    """Parse one manifest entry's artifacts in a worker, returning its metrics, output and cache stats."""
+    cache = ParseCache(cache_dir, max_bytes=cache_max_bytes) if cache_dir else None
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        metrics = parse_all(artifacts, cache=cache)
+    stats = cache.stats() if cache else {'hits': 0, 'misses': 0}
+    return metrics, buffer.getvalue(), stats
+
+
+def run_batch(manifest_path: str, jobs: int = 1, cache: Optional[ParseCache] = None) -> list:
+    """Parse every artifact set in a backfill manifest on a worker pool.
+
+    Returns ``(metrics, commit, timestamp)`` tuples sorted by timestamp.
+    """
+    items = load_batch_manifest(manifest_path)
+    cache_dir = cache.cache_dir if cache else None
+    cache_max_bytes = cache.max_bytes if cache else 0
+    started = time.perf_counter()
+
+    if jobs > 1 and len(items) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(_parse_batch_item, item['artifacts'], cache_dir, cache_max_bytes) for item in items]
+            outcomes = []
+            for item, future in zip(items, futures):
+                try:
+                    outcomes.append(future.result())
+                except Exception as e:
+                    outcomes.append(({}, f"Error: parsing artifacts for {item['commit']} failed: {e}\n", None))
     else:
-        metrics = {
-            'coverage': parse_coverage_xml(args.coverage) if args.coverage else {},
-            'phpstan': parse_phpstan_json(args.phpstan) if args.phpstan else {},
-            'phpcs': parse_phpcs_json(args.phpcs) if args.phpcs else {},
-            'security': parse_security_json(args.security) if args.security else {},
-            'phpmd': parse_phpmd_json(args.phpmd) if args.phpmd else {},
-            'jscpd': parse_jscpd_json(args.jscpd) if args.jscpd else {},
-        }
+        outcomes = [_parse_batch_item(item['artifacts'], cache_dir, cache_max_bytes) for item in items]
+
+    runs = []
+    for item, (metrics, output, stats) in zip(items, outcomes):
+        if output:
+            sys.stdout.write(output)
+        if cache is not None and stats:
+            cache.hits += stats['hits']
+            cache.misses += stats['misses']
+        runs.append((metrics, item['commit'], item['timestamp']))
+
+    elapsed = time.perf_counter() - started
+    rate = len(runs) / elapsed if elapsed > 0 else 0.0
+    print(f"Batch: parsed {len(runs)} commits in {elapsed:.2f}s ({rate:.1f} commits/s)")
+
+    runs.sort(key=lambda run: run[2])
+    return runs
+
+
+def update_test_timings(history_dir: str, runs: list) -> list:
+    """Append each run's per-test durations to history/test_timings.json.
+
+    Returns the tests of the latest run that regressed against their
+    rolling median.
+    """
+    store = TimingHistory(os.path.join(history_dir, 'test_timings.json'))
+    regressions = []
+    for run_metrics, commit_sha, _ in runs:
+        timings = (run_metrics.get('junit') or {}).get('timings')
+        if timings:
+            regressions = store.record(short_commit(commit_sha), timings)
+    store.save()
+    return regressions
+
+
+def update_snapshots(history_dir: str, runs: list, file_index: dict,
+                     compare_to: Optional[str] = None) -> tuple:
+    """Save a per-file snapshot for every run and diff the latest one against a baseline.
+
+    ``compare_to`` is a commit SHA or ``'previous'`` for the most recent
+    snapshot taken before the latest run. Returns ``(diff, baseline_found)``;
+    ``diff`` is None when no comparison was requested or possible.
+    """
+    store = SnapshotArchive(os.path.join(history_dir, 'snapshots'))
+    diff = None
+    baseline_found = False
+
+    for position, (run_metrics, commit_sha, timestamp) in enumerate(runs):
+        is_latest = position == len(runs) - 1
+        index = file_index if is_latest else build_file_index(run_metrics)
+        snapshot = build_snapshot(commit_sha, timestamp.isoformat(), metric_totals(run_metrics), index, SNAPSHOT_FIELDS)
+
+        # Resolve the baseline before the latest snapshot can replace it
+        if is_latest and compare_to:
+            if compare_to == 'previous':
+                baseline = store.previous(snapshot['timestamp'], exclude=commit_sha)
+            else:
+                baseline = store.load(compare_to)
+            if baseline is not None:
+                baseline_found = True
+                diff = diff_snapshots(baseline, snapshot)
+
+        store.save(snapshot)
+
+    return diff, baseline_found
+
+
+def load_fleet_config(config_path: str, output_dir: str) -> list:
+    """Load a fleet config listing the repositories to process.
+
+    The config is a JSON object with a ``repos`` list. Each entry has a
+    ``name`` and ``artifacts_dir`` (reports found by content) and/or
+    ``artifacts`` (tool name -> path), plus optional ``commit``, ``diff``
+    and ``output_dir`` (default ``<output_dir>/<name>``). Relative paths
+    are resolved against the config's directory. Invalid entries are
+    skipped with a warning.
+    """
+    base_dir = os.path.dirname(os.path.abspath(config_path))
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+
+    repos = []
+    names = set()
+    for position, item in enumerate(config.get('repos', []) if isinstance(config, dict) else [], 1):
+        name = item.get('name') if isinstance(item, dict) else None
+        if not isinstance(name, str) or not FLEET_NAME.match(name) or name in names:
+            print(f"Warning: Skipping fleet entry {position}: missing, invalid or duplicate name")
+            continue
+        names.add(name)
+
+        artifacts = {}
+        if item.get('artifacts_dir'):
+            artifacts, ignored = discover_artifacts(os.path.join(base_dir, item['artifacts_dir']))
+            for path, tool in ignored:
+                print(f"Warning: Ignoring {path} for {name}, a larger {tool} report was found")
+        for tool, path in (item.get('artifacts') or {}).items():
+            if tool in PARSERS and path:
+                artifacts[tool] = os.path.join(base_dir, path)
+        if not artifacts:
+            print(f"Warning: No reports found for {name}")
+
+        repos.append({
+            'name': name,
+            'commit': item.get('commit', ''),
+            'artifacts': artifacts,
+            'diff': os.path.join(base_dir, item['diff']) if item.get('diff') else None,
+            'output_dir': os.path.join(base_dir, item['output_dir']) if item.get('output_dir')
+            else os.path.join(output_dir, name),
+        })
+
+    return repos
+
+
+def render_fleet_html(template_path: str, fleet: dict) -> str:
+    """Render the fleet overview page from template."""
+    return render_template(load_template(template_path), {
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC'),
+        'repo_count': str(len(fleet['repos'])),
+        'rating_counts': format_rating_counts(fleet),
+        'fleet_headers': format_fleet_headers(),
+        'fleet_rows': format_fleet_rows(fleet),
+    })
+
+
+def run_fleet(args, cache: Optional[ParseCache] = None) -> list:
+    """Process every repository in a fleet config and write the fleet overview.
+
+    The artifacts of all repositories are parsed as one set of tasks on a
+    single pool of ``args.jobs`` workers, sharing ``cache`` when one is
+    given, so parse time grows with the total report size over the core
+    count rather than with the number of repositories. Each repository then gets its normal output
+    in its own directory, and the ranking is written to api/fleet.json and
+    index.html under ``args.output_dir``. Returns the names of repositories
+    that regressed against their ``--compare-to`` baseline.
+    """
+    try:
+        repos = load_fleet_config(args.fleet, args.output_dir)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Error: Could not read fleet config: {e}")
+        sys.exit(1)
+    if not repos:
+        print("Error: No valid repositories in fleet config")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    tasks = {(repo['name'], tool): (tool, path) for repo in repos for tool, path in repo['artifacts'].items()}
+    outcomes_by_repo = {repo['name']: {} for repo in repos}
+    for (name, tool), outcome in _run_parse_tasks(tasks, jobs=args.jobs, cache=cache).items():
+        outcomes_by_repo[name][tool] = outcome
+    print(f"Fleet: parsed {len(tasks)} reports from {len(repos)} repositories "
+          f"in {time.perf_counter() - started:.2f}s with {args.jobs} workers")
+
+    now = datetime.now()
+    entries = []
+    regressed = []
+    for repo in repos:
+        print(f"\n[{repo['name']}]")
+        metrics = collect_metrics(repo['artifacts'], outcomes_by_repo[repo['name']])
+        repo_args = argparse.Namespace(**{
+            **vars(args),
+            'output_dir': repo['output_dir'],
+            'commit_sha': repo['commit'],
+            'diff': repo['diff'],
+            'profile_dump': None,
+        })
+        profiler = PipelineProfiler(enabled=args.profile)
+        diff = publish_run(repo_args, [(metrics, repo['commit'], now)], profiler)
+        print_summary(metrics)
+        if diff is not None and has_regressions(diff):
+            regressed.append(repo['name'])
+
+        # Link to the repository's dashboard when it is published under the fleet site
+        relative = os.path.relpath(repo['output_dir'], args.output_dir)
+        url = '' if relative.startswith('..') else relative.replace(os.sep, '/') + '/'
+        entries.append(fleet_entry(repo['name'], repo['commit'], metrics, url))
+
+    fleet = build_fleet(entries, now.isoformat())
+    fleet_path = os.path.join(args.output_dir, 'api', 'fleet.json')
+    os.makedirs(os.path.dirname(fleet_path), exist_ok=True)
+    with open(fleet_path, 'w') as f:
+        json.dump(fleet, f, indent=2)
+
+    if args.fleet_template and os.path.exists(args.fleet_template):
+        with open(os.path.join(args.output_dir, 'index.html'), 'w') as f:
+            f.write(render_fleet_html(args.fleet_template, fleet))
+
+    print(f"\nFleet overview written: {fleet_path}")
+    for entry in fleet['repos']:
+        print(f"  {entry['rank']}. {entry['name']}: {entry['rating'] or 'N/A'} ({entry['score'] or 'N/A'})")
+    return regressed
+
+
+def run_server(args, artifacts: dict, cache: Optional[ParseCache] = None) -> None:
+    """Serve the dashboard from memory, re-running only the parsers whose artifact changed.
+
+    History is read from the output directory but never written, so a
+    local session does not add entries for every edit.
+    """
+    from metrics_server import ArtifactWatcher, SiteCache, serve
+
+    metrics = parse_all(artifacts, jobs=args.jobs, cache=cache)
+
+    history_dir = os.path.join(args.output_dir, 'history')
+    history = load_historical_data(os.path.join(history_dir, 'all.json'))
+    rollup_points = HistoryRollup.load(os.path.join(history_dir, 'rollup.json')).points()
+    site = SiteCache()
+
+    def render_site() -> int:
+        annotate_anomalies(metrics, history + [build_history_entry(metrics, args.commit_sha)],
+                           args.anomaly_window, args.anomaly_z, args.drift_z)
+        files = {'api/metrics.json': render_api_metrics(metrics, args.commit_sha).encode('utf-8')}
+        duplication = render_api_duplication(metrics, args.commit_sha)
+        if duplication is not None:
+            files['api/duplication.json'] = duplication.encode('utf-8')
+        for filename, svg in build_badges(metrics).items():
+            files[f"badges/{filename}"] = svg.encode('utf-8')
+        file_index = build_file_index(metrics)
+        for path, content in build_file_shards(file_index).items():
+            files[f"api/files/{path}"] = content
+        treemap = render_api_treemap(file_index, args.commit_sha, args.treemap_depth, args.treemap_nodes)
+        if treemap is not None:
+            files['api/treemap.json'] = treemap.encode('utf-8')
+        if args.template and os.path.exists(args.template):
+            files['index.html'] = render_dashboard_html(args.template, metrics, history, args.commit_sha,
+                                                        rollup_points=rollup_points,
+                                                        chart_points=args.chart_points).encode('utf-8')
+        return site.replace(files)
+
+    def on_change(changed: list) -> None:
+        started = time.perf_counter()
+        tools = [name for name in changed if name in PARSERS]
+        if tools:
+            updated = parse_all({tool: artifacts[tool] for tool in tools}, cache=cache)
+            for tool in tools:
+                metrics[tool] = updated[tool]
+        rebuilt = render_site()
+        print(f"{', '.join(changed)} changed: {rebuilt} responses rebuilt in {time.perf_counter() - started:.3f}s")
+
+    render_site()
+    watcher = ArtifactWatcher({**artifacts, 'template': args.template})
+    serve(site, args.output_dir, args.host, args.port, watcher, on_change, interval=args.watch_interval)
+
+
+def publish_run(args, runs: list, profiler: PipelineProfiler) -> Optional[dict]:
+    """Write every output of a run (history, API, snapshots, badges, dashboard) to ``args.output_dir``.
+
+    ``runs`` holds ``(metrics, commit, timestamp)`` tuples, the latest last.
+    When they are all older than the newest history entry (a backfill),
+    only history and snapshots are written. Returns the diff against the
+    ``--compare-to`` baseline, if any.
+    """
+    metrics, commit_sha, _ = runs[-1]
 
     # Create output directory
     os.makedirs(args.output_dir, exist_ok=True)
-
-    # Load and update historical data
-    history_path = os.path.join(args.output_dir, 'history', 'all.json')
-    history = load_historical_data(history_path)
-
-    # Add current metrics to history
-    current_entry = {
-        'timestamp': datetime.now().isoformat(),
-        'date': datetime.now().strftime('%Y-%m-%d'),
-        'commit': args.commit_sha[:8] if args.commit_sha else 'unknown',
-        'coverage': metrics.get('coverage', {}),
-        'phpstan': metrics.get('phpstan', {}),
-        'phpcs': metrics.get('phpcs', {}),
-        'security': metrics.get('security', {}),
-        'phpmd': metrics.get('phpmd', {}),
-        'jscpd': metrics.get('jscpd', {}),
-    }
-    history.append(current_entry)
-    save_historical_data(history_path, history)
+    history_dir = os.path.join(args.output_dir, 'history')
+    compare_to = args.compare_to or ('previous' if args.fail_on_regression else None)
+
+    # Load, prune and update historical data
+    new_entries = [build_history_entry(*run) for run in runs]
+    if profiler.enabled:
+        # Only stages that finished before the history write can be recorded in it
+        new_entries[-1]['pipeline'] = profiler.history_summary()
+    history, rollup_points = update_history(
+        history_dir,
+        args.history_backend,
+        new_entries,
+        profiler=profiler,
+    )
+
+    # A backfill older than the newest recorded run only adds history: the
+    # published current state (API, badges, dashboard) must keep describing
+    # the newest run, which this batch does not have the full metrics of
+    newest = history[-1].get('timestamp', '') if history else ''
+    if newest > new_entries[-1]['timestamp']:
+        with profiler.stage('snapshot_diff'):
+            update_snapshots(history_dir, runs, build_file_index(metrics))
+        print(f"Note: Newest run in this batch predates the latest history entry ({newest[:10]}); "
+              f"history updated, current metrics, badges and dashboard left unchanged")
+        return None
+
+    # Track per-test durations and flag tests slower than their rolling median
+    if (metrics.get('junit') or {}).get('timings'):
+        with profiler.stage('test_timings'):
+            metrics['junit']['regressions'] = update_test_timings(history_dir, runs)
+        if metrics['junit']['regressions']:
+            print(f"Slow tests: {len(metrics['junit']['regressions'])} slower than their rolling median")
+
+    # Flag totals that stand out from their recent history
+    with profiler.stage('anomalies'):
+        anomalies = annotate_anomalies(metrics, history, args.anomaly_window, args.anomaly_z, args.drift_z)
+    for name in anomalies:
+        anomaly = metrics[CHART_SERIES[name][0]]['anomaly']
+        marker = ' (regression)' if anomaly['regression'] else ''
+        print(f"Anomaly in {name}: {anomaly['value']} vs recent mean {anomaly['mean']} "
+              f"(z={anomaly['z']}, {', '.join(anomaly['flags'])}){marker}")
 
     # Save current metrics as API endpoint
     api_path = os.path.join(args.output_dir, 'api', 'metrics.json')
     os.makedirs(os.path.dirname(api_path), exist_ok=True)
-    with open(api_path, 'w') as f:
-        json.dump({
-            'generated_at': datetime.now().isoformat(),
-            'commit': args.commit_sha,
-            'metrics': metrics,
-        }, f, indent=2)
+    with profiler.stage('api_write'), open(api_path, 'w') as f:
+        f.write(render_api_metrics(metrics, commit_sha))
+
+    # Publish the clone hotspot index; drop a stale one if jscpd was not run
+    duplication_path = os.path.join(args.output_dir, 'api', 'duplication.json')
+    duplication = render_api_duplication(metrics, commit_sha)
+    if duplication is not None:
+        with open(duplication_path, 'w') as f:
+            f.write(duplication)
+        hotspots = metrics['jscpd']['hotspots']
+        print(f"Duplication index: {hotspots['pairs']} file pairs across {hotspots['files_with_clones']} files")
+    elif os.path.exists(duplication_path):
+        os.remove(duplication_path)
+
+    # Publish the cross-tool per-file index as lazily loadable shards
+    if not args.mock_data:
+        with profiler.stage('file_index'):
+            file_index = build_file_index(metrics)
+            shard_count = write_file_index(args.output_dir, file_index)
+        print(f"File index: {len(file_index)} files in {shard_count} shards")
+
+        # Roll the index up per directory for the treemap
+        treemap_path = os.path.join(args.output_dir, 'api', 'treemap.json')
+        with profiler.stage('directory_rollup'):
+            treemap = render_api_treemap(file_index, commit_sha, args.treemap_depth, args.treemap_nodes)
+        if treemap is not None:
+            with open(treemap_path, 'w') as f:
+                f.write(treemap)
+            print_weakest_directories(json.loads(treemap)['weakest'])
+        elif os.path.exists(treemap_path):
+            os.remove(treemap_path)
+
+    # Snapshot per-file metrics and compare against the requested baseline
+    diff = None
+    diff_path = os.path.join(args.output_dir, 'api', 'diff.json')
+    if args.mock_data:
+        if compare_to:
+            print("Warning: --compare-to is not available with mock data")
+    else:
+        with profiler.stage('snapshot_diff'):
+            diff, baseline_found = update_snapshots(history_dir, runs, file_index, compare_to)
+        if compare_to and not baseline_found:
+            print(f"Warning: No snapshot found for '{compare_to}', skipping comparison")
+
+    if diff is not None:
+        with open(diff_path, 'w') as f:
+            json.dump(diff, f, separators=(',', ':'))
+        print(f"Compared to {diff['base']['commit']}: {len(diff['files'])} files changed, "
+              f"{len(diff['regressions']['files'])} regressed")
+        for name, total in diff['totals'].items():
+            if total['delta']:
+                marker = ' (regression)' if name in diff['regressions']['totals'] else ''
+                print(f"  - {name}: {total['base']} -> {total['head']} ({total['delta']:+}){marker}")
+    elif os.path.exists(diff_path):
+        # Don't leave a comparison from an earlier run looking current
+        os.remove(diff_path)
+
+    # Coverage of the lines changed by the given diff
+    patch_path = os.path.join(args.output_dir, 'api', 'patch_coverage.json')
+    if args.diff:
+        bitmaps = metrics.get('coverage', {}).get('line_bitmaps')
+        if not bitmaps:
+            print("Warning: --diff needs a Clover report with line data, skipping patch coverage")
+        elif not os.path.exists(args.diff):
+            print(f"Warning: Diff file not found: {args.diff}")
+        else:
+            with profiler.stage('patch_coverage', os.path.getsize(args.diff)):
+                patch = compute_patch_coverage(bitmaps, parse_unified_diff(args.diff))
+            with open(patch_path, 'w') as f:
+                json.dump({'commit': commit_sha, **patch}, f, indent=2)
+            print_patch_coverage(patch)
+    elif os.path.exists(patch_path):
+        os.remove(patch_path)
 
     # Generate badges
-    generate_badges(args.output_dir, metrics)
+    with profiler.stage('generate_badges'):
+        badges_rewritten = generate_badges(args.output_dir, metrics)
+    print(f"Badges rewritten: {badges_rewritten}")
+
+    # Move large data out of the page into cacheable, content-hashed files
+    asset_urls = None
+    if args.optimize_output:
+        with profiler.stage('publish_data'):
+            asset_urls = publish_data_files(args.output_dir, {
+                'chart_data': build_chart_data(history, rollup_points, args.chart_points),
+                'history': history,
+            })
+        print(f"Data files published: {', '.join(asset_urls.values())}")
 
     # Generate dashboard HTML if template provided
     if args.template and os.path.exists(args.template):
         output_html = os.path.join(args.output_dir, 'index.html')
-        generate_dashboard_html(args.template, output_html, metrics, history, args.commit_sha)
+        with profiler.stage('generate_dashboard_html', os.path.getsize(args.template)):
+            generate_dashboard_html(args.template, output_html, metrics, history, commit_sha,
+                                    rollup_points=rollup_points, chart_points=args.chart_points,
+                                    asset_urls=asset_urls)
         print(f"Dashboard generated: {output_html}")
     else:
         print("Warning: No template provided, skipping HTML generation")
 
+    # Written before the optimize stage so it is minified and compressed with the other data files
+    if profiler.enabled:
+        stats_path = os.path.join(args.output_dir, 'api', 'pipeline_stats.json')
+        profiler.write(stats_path, commit_sha)
+        print(f"Pipeline stats written: {stats_path}")
+
+    if args.optimize_output:
+        with profiler.stage('optimize_output'):
+            minified = minify_json_files(args.output_dir)
+            compressed = write_gzip_siblings(args.output_dir)
+        print(f"Output optimized: {minified} JSON files minified, {compressed} .gz files written")
+
+    if profiler.enabled:
+        for name, stage in profiler.stages.items():
+            print(f"  - {name}: {stage.get('seconds', 0):.3f}s")
+        if args.profile_dump:
+            slowest = profiler.dump_slowest(args.profile_dump)
+            if slowest:
+                print(f"cProfile stats for slowest stage ({slowest}) written: {args.profile_dump}")
+
+    return diff
+
+
+def print_weakest_directories(weakest: list, limit: int = 3) -> None:
+    if not weakest:
+        return
+    listed = ', '.join(f"{entry['path']} ({entry['coverage']}%)" for entry in weakest[:limit])
+    print(f"Lowest coverage directories: {listed}")
+
+
+def print_patch_coverage(patch: dict, limit: int = 10) -> None:
+    if patch['coverage'] is None:
+        print("Patch coverage: no executable lines changed")
+        return
+    print(f"Patch coverage: {patch['coverage']}% ({patch['covered']}/{patch['executable']} changed lines covered)")
+    uncovered = [(path, entry) for path, entry in patch['files'].items() if entry['uncovered_lines']]
+    for path, entry in uncovered[:limit]:
+        print(f"  - {path}: {entry['coverage']}%, uncovered lines {', '.join(entry['uncovered_lines'])}")
+    if len(uncovered) > limit:
+        print(f"  ... and {len(uncovered) - limit} more files with uncovered changed lines")
+
+
+def print_summary(metrics: dict) -> None:
     print(f"Metrics processed successfully!")
     print(f"  - Coverage: {metrics.get('coverage', {}).get('line_coverage', 'N/A')}%")
     print(f"  - PHPStan errors: {metrics.get('phpstan', {}).get('errors', 'N/A')}")
@@ -713,6 +1393,170 @@ def main():
     print(f"  - Security issues: {metrics.get('security', {}).get('issues', 'N/A')}")
     print(f"  - PHPMD violations: {metrics.get('phpmd', {}).get('violations', 'N/A')}")
     print(f"  - Duplication: {metrics.get('jscpd', {}).get('percentage', 'N/A')}%")
+    if metrics.get('junit'):
+        print(f"  - Test runtime: {metrics['junit'].get('total_seconds', 'N/A')}s "
+              f"({metrics['junit'].get('tests', 'N/A')} tests)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Process PHP metrics and generate dashboard')
+    parser.add_argument('command', nargs='?', choices=['serve'],
+                        help="'serve' runs a local dashboard server that re-parses artifacts as they change")
+    for spec in PARSERS.values():
+        parser.add_argument(f'--{spec.name}', help=spec.help)
+    parser.add_argument('--artifacts-dir',
+                        help='Find reports under this directory by content; explicit --<tool> paths take precedence')
+    parser.add_argument('--template', help='Path to dashboard HTML template')
+    parser.add_argument('--output-dir', default='site/metrics', help='Output directory')
+    parser.add_argument('--commit-sha', default='', help='Git commit SHA')
+    parser.add_argument('--mock-data', action='store_true', help='Use mock data for testing')
+    parser.add_argument('--batch', metavar='MANIFEST',
+                        help='Backfill from a JSONL manifest of {commit, timestamp, artifacts} entries')
+    parser.add_argument('--cache', action='store_true',
+                        help='Reuse parse results for artifacts whose content has not changed')
+    parser.add_argument('--cache-dir', help='Parse cache directory (default: $XDG_CACHE_HOME/willow-metrics/parse)')
+    parser.add_argument('--cache-max-mb', type=int, default=256, help='Maximum parse cache size in MB')
+    parser.add_argument('--cache-stats', action='store_true',
+                        help='Print parse cache hit/miss counts (implies --cache)')
+    parser.add_argument('--history-backend', choices=['json', 'sqlite'], default='json',
+                        help='History storage backend (sqlite also exports history/all.json)')
+    parser.add_argument('--anomaly-window', type=int, default=ANOMALY_WINDOW,
+                        help='Previous runs each total is compared with for anomaly flags')
+    parser.add_argument('--anomaly-z', type=float, default=ANOMALY_Z,
+                        help='Z-score beyond which a total is flagged as a spike')
+    parser.add_argument('--drift-z', type=float, default=DRIFT_Z,
+                        help='Z-score beyond which the moving average is flagged as drifting')
+    parser.add_argument('--chart-points', type=int, default=CHART_POINTS,
+                        help='Maximum points per chart series after downsampling (0 disables downsampling)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Time each pipeline stage and write api/pipeline_stats.json')
+    parser.add_argument('--profile-dump', metavar='PATH',
+                        help='Also write cProfile stats of the slowest stage to PATH (implies --profile)')
+    parser.add_argument('--jobs', type=int,
+                        help='Number of worker processes used to parse artifacts in parallel '
+                             '(default: 1, or the number of CPUs with --fleet)')
+    parser.add_argument('--fleet', metavar='CONFIG',
+                        help='Process the repositories listed in a JSON fleet config on one worker pool (sharing the '
+                             'parse cache with --cache), and write a ranked overview (api/fleet.json, index.html)')
+    parser.add_argument('--fleet-template', default=DEFAULT_FLEET_TEMPLATE,
+                        help='Path to the fleet overview HTML template')
+    parser.add_argument('--compare-to', metavar='COMMIT',
+                        help="Diff totals and per-file metrics against a commit's snapshot, or 'previous', "
+                             "and write api/diff.json")
+    parser.add_argument('--fail-on-regression', action='store_true',
+                        help='Exit with status 1 when the comparison finds a regression (implies --compare-to previous)')
+    parser.add_argument('--optimize-output', action='store_true',
+                        help='Publish chart data and history as content-hashed files, minify JSON and write .gz siblings')
+    parser.add_argument('--diff', metavar='PATH',
+                        help='Unified diff (e.g. from git diff) to report patch coverage for; '
+                             'writes api/patch_coverage.json')
+    parser.add_argument('--treemap-depth', type=int, default=TREEMAP_DEPTH,
+                        help='Deepest directory level shown in api/treemap.json')
+    parser.add_argument('--treemap-nodes', type=int, default=TREEMAP_NODES,
+                        help='Maximum number of directories in api/treemap.json')
+    parser.add_argument('--summary-only', action='store_true',
+                        help='Only read report totals and refresh badges and api/metrics.json')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to bind in serve mode')
+    parser.add_argument('--port', type=int, default=8000, help='Port to listen on in serve mode (0 picks a free one)')
+    parser.add_argument('--watch-interval', type=float, default=0.5,
+                        help='Seconds between artifact change checks in serve mode')
+
+    args = parser.parse_args()
+    if args.anomaly_window < 2:
+        parser.error('--anomaly-window must be at least 2')
+    if args.summary_only and (args.command or args.batch or args.mock_data or args.diff):
+        parser.error('--summary-only cannot be combined with serve, --batch, --mock-data or --diff')
+    if args.fleet and (args.command or args.batch or args.mock_data or args.summary_only or args.artifacts_dir
+                       or any(getattr(args, tool) for tool in PARSERS)):
+        parser.error('--fleet takes its artifacts from the config and cannot be combined with serve, --batch, '
+                     '--mock-data, --summary-only, --artifacts-dir or --<tool> paths')
+    if args.jobs is None:
+        args.jobs = (os.cpu_count() or 1) if args.fleet else 1
+
+    profiler = PipelineProfiler(enabled=args.profile or bool(args.profile_dump),
+                                capture_profile=bool(args.profile_dump))
+
+    cache = None
+    # --cache-stats has nothing to report without a cache
+    if args.cache or args.cache_stats:
+        cache = ParseCache(
+            args.cache_dir or default_cache_dir(),
+            max_bytes=args.cache_max_mb * 1024 * 1024,
+        )
+
+    artifacts = {}
+    if args.artifacts_dir:
+        artifacts, ignored = discover_artifacts(args.artifacts_dir)
+        for tool, path in artifacts.items():
+            print(f"Found {tool} report: {path}")
+        for path, tool in ignored:
+            print(f"Warning: Ignoring {path}, a larger {tool} report was found")
+    for tool in PARSERS:
+        if getattr(args, tool):
+            artifacts[tool] = getattr(args, tool)
+
+    if args.command == 'serve':
+        run_server(args, artifacts, cache)
+        return
+
+    if args.fleet:
+        regressed = run_fleet(args, cache)
+        if args.cache_stats:
+            stats = cache.stats()
+            print(f"Parse cache: {stats['hits']} hits, {stats['misses']} misses")
+        if args.fail_on_regression and regressed:
+            print(f"Error: Regressions found in {', '.join(regressed)}")
+            sys.exit(1)
+        return
+
+    if args.summary_only:
+        # Badge refresh: no history, snapshots or dashboard
+        with profiler.stage('parse_summaries'):
+            metrics = parse_summaries(artifacts)
+        api_path = os.path.join(args.output_dir, 'api', 'metrics.json')
+        os.makedirs(os.path.dirname(api_path), exist_ok=True)
+        with open(api_path, 'w') as f:
+            f.write(render_api_metrics(metrics, args.commit_sha))
+        print(f"Badges rewritten: {generate_badges(args.output_dir, metrics)}")
+        print_summary(metrics)
+        return
+
+    # Parse all metrics
+    if args.batch:
+        with profiler.stage('parse_batch'):
+            runs = run_batch(args.batch, jobs=args.jobs, cache=cache)
+        if not runs:
+            print("Error: No valid entries in batch manifest")
+            sys.exit(1)
+        metrics, commit_sha, _ = runs[-1]
+    elif args.mock_data:
+        metrics = {
+            'coverage': {'line_coverage': 75.5, 'lines_covered': 1500, 'lines_total': 2000, 'rating': 'B'},
+            'phpstan': {'errors': 5, 'files_with_errors': 3, 'rating': 'B'},
+            'phpcs': {'violations': 15, 'errors': 5, 'warnings': 10, 'rating': 'B'},
+            'security': {'issues': 1, 'high': 0, 'medium': 1, 'rating': 'B'},
+            'phpmd': {'violations': 10, 'files_affected': 5, 'by_ruleset': {'Code Size Rules': 8, 'Unused Code Rules': 2}, 'rating': 'B'},
+            'jscpd': {'percentage': 2.5, 'clones': 5, 'duplicated_lines': 100, 'rating': 'A'},
+            'junit': {'tests': 250, 'total_seconds': 48.5, 'p50': 0.05, 'p95': 0.8, 'rating': 'A'},
+        }
+    else:
+        metrics = parse_all(artifacts, jobs=args.jobs, cache=cache, profiler=profiler)
+
+    if not args.batch:
+        commit_sha = args.commit_sha
+        runs = [(metrics, commit_sha, datetime.now())]
+
+    diff = publish_run(args, runs, profiler)
+
+    if args.cache_stats and cache is not None:
+        stats = cache.stats()
+        print(f"Parse cache: {stats['hits']} hits, {stats['misses']} misses")
+
+    print_summary(metrics)
+
+    if args.fail_on_regression and diff is not None and has_regressions(diff):
+        print(f"Error: Regressions found compared to {diff['base']['commit']}")
+        sys.exit(1)
 
 
 if __name__ == '__main__':
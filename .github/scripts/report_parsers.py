@@ -0,0 +1,411 @@
+"""
+Parsers for the JSON reports of PHPStan, PHPCS, the PHPCS security sniffs,
+PHPMD, jscpd and phploc.
+"""
+
+import json
+import os
+
+from clone_index import CloneIndex
+from json_stream import JsonStreamReader
+from metrics_common import calculate_rating, generate_badge_url, normalize_path
+
+
+def parse_phpstan_json(filepath: str) -> dict:
+    """Parse PHPStan JSON output."""
+    result = {
+        'errors': None,
+        'files_with_errors': 0,
+        'file_breakdown': [],
+        'files': {},
+        'rating': None,
+        'badge_url': None,
+    }
+
+    if not os.path.exists(filepath):
+        print(f"Warning: PHPStan file not found: {filepath}")
+        return result
+
+    try:
+        with open(filepath, 'r') as f:
+            data = json.load(f)
+
+        result['errors'] = data.get('totals', {}).get('errors', 0)
+
+        # Count files with errors
+        files = data.get('files', {})
+        result['files_with_errors'] = len([f for f, d in files.items() if d.get('errors', 0) > 0])
+
+        # Get top files by error count
+        file_errors = [(f, d.get('errors', 0)) for f, d in files.items()]
+        file_errors.sort(key=lambda x: x[1], reverse=True)
+        result['file_breakdown'] = file_errors[:10]
+        result['files'] = {f: {'errors': count} for f, count in file_errors if count > 0}
+
+        if result['errors'] is not None:
+            result['rating'] = calculate_rating('phpstan', result['errors'])
+            result['badge_url'] = generate_badge_url(
+                'PHPStan',
+                str(result['errors']) + ' errors' if result['errors'] != 1 else '1 error',
+                result['rating']
+            )
+    except json.JSONDecodeError as e:
+        print(f"Error parsing PHPStan JSON: {e}")
+    except Exception as e:
+        print(f"Unexpected error parsing PHPStan: {e}")
+
+    return result
+
+
+def _stream_phpcs_report(filepath: str) -> tuple:
+    """Stream a PHPCS-format JSON report without materializing its messages.
+
+    Returns ``(totals, files, by_source)``: the report totals, ``{path:
+    (errors, warnings)}`` for files with findings, and message counts per
+    sniff (``source``). Messages are decoded one at a time, so memory does
+    not grow with the size of the report.
+    """
+    totals = {}
+    files = {}
+    by_source = {}
+
+    with open(filepath, 'r') as f:
+        reader = JsonStreamReader(f)
+        for key in reader.iter_object():
+            if key == 'totals':
+                totals = reader.read_value()
+            elif key == 'files' and reader.peek_type() == 'object':
+                for path in reader.iter_object():
+                    errors = warnings = 0
+                    for field in reader.iter_object():
+                        if field == 'errors':
+                            errors = reader.read_value()
+                        elif field == 'warnings':
+                            warnings = reader.read_value()
+                        elif field == 'messages' and reader.peek_type() == 'array':
+                            for _ in reader.iter_array():
+                                message = reader.read_value()
+                                source = message.get('source', 'unknown') if isinstance(message, dict) else 'unknown'
+                                by_source[source] = by_source.get(source, 0) + 1
+                        else:
+                            reader.skip_value()
+                    if errors > 0 or warnings > 0:
+                        files[path] = (errors, warnings)
+            else:
+                reader.skip_value()
+
+    return totals, files, by_source
+
+
+def parse_phpcs_json(filepath: str) -> dict:
+    """Parse PHP CodeSniffer JSON output."""
+    result = {
+        'violations': None,
+        'errors': 0,
+        'warnings': 0,
+        'files_affected': 0,
+        'by_source': {},
+        'files': {},
+        'rating': None,
+        'badge_url': None,
+    }
+
+    if not os.path.exists(filepath):
+        print(f"Warning: PHPCS file not found: {filepath}")
+        return result
+
+    try:
+        totals, files, by_source = _stream_phpcs_report(filepath)
+
+        result['errors'] = totals.get('errors', 0)
+        result['warnings'] = totals.get('warnings', 0)
+        result['violations'] = result['errors'] + result['warnings']
+
+        # Count files affected
+        result['files'] = {f: {'errors': errors, 'warnings': warnings} for f, (errors, warnings) in files.items()}
+        result['files_affected'] = len(result['files'])
+        result['by_source'] = by_source
+
+        if result['violations'] is not None:
+            result['rating'] = calculate_rating('phpcs', result['violations'])
+            result['badge_url'] = generate_badge_url(
+                'code%20style',
+                str(result['violations']) + ' issues',
+                result['rating']
+            )
+    except json.JSONDecodeError as e:
+        print(f"Error parsing PHPCS JSON: {e}")
+    except Exception as e:
+        print(f"Unexpected error parsing PHPCS: {e}")
+
+    return result
+
+
+def parse_security_json(filepath: str) -> dict:
+    """Parse security audit JSON output (phpcs-security-audit format)."""
+    result = {
+        'issues': None,
+        'high': 0,
+        'medium': 0,
+        'low': 0,
+        'by_source': {},
+        'files': {},
+        'rating': None,
+        'badge_url': None,
+    }
+
+    if not os.path.exists(filepath):
+        print(f"Warning: Security file not found: {filepath}")
+        return result
+
+    try:
+        totals, files, by_source = _stream_phpcs_report(filepath)
+
+        result['high'] = totals.get('errors', 0)
+        result['medium'] = totals.get('warnings', 0)
+        result['issues'] = result['high'] + result['medium']
+
+        result['files'] = {f: {'high': errors, 'medium': warnings} for f, (errors, warnings) in files.items()}
+        result['by_source'] = by_source
+
+        if result['issues'] is not None:
+            result['rating'] = calculate_rating('security', result['issues'])
+            result['badge_url'] = generate_badge_url(
+                'security',
+                str(result['issues']) + ' issues',
+                result['rating']
+            )
+    except json.JSONDecodeError as e:
+        print(f"Error parsing security JSON: {e}")
+    except Exception as e:
+        print(f"Unexpected error parsing security: {e}")
+
+    return result
+
+
+def parse_phploc_json(filepath: str) -> dict:
+    """Parse PHPLOC JSON output."""
+    result = {
+        'loc': None,
+        'lloc': None,
+        'classes': None,
+        'methods': None,
+        'avg_complexity': None,
+        'max_complexity': None,
+        'rating': None,
+        'badge_url': None,
+    }
+
+    if not os.path.exists(filepath):
+        print(f"Warning: PHPLOC file not found: {filepath}")
+        return result
+
+    try:
+        with open(filepath, 'r') as f:
+            data = json.load(f)
+
+        result['loc'] = data.get('loc', 0)
+        result['lloc'] = data.get('lloc', 0)
+        result['classes'] = data.get('classes', 0)
+        result['methods'] = data.get('methods', 0)
+
+        # Complexity metrics
+        result['avg_complexity'] = data.get('ccnByLloc', 0)
+        if result['avg_complexity'] == 0:
+            # Try alternative key
+            methods = data.get('methods', 1)
+            ccn = data.get('ccn', 0)
+            if methods > 0:
+                result['avg_complexity'] = round(ccn / methods, 2)
+
+        result['max_complexity'] = data.get('ccnMax', 0)
+
+        if result['avg_complexity'] is not None:
+            result['rating'] = calculate_rating('complexity', result['avg_complexity'])
+            result['badge_url'] = generate_badge_url(
+                'complexity',
+                f"avg {result['avg_complexity']}",
+                result['rating']
+            )
+    except json.JSONDecodeError as e:
+        print(f"Error parsing PHPLOC JSON: {e}")
+    except Exception as e:
+        print(f"Unexpected error parsing PHPLOC: {e}")
+
+    return result
+
+
+def parse_phpmd_json(filepath: str) -> dict:
+    """Parse PHPMD JSON output."""
+    result = {
+        'violations': None,
+        'by_ruleset': {},
+        'files_affected': 0,
+        'files': {},
+        'rating': None,
+        'badge_url': None,
+    }
+
+    if not os.path.exists(filepath):
+        print(f"Warning: PHPMD file not found: {filepath}")
+        return result
+
+    try:
+        with open(filepath, 'r') as f:
+            reader = JsonStreamReader(f)
+
+            # PHPMD JSON format may vary
+            is_object = reader.peek_type() == 'object'
+            if is_object:
+                total_violations = 0
+                rulesets = {}
+                affected_files = set()
+                file_violations = {}
+
+                # Violations are decoded one at a time rather than as whole per-file lists
+                for key in reader.iter_object():
+                    if key != 'files' or reader.peek_type() != 'array':
+                        reader.skip_value()
+                        continue
+
+                    for _ in reader.iter_array():
+                        path = ''
+                        count = 0
+                        for field in reader.iter_object():
+                            if field == 'file':
+                                path = reader.read_value()
+                            elif field == 'violations' and reader.peek_type() == 'array':
+                                for _ in reader.iter_array():
+                                    v = reader.read_value()
+                                    ruleset = v.get('ruleSet', 'unknown') if isinstance(v, dict) else 'unknown'
+                                    rulesets[ruleset] = rulesets.get(ruleset, 0) + 1
+                                    count += 1
+                            else:
+                                reader.skip_value()
+
+                        total_violations += count
+                        affected_files.add(path)
+                        if count:
+                            entry = file_violations.setdefault(path, {'violations': 0})
+                            entry['violations'] += count
+
+        if is_object:
+            result['violations'] = total_violations
+            result['by_ruleset'] = rulesets
+            result['files_affected'] = len(affected_files)
+            result['files'] = file_violations
+
+            # Calculate rating based on violations (using same thresholds as phpcs)
+            if result['violations'] is not None:
+                result['rating'] = calculate_rating('phpcs', result['violations'])
+                result['badge_url'] = generate_badge_url(
+                    'PHPMD',
+                    str(result['violations']) + ' issues',
+                    result['rating']
+                )
+    except json.JSONDecodeError as e:
+        print(f"Error parsing PHPMD JSON: {e}")
+    except Exception as e:
+        print(f"Unexpected error parsing PHPMD: {e}")
+
+    return result
+
+
+def parse_jscpd_json(filepath: str) -> dict:
+    """Parse jscpd JSON output."""
+    result = {
+        'duplicates': None,
+        'percentage': None,
+        'clones': 0,
+        'duplicated_lines': 0,
+        'total_lines': 0,
+        'by_language': {},
+        'hotspots': {},
+        'rating': None,
+        'badge_url': None,
+    }
+
+    if not os.path.exists(filepath):
+        print(f"Warning: jscpd file not found: {filepath}")
+        return result
+
+    try:
+        with open(filepath, 'r') as f:
+            data = json.load(f)
+
+        statistics = data.get('statistics', {})
+
+        # jscpd has totals either in statistics directly or in statistics.total
+        totals = statistics.get('total', statistics)
+
+        # jscpd format
+        result['clones'] = totals.get('clones', 0)
+        result['duplicated_lines'] = totals.get('duplicatedLines', 0)
+        result['total_lines'] = totals.get('lines', 0)
+
+        # Extract per-language breakdown
+        formats = statistics.get('formats', {})
+        source_lines = {}
+        for lang, lang_data in formats.items():
+            # Handle both formats: direct stats or nested in 'sources'
+            if isinstance(lang_data, dict):
+                # Check if it has direct stats or sources
+                if 'sources' in lang_data and isinstance(lang_data['sources'], dict):
+                    # Real jscpd output: aggregate from sources in one pass
+                    lang_clones = lang_dup_lines = lang_lines = 0
+                    for source, stats in lang_data['sources'].items():
+                        lines = stats.get('lines', 0)
+                        lang_clones += stats.get('clones', 0)
+                        lang_dup_lines += stats.get('duplicatedLines', 0)
+                        lang_lines += lines
+                        source_lines[normalize_path(source)] = lines
+                    lang_pct = round((lang_dup_lines / lang_lines * 100) if lang_lines > 0 else 0, 2)
+                else:
+                    # Fixture format: direct stats
+                    lang_clones = lang_data.get('clones', 0)
+                    lang_dup_lines = lang_data.get('duplicatedLines', 0)
+                    lang_lines = lang_data.get('lines', 0)
+                    lang_pct = round(lang_data.get('percentage', 0), 2)
+
+                result['by_language'][lang] = {
+                    'clones': lang_clones,
+                    'duplicated_lines': lang_dup_lines,
+                    'lines': lang_lines,
+                    'percentage': lang_pct
+                }
+
+        # Index clone pairs by file to rank refactoring targets
+        index = CloneIndex()
+        for clone in data.get('duplicates', []):
+            first = clone.get('firstFile', {}).get('name')
+            second = clone.get('secondFile', {}).get('name')
+            if first and second:
+                index.add(normalize_path(first), normalize_path(second), clone.get('lines', 0),
+                          clone.get('format', 'unknown'))
+        result['hotspots'] = index.summary(source_lines=source_lines)
+
+        # Calculate percentage
+        if 'percentage' in totals:
+            result['percentage'] = round(totals['percentage'], 2)
+        elif result['total_lines'] > 0:
+            result['percentage'] = round(
+                (result['duplicated_lines'] / result['total_lines']) * 100, 2
+            )
+        else:
+            result['percentage'] = 0
+
+        result['duplicates'] = result['clones']
+
+        if result['percentage'] is not None:
+            result['rating'] = calculate_rating('duplication', result['percentage'])
+            result['badge_url'] = generate_badge_url(
+                'duplication',
+                f"{result['percentage']}%",
+                result['rating']
+            )
+    except json.JSONDecodeError as e:
+        print(f"Error parsing jscpd JSON: {e}")
+    except Exception as e:
+        print(f"Unexpected error parsing jscpd: {e}")
+
+    return result
@@ -0,0 +1,347 @@
+"""
+Compact archive of per-commit, per-file metric snapshots.
+
+Layout of the archive directory (history/snapshots/):
+
+    paths.txt     every file path seen, one per line; a path's line number is its id
+    archive.bin   concatenated zlib-compressed snapshot records
+    index.json    commit -> {timestamp, offset, length} of its record
+
+A record is a 4-byte little-endian header length, a JSON header (commit,
+timestamp, totals, fields, scales, file count) and then one little-endian
+int32 column for the path ids (sorted and delta-encoded) and for each
+field. Float fields are stored as fixed-point integers using the field's
+scale and missing values as -1. Paths are interned once for the whole
+archive.
+
+Most files do not change between runs, so only every KEYFRAME_INTERVAL-th
+record holds full values; the records in between store the difference to
+that keyframe, which compresses to almost nothing. Reading any commit
+therefore seeks to and decompresses at most two records: its own and its
+keyframe.
+"""
+
+import json
+import operator
+import os
+import struct
+import sys
+import zlib
+from array import array
+from datetime import datetime, timedelta
+from typing import Optional
+
+from snapshot_diff import short_commit
+
+# How long snapshots are kept, relative to the newest one
+SNAPSHOT_MAX_DAYS = 365
+
+# Fixed-point scale for float columns (coverage percentages have two decimals)
+FLOAT_SCALE = 100
+
+MISSING = -1
+
+# Records per keyframe; the others are stored as differences to it
+KEYFRAME_INTERVAL = 30
+
+HEADER_LENGTH = struct.Struct('<I')
+
+
+def _column_bytes(values: array) -> bytes:
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _column_from_bytes(data: bytes) -> array:
+    values = array('i')
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def _apply_keyframe(ids: list, columns: list, keyframe: tuple, op) -> list:
+    """Combine ``columns`` with the keyframe's values (``op`` is operator.add or operator.sub).
+
+    Paths missing from the keyframe are left unchanged.
+    """
+    _, keyframe_ids, keyframe_columns = keyframe
+    if ids == keyframe_ids:
+        # Same set of files as the keyframe: combine whole columns at C speed
+        aligned = keyframe_columns
+    else:
+        positions = {path_id: i for i, path_id in enumerate(keyframe_ids)}
+        matched = [positions.get(path_id) for path_id in ids]
+        aligned = [[0 if i is None else column[i] for i in matched] for column in keyframe_columns]
+
+    return [array('i', map(op, column, base)) for column, base in zip(columns, aligned)]
+
+
+def _int_column(values: tuple, scale: int) -> array:
+    if scale == 1 and None not in values:
+        return array('i', values)
+    return array('i', [MISSING if v is None else round(v * scale) for v in values])
+
+
+def encode_snapshot(snapshot: dict, path_ids: dict, keyframe: Optional[tuple] = None) -> tuple:
+    """Serialize a snapshot to a compressed record, with paths replaced by ids from ``path_ids``.
+
+    With a decoded ``keyframe`` (as returned by decode_record()) whose fields
+    and scales match, values are stored relative to it. Returns the record
+    and whether it was written relative to the keyframe.
+    """
+    fields = snapshot['fields']
+    rows = sorted((path_ids[path], row) for path, row in snapshot['files'].items())
+
+    ids = [path_id for path_id, _ in rows]
+    values = list(zip(*(row for _, row in rows))) if rows else [()] * len(fields)
+    scales = [FLOAT_SCALE if float in set(map(type, column)) else 1 for column in values]
+    columns = [_int_column(column, scale) for column, scale in zip(values, scales)]
+
+    header = {
+        'commit': snapshot['commit'],
+        'timestamp': snapshot['timestamp'],
+        'totals': snapshot['totals'],
+        'fields': fields,
+        'scales': scales,
+        'count': len(rows),
+    }
+
+    relative = keyframe is not None and keyframe[0]['fields'] == fields and keyframe[0]['scales'] == scales
+    if relative:
+        columns = _apply_keyframe(ids, columns, keyframe, operator.sub)
+        header['relative'] = True
+
+    gaps = array('i', (path_id - previous for path_id, previous in zip(ids, [0] + ids)))
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    payload = HEADER_LENGTH.pack(len(header_bytes)) + header_bytes + _column_bytes(gaps)
+    payload += b''.join(_column_bytes(column) for column in columns)
+
+    return zlib.compress(payload, 9), relative
+
+
+def decode_record(record: bytes, keyframe: Optional[tuple] = None) -> tuple:
+    """Decompress a record into ``(header, path ids, integer columns)``.
+
+    Relative records need their decoded ``keyframe`` to restore absolute values.
+    """
+    data = zlib.decompress(record)
+    (header_length,) = HEADER_LENGTH.unpack_from(data)
+    offset = HEADER_LENGTH.size
+    header = json.loads(data[offset:offset + header_length])
+    offset += header_length
+
+    width = header['count'] * 4
+    ids = []
+    path_id = 0
+    for gap in _column_from_bytes(data[offset:offset + width]):
+        path_id += gap
+        ids.append(path_id)
+    offset += width
+
+    columns = []
+    for _ in header['fields']:
+        columns.append(_column_from_bytes(data[offset:offset + width]))
+        offset += width
+
+    if header.get('relative'):
+        if keyframe is None:
+            raise ValueError(f"Snapshot {header['commit']} needs its keyframe to be decoded")
+        columns = _apply_keyframe(ids, columns, keyframe, operator.add)
+
+    return header, ids, columns
+
+
+def decode_snapshot(record: bytes, paths: list, keyframe: Optional[tuple] = None) -> dict:
+    """Inverse of encode_snapshot(), resolving path ids against the interned ``paths``."""
+    header, ids, columns = decode_record(record, keyframe)
+
+    values = []
+    for column, scale in zip(columns, header['scales']):
+        if scale == 1:
+            values.append([None if v == MISSING else v for v in column])
+        else:
+            values.append([None if v == MISSING else v / scale for v in column])
+
+    return {
+        'commit': header['commit'],
+        'timestamp': header['timestamp'],
+        'totals': header['totals'],
+        'fields': header['fields'],
+        'files': {paths[path_id]: [column[i] for column in values] for i, path_id in enumerate(ids)},
+    }
+
+
+class SnapshotArchive:
+    """Append-only snapshot archive with random access by commit.
+
+    Index entries record each commit's ``offset`` and ``length`` in
+    archive.bin and, for relative records, the ``keyframe`` range they were
+    encoded against.
+    """
+
+    def __init__(self, directory: str, max_days: int = SNAPSHOT_MAX_DAYS):
+        self.directory = directory
+        self.max_days = max_days
+        self.paths_path = os.path.join(directory, 'paths.txt')
+        self.archive_path = os.path.join(directory, 'archive.bin')
+        self.index_path = os.path.join(directory, 'index.json')
+        self._keyframe_cache = {}
+
+        self.paths = []
+        if os.path.exists(self.paths_path):
+            with open(self.paths_path, 'r', encoding='utf-8') as f:
+                self.paths = f.read().splitlines()
+        self.path_ids = {path: i for i, path in enumerate(self.paths)}
+
+        self._index = {}
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r') as f:
+                    self._index = json.load(f)
+            except (json.JSONDecodeError, IOError):
+                self._index = {}
+
+        # Earlier versions kept one JSON file per commit and indexed only timestamps
+        if any(isinstance(entry, str) for entry in self._index.values()):
+            self._migrate_json_snapshots()
+
+    def _migrate_json_snapshots(self) -> None:
+        legacy = self._index
+        self._index = {}
+        for commit in sorted(legacy, key=legacy.get):
+            json_path = os.path.join(self.directory, f"{commit}.json")
+            try:
+                with open(json_path, 'r') as f:
+                    self.save(json.load(f))
+            except (json.JSONDecodeError, IOError):
+                continue
+            os.remove(json_path)
+        self._write_index()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _intern(self, paths) -> None:
+        new_paths = [path for path in paths if path not in self.path_ids]
+        if not new_paths:
+            return
+        for path in new_paths:
+            self.path_ids[path] = len(self.paths)
+            self.paths.append(path)
+        with open(self.paths_path, 'a', encoding='utf-8') as f:
+            f.write(''.join(f"{path}\n" for path in new_paths))
+
+    def _write_index(self) -> None:
+        with open(self.index_path, 'w') as f:
+            json.dump(self._index, f, sort_keys=True, separators=(',', ':'))
+
+    def _read(self, offset: int, length: int) -> bytes:
+        with open(self.archive_path, 'rb') as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def _keyframe(self, span: list) -> tuple:
+        """Decode (and memoize) the keyframe record stored at ``span`` = [offset, length]."""
+        key = tuple(span)
+        if key not in self._keyframe_cache:
+            self._keyframe_cache = {key: decode_record(self._read(*span))}
+        return self._keyframe_cache[key]
+
+    def _open_keyframe(self) -> Optional[list]:
+        """Span of the newest keyframe if it still has room for relative records."""
+        keyframes = [[e['offset'], e['length']] for e in self._index.values() if 'keyframe' not in e]
+        if not keyframes:
+            return None
+        span = max(keyframes)
+        dependents = sum(1 for e in self._index.values() if e.get('keyframe') == span)
+        return span if dependents < KEYFRAME_INTERVAL - 1 else None
+
+    def save(self, snapshot: dict) -> None:
+        """Append ``snapshot``, replacing any earlier one for the same commit."""
+        os.makedirs(self.directory, exist_ok=True)
+        self._intern(snapshot['files'])
+
+        span = self._open_keyframe()
+        record, relative = encode_snapshot(snapshot, self.path_ids, self._keyframe(span) if span else None)
+
+        with open(self.archive_path, 'ab') as f:
+            offset = f.tell()
+            f.write(record)
+        entry = {'timestamp': snapshot['timestamp'], 'offset': offset, 'length': len(record)}
+        if relative:
+            entry['keyframe'] = span
+        self._index[snapshot['commit']] = entry
+
+        self.prune((datetime.fromisoformat(snapshot['timestamp']) - timedelta(days=self.max_days)).isoformat())
+        self._write_index()
+
+    def _live_spans(self) -> set:
+        """Byte ranges still needed: every indexed record and the keyframes they depend on."""
+        spans = set()
+        for entry in self._index.values():
+            spans.add((entry['offset'], entry['length']))
+            if 'keyframe' in entry:
+                spans.add(tuple(entry['keyframe']))
+        return spans
+
+    def prune(self, cutoff: str) -> int:
+        """Drop snapshots older than ``cutoff``, compacting the archive once most of it is dead.
+
+        Keyframes of the remaining snapshots are kept in the archive even
+        when their own commit has expired.
+        """
+        expired = [commit for commit, entry in self._index.items() if entry['timestamp'] < cutoff]
+        for commit in expired:
+            del self._index[commit]
+
+        live = sum(length for _, length in self._live_spans())
+        if os.path.exists(self.archive_path) and os.path.getsize(self.archive_path) > 2 * live:
+            self._compact()
+        return len(expired)
+
+    def _compact(self) -> None:
+        """Rewrite the archive with only the live records, updating their offsets."""
+        moved = {}
+        tmp_path = self.archive_path + '.tmp'
+        with open(self.archive_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            for offset, length in sorted(self._live_spans()):
+                src.seek(offset)
+                moved[offset] = dst.tell()
+                dst.write(src.read(length))
+        os.replace(tmp_path, self.archive_path)
+
+        for entry in self._index.values():
+            entry['offset'] = moved[entry['offset']]
+            if 'keyframe' in entry:
+                entry['keyframe'] = [moved[entry['keyframe'][0]], entry['keyframe'][1]]
+        self._keyframe_cache = {}
+        self._write_index()
+
+    def commits(self) -> list:
+        """Archived commits, oldest first."""
+        return sorted(self._index, key=lambda commit: self._index[commit]['timestamp'])
+
+    def load(self, commit: str) -> Optional[dict]:
+        """Read and decode one commit's snapshot, touching only its record and keyframe."""
+        entry = self._index.get(short_commit(commit))
+        if entry is None:
+            return None
+        try:
+            keyframe = self._keyframe(entry['keyframe']) if 'keyframe' in entry else None
+            return decode_snapshot(self._read(entry['offset'], entry['length']), self.paths, keyframe)
+        except (zlib.error, ValueError, IndexError, IOError):
+            return None
+
+    def previous(self, before: str, exclude: str = '') -> Optional[dict]:
+        """Load the latest snapshot taken before timestamp ``before``, ignoring commit ``exclude``."""
+        exclude = short_commit(exclude) if exclude else ''
+        candidates = [
+            commit for commit, entry in self._index.items()
+            if entry['timestamp'] < before and commit != exclude
+        ]
+        if not candidates:
+            return None
+        return self.load(max(candidates, key=lambda commit: self._index[commit]['timestamp']))
@@ -0,0 +1,112 @@
+"""
+Per-file metric snapshots and run-to-run diffs.
+
+A snapshot holds a run's totals and its per-file records, kept in a dict
+keyed by normalized path with one value row per file, so comparing two runs
+is a single pass of hash lookups: identical rows are skipped with one list
+comparison and only the files that actually changed are examined field by
+field. Snapshots are persisted by snapshot_archive.SnapshotArchive.
+"""
+
+# Metrics where a decrease (rather than an increase) is a regression
+HIGHER_IS_BETTER = ('coverage',)
+
+
+def short_commit(commit: str) -> str:
+    """Commit key used for snapshots, matching the history entries."""
+    return commit[:8] if commit else 'unknown'
+
+
+def build_snapshot(commit: str, timestamp: str, totals: dict, index: dict, fields: tuple) -> dict:
+    """Build a snapshot from run totals and a per-file index of ``{path: {field: value}}``."""
+    return {
+        'commit': short_commit(commit),
+        'timestamp': timestamp,
+        'totals': totals,
+        'fields': list(fields),
+        'files': {path: [record.get(field) for field in fields] for path, record in index.items()},
+    }
+
+
+def _is_regression(name: str, delta: float) -> bool:
+    return delta < 0 if name in HIGHER_IS_BETTER else delta > 0
+
+
+def _aligned_rows(snapshot: dict, fields: list) -> dict:
+    """Return the snapshot's file rows in ``fields`` order (snapshots may predate new fields)."""
+    if snapshot['fields'] == fields:
+        return snapshot['files']
+
+    positions = [snapshot['fields'].index(f) if f in snapshot['fields'] else None for f in fields]
+    return {
+        path: [row[i] if i is not None else None for i in positions]
+        for path, row in snapshot['files'].items()
+    }
+
+
+def diff_snapshots(base: dict, head: dict) -> dict:
+    """Compare two snapshots, returning total and per-file deltas plus the regressions found."""
+    totals = {}
+    regressed_totals = []
+    for name, value in head['totals'].items():
+        previous = base['totals'].get(name)
+        if value is None or previous is None:
+            continue
+        delta = round(value - previous, 2)
+        totals[name] = {'base': previous, 'head': value, 'delta': delta}
+        if _is_regression(name, delta):
+            regressed_totals.append(name)
+
+    fields = head['fields']
+    base_files = _aligned_rows(base, fields)
+    files = {}
+    regressed_files = []
+    added = 0
+
+    for path, row in head['files'].items():
+        previous_row = base_files.get(path)
+        if previous_row == row:
+            continue
+        if previous_row is None:
+            added += 1
+
+        changes = {}
+        regressed = False
+        for i, field in enumerate(fields):
+            value = row[i]
+            previous = previous_row[i] if previous_row is not None else None
+            if value is None or value == previous:
+                continue
+            if previous is None:
+                # New files have no coverage to drop from, but their issues are all new
+                if field in HIGHER_IS_BETTER:
+                    continue
+                previous = 0
+            delta = round(value - previous, 2)
+            if delta:
+                changes[field] = delta
+                regressed = regressed or _is_regression(field, delta)
+
+        if changes:
+            files[path] = changes
+        if regressed:
+            regressed_files.append(path)
+
+    removed = sorted(path for path in base_files if path not in head['files'])
+
+    return {
+        'base': {'commit': base['commit'], 'timestamp': base['timestamp']},
+        'head': {'commit': head['commit'], 'timestamp': head['timestamp']},
+        'totals': totals,
+        'regressions': {
+            'totals': regressed_totals,
+            'files': sorted(regressed_files),
+        },
+        'files_added': added,
+        'files_removed': removed,
+        'files': files,
+    }
+
+
+def has_regressions(diff: dict) -> bool:
+    return bool(diff['regressions']['totals'] or diff['regressions']['files'])
@@ -0,0 +1,144 @@
+"""
+Post-processing of the generated site for static hosting.
+
+Large data (chart series, history) is published under data/ with the
+content hash in the file name and listed in api/manifest.json, so a
+deploy that does not change the data keeps the URL, and browsers and CDNs
+keep their cached copy. JSON outputs are minified and compressible files
+get a precompressed ``.gz`` sibling for servers that support serving them
+(e.g. nginx ``gzip_static``).
+"""
+
+import gzip
+import hashlib
+import json
+import os
+
+# Files smaller than this are not worth compressing
+GZIP_MIN_BYTES = 512
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'image/svg+xml')
+
+COMPRESSIBLE_EXTENSIONS = ('.html', '.json', '.svg', '.css', '.js')
+
+DATA_DIR = 'data'
+
+MANIFEST_PATH = os.path.join('api', 'manifest.json')
+
+
+def write_if_changed(path: str, content: bytes) -> bool:
+    """Write ``content`` to ``path`` unless the file already holds exactly those bytes.
+
+    Leaving identical files untouched keeps their mtime, and with it any
+    ETag/Last-Modified derived by the host, stable across deploys.
+    """
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == content:
+                return False
+    except OSError:
+        pass
+
+    with open(path, 'wb') as f:
+        f.write(content)
+    return True
+
+
+def minified_json(data) -> bytes:
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()[:12]
+
+
+def publish_data_files(output_dir: str, payloads: dict) -> dict:
+    """Write each payload to ``data/<name>.<hash>.json`` and record it in api/manifest.json.
+
+    Data files no longer referenced by the manifest are removed. Returns
+    the manifest, mapping payload name to its URL relative to the site root.
+    """
+    data_dir = os.path.join(output_dir, DATA_DIR)
+    os.makedirs(data_dir, exist_ok=True)
+
+    manifest = {}
+    for name, payload in payloads.items():
+        content = minified_json(payload)
+        filename = f"{name}.{content_hash(content)}.json"
+        path = os.path.join(data_dir, filename)
+        # The name is derived from the content, so an existing file is already correct
+        if not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(content)
+        manifest[name] = f"{DATA_DIR}/{filename}"
+
+    referenced = {url.rsplit('/', 1)[1] for url in manifest.values()}
+    for filename in os.listdir(data_dir):
+        if filename.removesuffix('.gz') not in referenced:
+            os.remove(os.path.join(data_dir, filename))
+
+    manifest_path = os.path.join(output_dir, MANIFEST_PATH)
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    write_if_changed(manifest_path, minified_json(manifest))
+    return manifest
+
+
+def _site_files(output_dir: str):
+    """Yield the paths of all files in the site, skipping hidden directories such as .cache."""
+    for root, dirs, filenames in os.walk(output_dir):
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        for filename in filenames:
+            yield os.path.join(root, filename)
+
+
+def minify_json_files(output_dir: str) -> int:
+    """Rewrite every JSON file in the site without whitespace, returning how many changed."""
+    rewritten = 0
+    for path in _site_files(output_dir):
+        if not path.endswith('.json'):
+            continue
+        try:
+            with open(path, 'rb') as f:
+                raw = f.read()
+            # Minified output never contains a newline; skip parsing those files
+            if b'\n' not in raw:
+                continue
+            data = json.loads(raw)
+        except (json.JSONDecodeError, UnicodeDecodeError, OSError):
+            continue
+        if write_if_changed(path, minified_json(data)):
+            rewritten += 1
+    return rewritten
+
+
+def write_gzip_siblings(output_dir: str) -> int:
+    """Write ``<file>.gz`` next to each compressible file, returning how many were (re)written.
+
+    A sibling is only recompressed when its source is newer, and siblings
+    whose source has gone are removed.
+    """
+    written = 0
+    for path in _site_files(output_dir):
+        if path.endswith('.gz'):
+            if not os.path.exists(path[:-3]):
+                os.remove(path)
+            continue
+        if not path.endswith(COMPRESSIBLE_EXTENSIONS):
+            continue
+
+        gz_path = path + '.gz'
+        size = os.path.getsize(path)
+        if size < GZIP_MIN_BYTES:
+            if os.path.exists(gz_path):
+                os.remove(gz_path)
+            continue
+        if os.path.exists(gz_path) and os.path.getmtime(gz_path) >= os.path.getmtime(path):
+            continue
+
+        with open(path, 'rb') as f:
+            # mtime=0 keeps the output byte-identical for identical input
+            compressed = gzip.compress(f.read(), compresslevel=9, mtime=0)
+        with open(gz_path, 'wb') as f:
+            f.write(compressed)
+        written += 1
+    return written
@@ -0,0 +1,206 @@
+"""
+Bounded scans that extract only the totals from report files.
+
+Badge refreshes need a handful of numbers, which every supported format
+keeps in one small region: Clover's project-level ``<metrics/>`` element,
+the root ``<testsuite>`` of a JUnit report and the top-level ``totals``
+object of PHPStan/PHPCS (``statistics.total`` for jscpd). Each report is
+memory-mapped and only its first and last SCAN_BYTES are searched, so the
+cost does not depend on the report size.
+
+The patterns are anchored so they can only match the top-level region
+(e.g. ``totals`` as the first or last key of the document). A scanner
+returns None when the region is not found, and the caller then falls back
+to the full parser. Results hold the same totals, rating and badge as the
+full parser's but none of the per-file details.
+"""
+
+import json
+import mmap
+import os
+import re
+from typing import Optional
+
+from metrics_common import calculate_rating, generate_badge_url
+
+# Bytes searched at each end of a report
+SCAN_BYTES = 64 * 1024
+
+XML_ATTRIBUTE = re.compile(r'([\w-]+)="([^"]*)"')
+
+# Clover writes the project totals either first or last in <project>
+CLOVER_HEAD = re.compile(r'<project\b[^>]*>\s*<metrics\b([^>]*)/>')
+CLOVER_TAIL = re.compile(r'<metrics\b([^>]*)/>\s*</project>')
+
+# PHPUnit's root suite carries the run's test count and time
+JUNIT_HEAD = re.compile(r'<testsuites\b[^>]*>\s*<testsuite\b([^>]*)>')
+
+# A flat "totals" object as the first or last key of the document
+TOTALS_HEAD = re.compile(r'\A\s*\{\s*"totals"\s*:\s*(\{[^{}]*\})')
+TOTALS_TAIL = re.compile(r'"totals"\s*:\s*(\{[^{}]*\})\s*\}\s*\Z')
+
+# jscpd's statistics.total when statistics is the last key, or statistics as the first key
+JSCPD_TAIL = re.compile(r'"total"\s*:\s*(\{[^{}]*\})\s*\}\s*\}\s*\Z')
+JSCPD_HEAD = re.compile(r'\A\s*\{\s*"statistics"\s*:\s*')
+
+
+def _windows(filepath: str) -> Optional[tuple]:
+    """Return the decoded ``(head, tail)`` windows of a file, or None if it cannot be mapped."""
+    if not os.path.isfile(filepath) or os.path.getsize(filepath) == 0:
+        return None
+    with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        head = mm[:SCAN_BYTES]
+        tail = mm[-SCAN_BYTES:] if len(mm) > SCAN_BYTES else head
+    # The totals are ASCII; a multi-byte character cut at a window edge must not fail the scan
+    return head.decode('utf-8', 'replace'), tail.decode('utf-8', 'replace')
+
+
+def _json_totals(filepath: str) -> Optional[dict]:
+    windows = _windows(filepath)
+    if windows is None:
+        return None
+    head, tail = windows
+    match = TOTALS_HEAD.search(head) or TOTALS_TAIL.search(tail)
+    if match is None:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except json.JSONDecodeError:
+        return None
+
+
+def scan_coverage_totals(filepath: str) -> Optional[dict]:
+    windows = _windows(filepath)
+    if windows is None:
+        return None
+    head, tail = windows
+    match = CLOVER_HEAD.search(head) or CLOVER_TAIL.search(tail)
+    if match is None:
+        return None
+
+    attributes = dict(XML_ATTRIBUTE.findall(match.group(1)))
+    try:
+        statements = int(attributes.get('statements', 0))
+        covered_statements = int(attributes.get('coveredstatements', 0))
+    except ValueError:
+        return None
+
+    result = {'line_coverage': None, 'lines_covered': 0, 'lines_total': 0, 'rating': None, 'badge_url': None}
+    if statements > 0:
+        result['line_coverage'] = round((covered_statements / statements) * 100, 2)
+        result['lines_covered'] = covered_statements
+        result['lines_total'] = statements
+        result['rating'] = calculate_rating('coverage', result['line_coverage'])
+        result['badge_url'] = generate_badge_url('coverage', f"{result['line_coverage']}%", result['rating'])
+    return result
+
+
+def scan_junit_totals(filepath: str) -> Optional[dict]:
+    windows = _windows(filepath)
+    if windows is None:
+        return None
+    match = JUNIT_HEAD.search(windows[0])
+    if match is None:
+        return None
+
+    attributes = dict(XML_ATTRIBUTE.findall(match.group(1)))
+    try:
+        tests = int(attributes['tests'])
+        total = round(float(attributes['time']), 2)
+        counts = {key: int(attributes.get(key, 0)) for key in ('failures', 'errors', 'skipped')}
+    except (KeyError, ValueError):
+        return None
+
+    result = {'tests': tests, **counts, 'total_seconds': None, 'rating': None, 'badge_url': None}
+    if tests:
+        result['total_seconds'] = total
+        result['rating'] = calculate_rating('test_runtime', total)
+        result['badge_url'] = generate_badge_url('tests', f"{total}s", result['rating'])
+    return result
+
+
+def scan_phpstan_totals(filepath: str) -> Optional[dict]:
+    totals = _json_totals(filepath)
+    if totals is None:
+        return None
+
+    errors = totals.get('errors', 0)
+    rating = calculate_rating('phpstan', errors)
+    return {
+        'errors': errors,
+        'rating': rating,
+        'badge_url': generate_badge_url('PHPStan', str(errors) + ' errors' if errors != 1 else '1 error', rating),
+    }
+
+
+def scan_phpcs_totals(filepath: str) -> Optional[dict]:
+    totals = _json_totals(filepath)
+    if totals is None:
+        return None
+
+    errors = totals.get('errors', 0)
+    warnings = totals.get('warnings', 0)
+    violations = errors + warnings
+    rating = calculate_rating('phpcs', violations)
+    return {
+        'violations': violations,
+        'errors': errors,
+        'warnings': warnings,
+        'rating': rating,
+        'badge_url': generate_badge_url('code%20style', str(violations) + ' issues', rating),
+    }
+
+
+def scan_security_totals(filepath: str) -> Optional[dict]:
+    totals = _json_totals(filepath)
+    if totals is None:
+        return None
+
+    high = totals.get('errors', 0)
+    medium = totals.get('warnings', 0)
+    issues = high + medium
+    rating = calculate_rating('security', issues)
+    return {
+        'issues': issues,
+        'high': high,
+        'medium': medium,
+        'rating': rating,
+        'badge_url': generate_badge_url('security', str(issues) + ' issues', rating),
+    }
+
+
+def scan_jscpd_totals(filepath: str) -> Optional[dict]:
+    windows = _windows(filepath)
+    if windows is None:
+        return None
+    head, tail = windows
+    try:
+        match = JSCPD_TAIL.search(tail)
+        if match is not None:
+            totals = json.loads(match.group(1))
+        else:
+            # Per-format stats have a "total" too, so decode the whole statistics
+            # object; it fails (and we fall back) when it extends past the window
+            match = JSCPD_HEAD.search(head)
+            if match is None:
+                return None
+            statistics, _ = json.JSONDecoder().raw_decode(head, match.end())
+            totals = statistics.get('total', statistics)
+    except (json.JSONDecodeError, AttributeError):
+        return None
+
+    result = {
+        'duplicates': totals.get('clones', 0),
+        'clones': totals.get('clones', 0),
+        'duplicated_lines': totals.get('duplicatedLines', 0),
+        'total_lines': totals.get('lines', 0),
+    }
+    if 'percentage' in totals:
+        result['percentage'] = round(totals['percentage'], 2)
+    elif result['total_lines'] > 0:
+        result['percentage'] = round((result['duplicated_lines'] / result['total_lines']) * 100, 2)
+    else:
+        result['percentage'] = 0
+    result['rating'] = calculate_rating('duplication', result['percentage'])
+    result['badge_url'] = generate_badge_url('duplication', f"{result['percentage']}%", result['rating'])
+    return result
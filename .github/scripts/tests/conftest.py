@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The scripts import each other as top-level modules
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(SCRIPTS_DIR, '..', 'fixtures')
+
+sys.path.insert(0, SCRIPTS_DIR)
@@ -0,0 +1,50 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import FIXTURES_DIR, SCRIPTS_DIR
+
+PROCESS_METRICS = os.path.join(SCRIPTS_DIR, 'process_metrics.py')
+PHPCS = os.path.join(FIXTURES_DIR, 'phpcs.json')
+
+
+def run(*args):
+    subprocess.run([sys.executable, PROCESS_METRICS, *args], check=True, capture_output=True, text=True)
+
+
+def write_manifest(path, entries):
+    with open(path, 'w') as f:
+        for commit, timestamp in entries:
+            f.write(json.dumps({'commit': commit, 'timestamp': timestamp, 'artifacts': {'phpcs': PHPCS}}) + '\n')
+    return str(path)
+
+
+def read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def test_backfill_keeps_current_outputs(tmp_path):
+    output_dir = str(tmp_path / 'site')
+    run('--phpcs', PHPCS, '--output-dir', output_dir, '--commit-sha', 'live1234abcd')
+    api_path = os.path.join(output_dir, 'api', 'metrics.json')
+    published = read_json(api_path)
+
+    # Older than the run above, which is the newest in history
+    manifest = write_manifest(tmp_path / 'old.jsonl', [('0ld00000aaaa', '2001-01-01T10:00:00'),
+                                                      ('0ld11111bbbb', '2001-01-02T10:00:00')])
+    run('--batch', manifest, '--output-dir', output_dir, '--history-backend', 'sqlite')
+
+    assert read_json(api_path) == published
+    commits = [entry['commit'] for entry in read_json(os.path.join(output_dir, 'history', 'all.json'))]
+    assert commits[-1] == 'live1234'
+
+
+def test_newer_batch_publishes_its_latest_run(tmp_path):
+    output_dir = str(tmp_path / 'site')
+    run('--phpcs', PHPCS, '--output-dir', output_dir, '--commit-sha', 'live1234abcd')
+    manifest = write_manifest(tmp_path / 'new.jsonl', [('9999aaaabbbb', '2100-01-01T10:00:00')])
+    run('--batch', manifest, '--output-dir', output_dir)
+
+    assert read_json(os.path.join(output_dir, 'api', 'metrics.json'))['commit'] == '9999aaaabbbb'
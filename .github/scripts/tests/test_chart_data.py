@@ -0,0 +1,30 @@
+import random
+
+import pytest
+
+from process_metrics import CHART_SERIES, build_chart_data
+
+
+def synthetic_history(count: int) -> list:
+    rng = random.Random(7)
+    history = []
+    for i in range(count):
+        entry = {'date': f"2024-01-01T{i:05d}"}
+        for tool, key in CHART_SERIES.values():
+            if rng.random() < 0.9:
+                entry.setdefault(tool, {})[key] = round(rng.uniform(0, 100), 2)
+        history.append(entry)
+    return history
+
+
+@pytest.mark.parametrize('budget', [1, 5, 30, 120, 1000])
+def test_chart_points_never_exceed_budget(budget):
+    chart_data = build_chart_data(synthetic_history(5000), budget=budget)
+    assert len(chart_data['labels']) <= budget
+    for name in CHART_SERIES:
+        assert len(chart_data[name]) == len(chart_data['labels'])
+
+
+def test_short_history_is_not_downsampled():
+    chart_data = build_chart_data(synthetic_history(50), budget=120)
+    assert len(chart_data['labels']) == 50
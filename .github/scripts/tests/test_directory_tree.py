@@ -0,0 +1,93 @@
+import contextlib
+import io
+import os
+import random
+
+import pytest
+
+from conftest import FIXTURES_DIR
+from directory_tree import DirectoryTrie
+from process_metrics import TREEMAP_FIELDS, build_file_index, parse_all
+
+FIXTURES = {
+    'coverage': 'coverage.xml',
+    'phpstan': 'phpstan.json',
+    'phpcs': 'phpcs.json',
+    'phpmd': 'phpmd.json',
+    'security': 'security-phpcs.json',
+}
+
+FIELDS = ('statements', 'covered_statements', 'phpstan_errors')
+
+
+def synthetic_index(count: int) -> dict:
+    rng = random.Random(3)
+    index = {}
+    for i in range(count):
+        depth = rng.randint(0, 4)
+        parts = [f"d{rng.randint(0, 6)}" for _ in range(depth)]
+        statements = rng.randint(0, 40)
+        index['/'.join(parts + [f"F{i}.php"])] = {
+            'statements': statements,
+            'covered_statements': rng.randint(0, statements),
+            'phpstan_errors': rng.randint(0, 3),
+        }
+    return index
+
+
+def walk(record: dict):
+    yield record
+    for child in record.get('children', []):
+        yield from walk(child)
+
+
+def assert_children_sum(tree: dict, fields: tuple) -> None:
+    for record in walk(tree):
+        children = record.get('children')
+        if not children:
+            continue
+        assert sum(child['files'] for child in children) == record['files'], record['path']
+        for field in fields:
+            assert sum(child[field] for child in children) == record[field], (record['path'], field)
+
+
+@pytest.mark.parametrize('max_depth,max_nodes', [(10, 10000), (4, 200), (2, 12), (3, 5), (1, 2)])
+def test_children_sum_to_parent(max_depth, max_nodes):
+    index = synthetic_index(500)
+    tree = DirectoryTrie.from_index(index, FIELDS).treemap(max_depth, max_nodes)
+
+    assert tree['files'] == len(index)
+    assert tree['statements'] == sum(record['statements'] for record in index.values())
+    assert_children_sum(tree, FIELDS)
+    assert sum(1 for _ in walk(tree)) <= max_nodes
+
+
+def test_other_node_keeps_totals():
+    tree = DirectoryTrie.from_index(synthetic_index(500), FIELDS).treemap(max_depth=4, max_nodes=5)
+    names = [child['name'] for child in tree['children']]
+    assert '(other)' in names
+    assert_children_sum(tree, FIELDS)
+
+
+def test_files_leaf_holds_direct_files():
+    index = {
+        'src/Application.php': {'statements': 100, 'covered_statements': 50},
+        'src/Controller/AppController.php': {'statements': 20, 'covered_statements': 20},
+    }
+    tree = DirectoryTrie.from_index(index, ('statements', 'covered_statements')).treemap()
+    src = tree['children'][0]
+    assert src['statements'] == 120
+    leaves = {child['name']: child for child in src['children']}
+    assert set(leaves) == {'Controller', '(files)'}
+    assert leaves['(files)']['path'] == 'src/(files)'
+    assert leaves['(files)']['statements'] == 100
+    assert leaves['(files)']['coverage'] == 50.0
+    assert leaves['(files)']['files'] == 1
+
+
+def test_fixture_index_sums():
+    paths = {tool: os.path.join(FIXTURES_DIR, name) for tool, name in FIXTURES.items()}
+    with contextlib.redirect_stdout(io.StringIO()):
+        metrics = parse_all(paths)
+    tree = DirectoryTrie.from_index(build_file_index(metrics), TREEMAP_FIELDS).treemap()
+    assert_children_sum(tree, TREEMAP_FIELDS)
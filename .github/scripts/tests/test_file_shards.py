@@ -0,0 +1,59 @@
+import json
+import os
+
+from process_metrics import build_file_shards, write_file_index
+
+
+def record(statements: int) -> dict:
+    return {'coverage': None, 'statements': statements, 'covered_statements': 0}
+
+
+def read_shard(files_dir, *parts):
+    with open(os.path.join(files_dir, *parts, 'index.json')) as f:
+        return json.load(f)
+
+
+def test_absolute_paths_outside_the_container_are_rerooted():
+    shards = build_file_shards({
+        'src/Application.php': record(1),
+        '/home/runner/work/willow/src/Kernel.php': record(2),
+    })
+
+    root = json.loads(shards['index.json'])
+    assert root['path'] == ''
+    assert root['directories'] == ['home', 'src']
+    assert 'home/runner/work/willow/src/index.json' in shards
+    assert not any(path.startswith('/') for path in shards)
+
+
+def test_paths_escaping_the_tree_are_dropped():
+    shards = build_file_shards({
+        'src/Application.php': record(1),
+        '../outside/Evil.php': record(2),
+        'src/../../Evil.php': record(3),
+        '..': record(4),
+    })
+
+    assert set(shards) == {'index.json', 'src/index.json'}
+    assert json.loads(shards['src/index.json'])['files'] == {'Application.php': record(1)}
+
+
+def test_dot_segments_are_collapsed():
+    shards = build_file_shards({'./src/./Model/../Controller/AppController.php': record(1)})
+    assert json.loads(shards['src/Controller/index.json'])['files'] == {'AppController.php': record(1)}
+
+
+def test_write_file_index_stays_under_api_files(tmp_path):
+    output_dir = tmp_path / 'site'
+    write_file_index(str(output_dir), {
+        'src/Application.php': record(1),
+        '/opt/app/src/Kernel.php': record(2),
+        '../../escape/Evil.php': record(3),
+    })
+
+    files_dir = output_dir / 'api' / 'files'
+    written = sorted(os.path.relpath(os.path.join(root, name), tmp_path)
+                     for root, _, names in os.walk(tmp_path) for name in names)
+    assert all(path.startswith(os.path.join('site', 'api', 'files')) for path in written)
+    assert read_shard(files_dir)['directories'] == ['opt', 'src']
+    assert read_shard(files_dir, 'opt', 'app', 'src')['files'] == {'Kernel.php': record(2)}
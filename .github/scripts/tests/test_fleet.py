@@ -0,0 +1,36 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import FIXTURES_DIR, SCRIPTS_DIR
+
+PROCESS_METRICS = os.path.join(SCRIPTS_DIR, 'process_metrics.py')
+
+
+def run_fleet(tmp_path, *args):
+    config = tmp_path / 'fleet.json'
+    config.write_text(json.dumps({'repos': [
+        {'name': 'api', 'artifacts': {'phpcs': os.path.join(FIXTURES_DIR, 'phpcs.json')}},
+        {'name': 'web', 'artifacts': {'phpstan': os.path.join(FIXTURES_DIR, 'phpstan.json')}},
+    ]}))
+    env = {**os.environ, 'XDG_CACHE_HOME': str(tmp_path / 'xdg')}
+    subprocess.run([sys.executable, PROCESS_METRICS, '--fleet', str(config), '--output-dir', str(tmp_path / 'site'),
+                    '--jobs', '1', *args], check=True, capture_output=True, env=env)
+
+
+def hidden_directories(root):
+    return [os.path.join(path, name) for path, dirs, _ in os.walk(root) for name in dirs if name.startswith('.')]
+
+
+def test_fleet_does_not_cache_unless_asked(tmp_path):
+    run_fleet(tmp_path)
+    assert (tmp_path / 'site' / 'api' / 'fleet.json').exists()
+    assert not (tmp_path / 'xdg').exists()
+    assert hidden_directories(tmp_path / 'site') == []
+
+
+def test_fleet_cache_stays_outside_the_site(tmp_path):
+    run_fleet(tmp_path, '--cache')
+    assert os.listdir(tmp_path / 'xdg' / 'willow-metrics' / 'parse')
+    assert hidden_directories(tmp_path / 'site') == []
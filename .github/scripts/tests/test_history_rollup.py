@@ -0,0 +1,137 @@
+import math
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from history_rollup import HistoryRollup, bucket_start, lttb_indices
+
+SERIES = {'phpstan': ('phpstan', 'errors'), 'coverage': ('coverage', 'line_coverage')}
+
+
+def entry(timestamp: str, errors: int, commit: str = None) -> dict:
+    return {'timestamp': timestamp, 'commit': commit or timestamp, 'phpstan': {'errors': errors}}
+
+
+@pytest.mark.parametrize('day,resolution,start', [
+    ('2024-03-10', 'week', '2024-03-04'),   # Sunday closes the ISO week that began on Monday
+    ('2024-03-11', 'week', '2024-03-11'),   # Monday opens a new one
+    ('2025-01-01', 'week', '2024-12-30'),   # ISO weeks span the year boundary
+    ('2024-02-29', 'month', '2024-02-01'),
+    ('2024-03-01', 'month', '2024-03-01'),
+    ('2024-12-31', 'day', '2024-12-31'),
+])
+def test_bucket_start(day, resolution, start):
+    assert bucket_start(date.fromisoformat(day), resolution).isoformat() == start
+
+
+def test_unknown_resolution():
+    with pytest.raises(ValueError):
+        bucket_start(date(2024, 1, 1), 'year')
+
+
+def test_daily_bucket_aggregates_runs():
+    rollup = HistoryRollup()
+    # Added out of order; the latest run of the day decides the commit and last value
+    rollup.add_entry(entry('2024-03-05T18:00:00', 7, 'late'), SERIES)
+    rollup.add_entry(entry('2024-03-05T09:00:00', 3, 'early'), SERIES)
+    rollup.add_entry(entry('2024-03-05T12:00:00', 5, 'noon'), SERIES)
+
+    [point] = rollup.points()
+    assert point['date'] == '2024-03-05'
+    assert point['resolution'] == 'day'
+    assert point['runs'] == 3
+    assert point['commit'] == 'late'
+    assert point['series'] == {'phpstan': {'min': 3, 'max': 7, 'mean': 5.0, 'last': 7}}
+
+
+def test_compact_respects_week_and_month_edges():
+    rollup = HistoryRollup()
+    day = date(2024, 1, 20)
+    while day <= date(2024, 3, 20):
+        rollup.add_entry(entry(f'{day.isoformat()}T12:00:00', day.day), SERIES)
+        day += timedelta(days=1)
+
+    # Wednesday 2024-03-20: days before the week of 03-13 become weeks,
+    # weeks before the month of 02-21 become months
+    rollup.compact(datetime(2024, 3, 20, 12), daily_days=7, weekly_days=28)
+    by_resolution = {}
+    for point in rollup.points():
+        by_resolution.setdefault(point['resolution'], []).append(point['date'])
+
+    assert by_resolution['day'][0] == '2024-03-11'
+    assert by_resolution['day'][-1] == '2024-03-20'
+    assert all(date.fromisoformat(key).weekday() == 0 for key in by_resolution['week'])
+    assert by_resolution['week'][0] == '2024-02-05'
+    assert by_resolution['week'][-1] == '2024-03-04'
+    # The week of 2024-01-29 starts in January and folds into that month
+    assert by_resolution['month'] == ['2024-01-01']
+
+
+def test_compaction_keeps_totals_exact(tmp_path):
+    rollup = HistoryRollup()
+    values = []
+    for offset in range(120):
+        day = date(2024, 1, 1) + timedelta(days=offset)
+        values.append(offset % 17)
+        rollup.add_entry(entry(f'{day.isoformat()}T12:00:00', offset % 17), SERIES)
+    rollup.compact(datetime(2024, 4, 30), daily_days=14, weekly_days=56)
+
+    path = str(tmp_path / 'rollup.json')
+    rollup.save(path)
+    reloaded = HistoryRollup.load(path)
+    points = reloaded.points()
+
+    assert sum(point['runs'] for point in points) == 120
+    assert {point['resolution'] for point in points} == {'day', 'week', 'month'}
+    assert min(point['series']['phpstan']['min'] for point in points) == 0
+    assert max(point['series']['phpstan']['max'] for point in points) == 16
+    assert points[-1]['series']['phpstan']['last'] == values[-1]
+    assert [point['date'] for point in points] == sorted(point['date'] for point in points)
+
+
+def test_load_ignores_unreadable_files(tmp_path):
+    path = tmp_path / 'rollup.json'
+    path.write_text('{not json')
+    assert HistoryRollup.load(str(path)).points() == []
+    assert HistoryRollup.load(str(tmp_path / 'missing.json')).points() == []
+
+
+def wave(count: int) -> list:
+    return [math.sin(i / 9) * 50 + (400 if i == count // 3 else 0) for i in range(count)]
+
+
+@pytest.mark.parametrize('budget', [3, 10, 57, 200])
+def test_lttb_keeps_first_last_and_budget(budget):
+    ys = wave(1000)
+    indices = lttb_indices(list(range(1000)), ys, budget)
+    assert len(indices) == budget
+    assert indices[0] == 0
+    assert indices[-1] == 999
+    assert indices == sorted(set(indices))
+
+
+def test_lttb_keeps_a_spike():
+    ys = wave(1000)
+    assert 333 in lttb_indices(list(range(1000)), ys, 40)
+
+
+@pytest.mark.parametrize('count,budget', [(0, 10), (1, 10), (5, 10), (10, 10)])
+def test_short_series_are_not_downsampled(count, budget):
+    assert lttb_indices(list(range(count)), wave(count), budget) == list(range(count))
+
+
+def test_lttb_skips_missing_values():
+    ys = [None, 1.0, None, 3.0] + [float(i % 5) for i in range(100)] + [None]
+    indices = lttb_indices(list(range(len(ys))), ys, 12)
+    assert all(ys[i] is not None for i in indices)
+    assert indices[0] == 1
+    assert indices[-1] == len(ys) - 2
+    assert lttb_indices(list(range(4)), [None, 2.0, None, 4.0], 10) == [1, 3]
+
+
+def test_lttb_tiny_budgets():
+    ys = wave(50)
+    assert lttb_indices(list(range(50)), ys, 2) == [0, 49]
+    assert lttb_indices(list(range(50)), ys, 1) == [0]
+    # A budget of zero means no limit
+    assert lttb_indices(list(range(50)), ys, 0) == list(range(50))
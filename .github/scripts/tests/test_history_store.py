@@ -0,0 +1,109 @@
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import FIXTURES_DIR, SCRIPTS_DIR
+from history_store import JsonHistoryStore, SqliteHistoryStore, open_history_store
+
+
+def entry(day: int, commit: str = None, errors: int = 0) -> dict:
+    return {'timestamp': f'2024-03-{day:02d}T12:00:00', 'commit': commit or f'c{day:07d}', 'phpstan': {'errors': errors}}
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def backend(request):
+    return request.param
+
+
+def timestamps(entries: list) -> list:
+    return [item['timestamp'][:10] for item in entries]
+
+
+def test_append_keeps_timestamp_order(tmp_path, backend):
+    store = open_history_store(backend, str(tmp_path))
+    for day in (5, 2, 9, 1):
+        store.append(entry(day))
+    store.extend([entry(7), entry(3)])
+    assert timestamps(store.entries()) == [f'2024-03-{day:02d}' for day in (1, 2, 3, 5, 7, 9)]
+    store.close()
+
+
+def test_range_queries(tmp_path, backend):
+    store = open_history_store(backend, str(tmp_path))
+    store.extend([entry(day) for day in range(1, 11)])
+
+    assert timestamps(store.entries(since='2024-03-08')) == ['2024-03-08', '2024-03-09', '2024-03-10']
+    assert timestamps(store.entries(until='2024-03-02T23:59:59')) == ['2024-03-01', '2024-03-02']
+    assert len(store.entries(since='2024-03-04', until='2024-03-06T12:00:00')) == 3
+    assert store.entries(since='2025-01-01') == []
+    store.close()
+
+
+def test_prune_and_reopen(tmp_path, backend):
+    store = open_history_store(backend, str(tmp_path))
+    store.extend([entry(day, errors=day) for day in range(1, 11)])
+    assert store.prune('2024-03-06') == 5
+    assert store.prune('2024-03-06') == 0
+    store.close()
+
+    reopened = open_history_store(backend, str(tmp_path))
+    assert [item['phpstan']['errors'] for item in reopened.entries()] == [6, 7, 8, 9, 10]
+    reopened.close()
+
+
+def test_export_matches_entries(tmp_path, backend):
+    store = open_history_store(backend, str(tmp_path / 'history'))
+    store.extend([entry(day) for day in range(1, 6)])
+    export = tmp_path / 'export' / 'all.json'
+    store.export_json(str(export), since='2024-03-03')
+    assert json.loads(export.read_text()) == store.entries(since='2024-03-03')
+    store.close()
+
+
+def test_sqlite_is_seeded_from_existing_json(tmp_path):
+    legacy = JsonHistoryStore(str(tmp_path / 'all.json'))
+    legacy.extend([entry(day) for day in range(1, 4)])
+    legacy.close()
+
+    store = open_history_store('sqlite', str(tmp_path))
+    assert store.entries() == legacy.entries()
+    store.append(entry(4))
+    store.close()
+
+    # An existing database is not seeded again
+    store = SqliteHistoryStore(str(tmp_path / 'history.sqlite'), legacy_json=str(tmp_path / 'all.json'))
+    assert timestamps(store.entries()) == ['2024-03-01', '2024-03-02', '2024-03-03', '2024-03-04']
+    store.close()
+
+
+def test_unknown_backend(tmp_path):
+    with pytest.raises(ValueError):
+        open_history_store('csv', str(tmp_path))
+
+
+def test_pipeline_backends_publish_the_same_history(tmp_path):
+    start = datetime.now() - timedelta(days=5)
+    manifest = tmp_path / 'runs.jsonl'
+    with open(manifest, 'w') as f:
+        for day in range(5):
+            f.write(json.dumps({
+                'commit': f'{day:08d}abcd',
+                'timestamp': (start + timedelta(days=day)).isoformat(),
+                'artifacts': {'phpcs': os.path.join(FIXTURES_DIR, 'phpcs.json')},
+            }) + '\n')
+
+    published = {}
+    for backend in ('json', 'sqlite'):
+        output_dir = tmp_path / backend
+        subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, 'process_metrics.py'), '--batch', str(manifest),
+                        '--output-dir', str(output_dir), '--history-backend', backend],
+                       check=True, capture_output=True)
+        published[backend] = json.loads((output_dir / 'history' / 'all.json').read_text())
+
+    assert len(published['json']) == 5
+    assert published['sqlite'] == published['json']
+    assert (tmp_path / 'sqlite' / 'history' / 'history.sqlite').exists()
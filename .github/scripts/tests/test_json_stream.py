@@ -0,0 +1,54 @@
+import glob
+import io
+import json
+import os
+
+import pytest
+
+from conftest import FIXTURES_DIR
+from json_stream import JsonStreamReader
+
+JSON_FIXTURES = sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.json')))
+
+CHUNK_SIZES = (1, 2, 3, 7, 64)
+
+
+def read_document(reader: JsonStreamReader):
+    """Rebuild a whole document through the cursor API, descending into every container."""
+    value_type = reader.peek_type()
+    if value_type == 'object':
+        return {key: read_document(reader) for key in reader.iter_object()}
+    if value_type == 'array':
+        return [read_document(reader) for _ in reader.iter_array()]
+    return reader.read_value()
+
+
+@pytest.mark.parametrize('chunk_size', CHUNK_SIZES)
+@pytest.mark.parametrize('path', JSON_FIXTURES, ids=os.path.basename)
+def test_fixtures_match_json_load(path, chunk_size):
+    with open(path) as f:
+        expected = json.load(f)
+    with open(path) as f:
+        assert read_document(JsonStreamReader(f, chunk_size=chunk_size)) == expected
+
+
+@pytest.mark.parametrize('chunk_size', CHUNK_SIZES)
+@pytest.mark.parametrize('document', [
+    '{"a": 1.25, "b": -3e-2, "c": 10E+3, "d": [0.5, 12, -7.125e1]}',
+    '[1.5,2e3,true,null,false,"x"]',
+])
+def test_numbers_split_at_chunk_edges(document, chunk_size):
+    reader = JsonStreamReader(io.StringIO(document), chunk_size=chunk_size)
+    assert read_document(reader) == json.loads(document)
+
+
+def test_skip_value_at_small_chunks():
+    document = '{"skip": {"n": [1.5, 2.75e2]}, "keep": 3.5}'
+    reader = JsonStreamReader(io.StringIO(document), chunk_size=2)
+    kept = {}
+    for key in reader.iter_object():
+        if key == 'keep':
+            kept[key] = reader.read_value()
+        else:
+            reader.skip_value()
+    assert kept == {'keep': 3.5}
@@ -0,0 +1,123 @@
+import os
+
+import pytest
+
+from conftest import FIXTURES_DIR
+from junit_parser import TOP_SLOWEST, parse_junit_xml
+from timing_history import MIN_SAMPLES, TIMING_WINDOW, TimingHistory
+
+ARTICLES = 'App\\Test\\TestCase\\Controller\\ArticlesControllerTest'
+TAGS = 'App\\Test\\TestCase\\Model\\Table\\TagsTableTest'
+SLUG = 'App\\Test\\TestCase\\Utility\\SlugTest'
+
+
+def write_report(tmp_path, suites: int, cases: int) -> str:
+    """Three levels of nested suites; every 7th case fails, every 11th errors and every 13th is skipped."""
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<testsuites>', '<testsuite name="All">']
+    number = 0
+    for suite in range(suites):
+        lines.append(f'<testsuite name="Suite{suite}"><testsuite name="Suite{suite}::testProvider">')
+        for case in range(cases):
+            number += 1
+            outcome = ''
+            if number % 7 == 0:
+                outcome = '<failure type="Failure">failed</failure>'
+            elif number % 11 == 0:
+                outcome = '<error type="Error">broken</error>'
+            elif number % 13 == 0:
+                outcome = '<skipped/>'
+            lines.append(f'<testcase name="test{case}" class="Suite{suite}" time="{number / 1000:.3f}">'
+                         f'<system-out>log</system-out>{outcome}</testcase>')
+        lines.append('</testsuite></testsuite>')
+    lines += ['</testsuite>', '</testsuites>']
+    path = tmp_path / 'junit.xml'
+    path.write_text('\n'.join(lines))
+    return str(path)
+
+
+def test_fixture_counts_and_total():
+    result = parse_junit_xml(os.path.join(FIXTURES_DIR, 'junit.xml'))
+    assert result['tests'] == 8
+    assert result['failures'] == 1
+    assert result['errors'] == 0
+    assert result['skipped'] == 1
+    assert result['total_seconds'] == 2.42
+    assert result['max'] == 0.9812
+
+
+def test_fixture_slowest_ordering():
+    result = parse_junit_xml(os.path.join(FIXTURES_DIR, 'junit.xml'))
+    assert [item['test'] for item in result['slowest'][:4]] == [
+        f'{ARTICLES}::testView',
+        f'{ARTICLES}::testIndex',
+        f'{TAGS}::testValidationDefault',
+        f'{ARTICLES}::testAdd',
+    ]
+    seconds = [item['seconds'] for item in result['slowest']]
+    assert seconds == sorted(seconds, reverse=True)
+    # The data-provider sub-suite is folded into its class
+    assert result['slowest_suites'] == [
+        {'suite': ARTICLES, 'seconds': 1.642},
+        {'suite': TAGS, 'seconds': 0.512},
+        {'suite': SLUG, 'seconds': 0.264},
+    ]
+
+
+def test_nested_suites_with_outcomes(tmp_path):
+    result = parse_junit_xml(write_report(tmp_path, suites=30, cases=40))
+    numbers = range(1, 1201)
+    assert result['tests'] == 1200
+    assert result['failures'] == sum(1 for n in numbers if n % 7 == 0)
+    assert result['errors'] == sum(1 for n in numbers if n % 7 and n % 11 == 0)
+    assert result['skipped'] == sum(1 for n in numbers if n % 7 and n % 11 and n % 13 == 0)
+    assert result['total_seconds'] == round(sum(numbers) / 1000, 2)
+
+    assert len(result['slowest']) == TOP_SLOWEST
+    assert result['slowest'][0] == {'test': 'Suite29::test39', 'seconds': 1.2}
+    assert [item['suite'] for item in result['slowest_suites'][:3]] == ['Suite29', 'Suite28', 'Suite27']
+
+
+def test_missing_and_empty_reports(tmp_path):
+    assert parse_junit_xml(str(tmp_path / 'missing.xml'))['tests'] is None
+    empty = tmp_path / 'empty.xml'
+    empty.write_text('<testsuites><testsuite name="None"/></testsuites>')
+    assert parse_junit_xml(str(empty))['tests'] == 0
+
+
+def test_timing_regressions(tmp_path):
+    history = TimingHistory(str(tmp_path / 'history' / 'test_timings.json'))
+    for run in range(MIN_SAMPLES):
+        assert history.record(f'c{run}', {'fast': 0.010, 'slow': 0.200}) == []
+
+    flagged = history.record('c9', {'fast': 0.040, 'slow': 0.400})
+    # 'fast' quadrupled but only by 30ms, under the minimum change
+    assert [item['test'] for item in flagged] == ['slow']
+    assert flagged[0]['median_seconds'] == 0.2
+    assert flagged[0]['ratio'] == 2.0
+
+
+def test_timing_window_and_rerun(tmp_path):
+    path = str(tmp_path / 'history' / 'test_timings.json')
+    history = TimingHistory(path)
+    for run in range(TIMING_WINDOW + 5):
+        timings = {'kept': 0.1}
+        if run == 0:
+            timings['removed'] = 0.1
+        history.record(f'c{run}', timings)
+    history.record(f'c{TIMING_WINDOW + 4}', {'kept': 0.3})
+    history.save()
+
+    reloaded = TimingHistory(path)
+    assert len(reloaded.commits) == TIMING_WINDOW
+    assert reloaded.commits[-1] == f'c{TIMING_WINDOW + 4}'
+    assert 'removed' not in reloaded.tests
+    assert reloaded.tests['kept'][-1] == 300
+    assert len(reloaded.tests['kept']) == TIMING_WINDOW
+
+
+@pytest.mark.parametrize('content', ['', '{not json', '[]'])
+def test_timing_history_ignores_unreadable_files(tmp_path, content):
+    path = tmp_path / 'test_timings.json'
+    path.write_text(content)
+    history = TimingHistory(str(path))
+    assert history.commits == [] and history.tests == {}
@@ -0,0 +1,109 @@
+import math
+import random
+from array import array
+
+import pytest
+
+import metric_anomalies
+from metric_anomalies import analyze_series, detect_anomalies, rolling_scores, std_floor
+
+
+def column(values) -> array:
+    return array('d', [math.nan if value is None else value for value in values])
+
+
+def flagged(values, name: str = 'phpstan') -> list:
+    return [(position, stats['flags']) for position, stats in analyze_series(column(values), name)
+            if stats['flags']]
+
+
+def latest(values, name: str = 'phpstan') -> dict:
+    position, stats = analyze_series(column(values), name)[-1]
+    assert position == len(values) - 1
+    return stats
+
+
+def noisy(count: int, mean: float, spread: float, seed: int = 11) -> list:
+    rng = random.Random(seed)
+    return [round(rng.gauss(mean, spread), 2) for _ in range(count)]
+
+
+def test_count_series_use_a_floor_of_one():
+    assert std_floor([3.0, 4.0, 3.0]) == (metric_anomalies.COUNT_STD_FLOOR, metric_anomalies.STD_FLOOR_RATIO)
+    assert std_floor([3.0, 4.5]) == (metric_anomalies.STD_FLOOR, metric_anomalies.STD_FLOOR_RATIO)
+
+
+def test_flat_count_history_tolerates_a_change_of_one():
+    stats = latest([12] * 30 + [13])
+    assert stats['flags'] == []
+    assert stats['z'] == 1.0
+
+
+def test_flat_count_history_flags_a_real_jump():
+    stats = latest([12] * 30 + [20])
+    assert 'spike' in stats['flags']
+    assert stats['regression'] is True
+
+
+def test_flat_percentage_history_scales_with_the_mean():
+    assert latest([80.0] * 30 + [80.4], 'coverage')['flags'] == []
+    stats = latest([80.0] * 30 + [74.0], 'coverage')
+    assert 'spike' in stats['flags']
+    # Coverage going down is the bad direction
+    assert stats['regression'] is True
+
+
+def test_flat_zero_history():
+    assert latest([0] * 30 + [1])['flags'] == []
+    assert 'spike' in latest([0] * 30 + [5])['flags']
+
+
+def test_noisy_history_is_mostly_quiet():
+    values = noisy(300, 100, 5)
+    assert len(flagged(values, 'duplication')) <= 6
+    assert latest(values, 'duplication')['flags'] == []
+
+
+def test_noisy_history_flags_an_outlier():
+    values = noisy(100, 100, 5) + [140.0]
+    stats = latest(values, 'duplication')
+    assert 'spike' in stats['flags']
+    assert stats['regression'] is True
+
+
+def test_slow_drift_is_flagged_without_spikes():
+    values = noisy(60, 50, 1) + [round(50 + 0.4 * step, 2) for step in range(1, 30)]
+    drifting = [(position, flags) for position, flags in flagged(values, 'duplication') if 'drift' in flags]
+    assert drifting
+    assert all(position >= 60 and 'spike' not in flags for position, flags in drifting)
+
+
+def test_missing_runs_are_masked():
+    values = [12] * 30 + [None, None, 40]
+    stats = latest(values)
+    assert stats['value'] == 40
+    assert 'spike' in stats['flags']
+
+
+def test_short_series_are_not_judged():
+    assert analyze_series(column([1, 100, 1, 100, 1]), 'phpstan') == []
+
+
+def test_detect_anomalies_reports_latest_and_recent():
+    entries = [{'date': f'2024-01-{day:02d}', 'commit': f'c{day}', 'phpstan': {'errors': 5}} for day in range(1, 30)]
+    entries[-1]['phpstan']['errors'] = 25
+    result = detect_anomalies(entries, {'phpstan': ('phpstan', 'errors'), 'coverage': ('coverage', 'line_coverage')})
+    assert 'spike' in result['phpstan']['latest']['flags']
+    assert result['phpstan']['recent'][-1]['commit'] == 'c29'
+    assert result['coverage'] == {'latest': None, 'recent': []}
+
+
+def test_numpy_and_pure_python_agree(monkeypatch):
+    pytest.importorskip('numpy')
+    values = noisy(200, 30, 3) + [30.0] * 40
+    floor = std_floor(values)
+    vectorized = rolling_scores(values, 20, 10, floor)
+    monkeypatch.setattr(metric_anomalies, '_numpy', lambda: None)
+    looped = rolling_scores(values, 20, 10, floor)
+    for fast, slow in zip(vectorized, looped):
+        assert fast == pytest.approx(slow, rel=1e-6, abs=1e-6, nan_ok=True)
@@ -0,0 +1,47 @@
+import pytest
+
+from metrics_server import SiteCache
+
+SITE_FILES = {
+    'index.html': b'<html></html>',
+    'api/metrics.json': b'{}',
+    'badges/phpcs.svg': b'<svg/>',
+    'data/chart.0123abcd.json': b'[]',
+    'history/all.json': b'[]',
+    'coverage/index.html': b'<html>coverage</html>',
+    '.cache/parse/phpcs-v1-abc.json': b'{"result": {}}',
+    'history/history.sqlite': b'SQLite format 3',
+    'history/history.sqlite-wal': b'',
+    'api/.secret.json': b'{}',
+    'tmp/scratch.txt': b'scratch',
+}
+
+
+@pytest.fixture
+def root(tmp_path):
+    for relative, body in SITE_FILES.items():
+        path = tmp_path / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(body)
+    return str(tmp_path)
+
+
+@pytest.mark.parametrize('url', ['/index.html', '/api/metrics.json', '/badges/phpcs.svg',
+                                 '/data/chart.0123abcd.json', '/history/all.json', '/coverage/index.html'])
+def test_serves_published_files(root, url):
+    cached = SiteCache().get(url, root)
+    assert cached is not None
+    assert cached.body == SITE_FILES[url.lstrip('/')]
+
+
+@pytest.mark.parametrize('url', ['/.cache/parse/phpcs-v1-abc.json', '/history/history.sqlite',
+                                 '/history/history.sqlite-wal', '/api/.secret.json', '/tmp/scratch.txt',
+                                 '/api/../.cache/parse/phpcs-v1-abc.json', '/../etc/passwd'])
+def test_hides_unpublished_files(root, url):
+    assert SiteCache().get(url, root) is None
+
+
+def test_rendered_pages_take_precedence(root):
+    cache = SiteCache()
+    cache.replace({'api/metrics.json': b'{"fresh": true}'})
+    assert cache.get('/api/metrics.json', root).body == b'{"fresh": true}'
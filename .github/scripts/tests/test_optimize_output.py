@@ -0,0 +1,26 @@
+import gzip
+import json
+import os
+import subprocess
+import sys
+
+from conftest import FIXTURES_DIR, SCRIPTS_DIR
+
+
+def test_pipeline_stats_are_optimized_with_the_other_data_files(tmp_path):
+    output_dir = tmp_path / 'site'
+    subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, 'process_metrics.py'),
+                    '--phpcs', os.path.join(FIXTURES_DIR, 'phpcs.json'),
+                    '--phpstan', os.path.join(FIXTURES_DIR, 'phpstan.json'),
+                    '--output-dir', str(output_dir), '--profile', '--optimize-output'],
+                   check=True, capture_output=True)
+
+    for relative in ('api/pipeline_stats.json', 'api/metrics.json'):
+        raw = (output_dir / relative).read_bytes()
+        assert b'\n' not in raw, relative
+        gz_path = output_dir / (relative + '.gz')
+        assert gz_path.exists(), relative
+        assert gzip.decompress(gz_path.read_bytes()) == raw
+
+    stats = json.loads((output_dir / 'api' / 'pipeline_stats.json').read_bytes())
+    assert 'parse_phpcs' in stats['stages']
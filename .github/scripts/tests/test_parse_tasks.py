@@ -0,0 +1,68 @@
+import concurrent.futures
+import os
+import subprocess
+import sys
+
+from conftest import FIXTURES_DIR, SCRIPTS_DIR
+from parse_cache import ParseCache, default_cache_dir
+from process_metrics import _run_parse_tasks
+
+TASKS = {
+    'phpcs': ('phpcs', os.path.join(FIXTURES_DIR, 'phpcs.json')),
+    'phpstan': ('phpstan', os.path.join(FIXTURES_DIR, 'phpstan.json')),
+}
+
+
+class CrashingPool:
+    """Stands in for ProcessPoolExecutor with every worker dying."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, *args):
+        future = concurrent.futures.Future()
+        future.set_exception(RuntimeError('worker died'))
+        return future
+
+
+def test_crashed_worker_results_are_not_cached(tmp_path, monkeypatch):
+    cache = ParseCache(str(tmp_path))
+    monkeypatch.setattr(concurrent.futures, 'ProcessPoolExecutor', CrashingPool)
+    outcomes = _run_parse_tasks(TASKS, 2, cache, False)
+    assert outcomes['phpcs'][0] == {}
+    assert 'parser failed' in outcomes['phpcs'][1]
+
+    monkeypatch.undo()
+    outcomes = _run_parse_tasks(TASKS, 1, cache, False)
+    for result, _, stage in outcomes.values():
+        assert result
+        assert not stage.get('cached')
+
+
+def test_finished_results_are_cached(tmp_path):
+    cache = ParseCache(str(tmp_path))
+    _run_parse_tasks(TASKS, 1, cache, False)
+    outcomes = _run_parse_tasks(TASKS, 1, cache, False)
+    assert all(stage.get('cached') for _, _, stage in outcomes.values())
+
+
+def test_default_cache_dir_follows_xdg(monkeypatch, tmp_path):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    assert default_cache_dir() == os.path.join(str(tmp_path), 'willow-metrics', 'parse')
+
+
+def test_cache_is_not_written_into_the_site(tmp_path):
+    output_dir = tmp_path / 'site'
+    env = {**os.environ, 'XDG_CACHE_HOME': str(tmp_path / 'xdg')}
+    subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, 'process_metrics.py'), '--cache',
+                    '--phpcs', TASKS['phpcs'][1], '--output-dir', str(output_dir)],
+                   check=True, capture_output=True, env=env)
+
+    assert not (output_dir / '.cache').exists()
+    assert os.listdir(tmp_path / 'xdg' / 'willow-metrics' / 'parse')
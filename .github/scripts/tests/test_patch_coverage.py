@@ -0,0 +1,177 @@
+import os
+import random
+from array import array
+from base64 import b64decode
+
+import pytest
+
+from conftest import FIXTURES_DIR
+from coverage_parser import parse_coverage_xml
+from patch_coverage import (LineBitmap, _has_line, compute_patch_coverage, line_ranges, pack_lines,
+                            parse_unified_diff)
+
+MULTI_HUNK = """\
+diff --git a/src/Model/Table/ArticlesTable.php b/src/Model/Table/ArticlesTable.php
+index 1111111..2222222 100644
+--- a/src/Model/Table/ArticlesTable.php
++++ b/src/Model/Table/ArticlesTable.php
+@@ -3,4 +3,5 @@ namespace App\\Model\\Table;
+ use Cake\\ORM\\Table;
++use Cake\\Validation\\Validator;
+
+ class ArticlesTable extends Table
+ {
+@@ -40,3 +41,5 @@ class ArticlesTable extends Table
+     public function initialize(array $config): void
+     {
++        $this->addBehavior('Timestamp');
++        $this->setTable('articles');
+     }
+"""
+
+RENAME = """\
+diff --git a/src/Service/OldName.php b/src/Service/NewName.php
+similarity index 90%
+rename from src/Service/OldName.php
+rename to src/Service/NewName.php
+index 3333333..4444444 100644
+--- a/src/Service/OldName.php
++++ b/src/Service/NewName.php
+@@ -1,3 +1,3 @@
+ <?php
+-class OldName
++class NewName
+ {
+diff --git a/src/Service/Moved.php b/src/Utility/Moved.php
+similarity index 100%
+rename from src/Service/Moved.php
+rename to src/Utility/Moved.php
+"""
+
+DELETED = """\
+diff --git a/src/Legacy.php b/src/Legacy.php
+deleted file mode 100644
+index 5555555..0000000
+--- a/src/Legacy.php
++++ /dev/null
+@@ -1,3 +0,0 @@
+-<?php
+-class Legacy
+-{
+diff --git a/src/Kept.php b/src/Kept.php
+new file mode 100644
+index 0000000..6666666
+--- /dev/null
++++ b/src/Kept.php
+@@ -0,0 +1,2 @@
++<?php
++class Kept {}
+"""
+
+NO_NEWLINE = """\
+diff --git a/config/app.php b/config/app.php
+index 7777777..8888888 100644
+--- a/config/app.php
++++ b/config/app.php
+@@ -1,2 +1,3 @@
+ <?php
+-return [];
+\\ No newline at end of file
++return [
++];
+\\ No newline at end of file
+"""
+
+# An added line that looks like a file header must stay part of its hunk
+PLUS_PLUS = """\
+--- a/src/Counter.php\t2024-01-01 10:00:00
++++ b/src/Counter.php\t2024-01-02 10:00:00
+@@ -10,2 +10,3 @@
+ $count = 0;
++++ $count;
+ return $count;
+"""
+
+
+def write_diff(tmp_path, text: str) -> str:
+    path = tmp_path / 'change.diff'
+    path.write_text(text)
+    return str(path)
+
+
+def changed_lines(tmp_path, text: str) -> dict:
+    return {path: list(lines) for path, lines in parse_unified_diff(write_diff(tmp_path, text)).items()}
+
+
+def test_multi_hunk_file(tmp_path):
+    assert changed_lines(tmp_path, MULTI_HUNK) == {'src/Model/Table/ArticlesTable.php': [4, 43, 44]}
+
+
+def test_renames_use_the_new_path(tmp_path):
+    # A pure rename has no hunks and so no added lines
+    assert changed_lines(tmp_path, RENAME) == {'src/Service/NewName.php': [2]}
+
+
+def test_deleted_files_are_skipped(tmp_path):
+    assert changed_lines(tmp_path, DELETED) == {'src/Kept.php': [1, 2]}
+
+
+def test_no_newline_markers_are_not_lines(tmp_path):
+    assert changed_lines(tmp_path, NO_NEWLINE) == {'config/app.php': [2, 3]}
+
+
+def test_added_line_starting_with_plus_plus(tmp_path):
+    assert changed_lines(tmp_path, PLUS_PLUS) == {'src/Counter.php': [11]}
+
+
+def test_several_files_in_one_diff(tmp_path):
+    changed = changed_lines(tmp_path, MULTI_HUNK + RENAME + DELETED + NO_NEWLINE)
+    assert set(changed) == {'src/Model/Table/ArticlesTable.php', 'src/Service/NewName.php',
+                            'src/Kept.php', 'config/app.php'}
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_bitmaps_hold_exactly_the_added_lines(seed):
+    rng = random.Random(seed)
+    lines = sorted(rng.sample(range(1, 5000), 300))
+    bitmap = pack_lines(array('I', lines), (max(lines) >> 3) + 1)
+    assert [line for line in range(0, 5100) if _has_line(bitmap, line)] == lines
+
+
+def test_line_bitmap_encode():
+    bitmap = LineBitmap()
+    for line, covered in ((1, True), (8, False), (9, True), (64, False)):
+        bitmap.add(line, covered)
+    executable, covered = (b64decode(value) for value in bitmap.encode())
+    assert len(executable) == len(covered) == 9
+    assert [line for line in range(80) if _has_line(executable, line)] == [1, 8, 9, 64]
+    assert [line for line in range(80) if _has_line(covered, line)] == [1, 9]
+
+
+def test_line_ranges():
+    assert line_ranges([]) == []
+    assert line_ranges([3]) == ['3']
+    assert line_ranges([1, 2, 3, 7, 9, 10]) == ['1-3', '7', '9-10']
+
+
+def test_patch_coverage_against_the_fixture():
+    bitmaps = parse_coverage_xml(os.path.join(FIXTURES_DIR, 'coverage.xml'))['line_bitmaps']
+    changed = {
+        # Lines 1 and 10 are covered, 20 is not and 5 is not executable
+        'src/Controller/ArticlesController.php': array('I', [1, 5, 10, 20]),
+        'src/NotCovered.php': array('I', [1]),
+    }
+
+    result = compute_patch_coverage(bitmaps, changed)
+    assert result['executable'] == 3
+    assert result['covered'] == 2
+    assert result['coverage'] == 66.67
+    assert result['files']['src/Controller/ArticlesController.php']['uncovered_lines'] == ['20']
+    assert result['files_not_in_report'] == ['src/NotCovered.php']
+
+
+def test_patch_coverage_without_executable_changes():
+    bitmap = LineBitmap()
+    bitmap.add(10, True)
+    result = compute_patch_coverage({'src/A.php': bitmap.encode()}, {'src/A.php': array('I', [1, 2, 500])})
+    assert result == {'coverage': None, 'executable': 0, 'covered': 0, 'files': {}, 'files_not_in_report': []}
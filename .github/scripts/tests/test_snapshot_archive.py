@@ -0,0 +1,152 @@
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+from snapshot_archive import KEYFRAME_INTERVAL, SnapshotArchive
+
+FIELDS = ['coverage', 'statements', 'phpstan_errors']
+START = datetime(2024, 1, 1, 12)
+
+
+def snapshot(number: int, files: dict, fields: list = FIELDS) -> dict:
+    return {
+        'commit': f'{number:08x}',
+        'timestamp': (START + timedelta(days=number)).isoformat(),
+        'totals': {'phpstan': sum(row[-1] for row in files.values())},
+        'fields': fields,
+        'files': files,
+    }
+
+
+def evolving_snapshots(count: int, seed: int = 5) -> list:
+    """Snapshots where a few files change, appear or disappear each run."""
+    rng = random.Random(seed)
+    files = {f'src/File{i}.php': [round(rng.uniform(0, 100), 2), rng.randint(0, 300), 0] for i in range(60)}
+    snapshots = []
+    for number in range(count):
+        for path in rng.sample(sorted(files), 3):
+            files[path] = [None if rng.random() < 0.2 else round(rng.uniform(0, 100), 2),
+                           rng.randint(0, 300), rng.randint(0, 5)]
+        if number % 4 == 0:
+            files[f'src/New{number}.php'] = [50.0, 10, 1]
+        if number % 6 == 0:
+            del files[rng.choice(sorted(files))]
+        snapshots.append(snapshot(number, {path: list(row) for path, row in files.items()}))
+    return snapshots
+
+
+def read_index(directory) -> dict:
+    with open(os.path.join(directory, 'index.json')) as f:
+        return json.load(f)
+
+
+def test_round_trip_through_keyframes(tmp_path):
+    directory = str(tmp_path / 'snapshots')
+    snapshots = evolving_snapshots(2 * KEYFRAME_INTERVAL + 5)
+    archive = SnapshotArchive(directory)
+    for item in snapshots:
+        archive.save(item)
+
+    reopened = SnapshotArchive(directory)
+    assert reopened.commits() == [item['commit'] for item in snapshots]
+    for item in snapshots:
+        assert reopened.load(item['commit']) == item
+
+
+def test_keyframe_layout(tmp_path):
+    directory = str(tmp_path / 'snapshots')
+    archive = SnapshotArchive(directory)
+    for item in evolving_snapshots(2 * KEYFRAME_INTERVAL + 5):
+        archive.save(item)
+
+    index = read_index(directory)
+    ordered = sorted(index.values(), key=lambda entry: entry['timestamp'])
+    keyframes = [i for i, entry in enumerate(ordered) if 'keyframe' not in entry]
+    assert keyframes == [0, KEYFRAME_INTERVAL, 2 * KEYFRAME_INTERVAL]
+    for i, entry in enumerate(ordered):
+        if 'keyframe' in entry:
+            base = ordered[keyframes[i // KEYFRAME_INTERVAL]]
+            assert entry['keyframe'] == [base['offset'], base['length']]
+
+
+def test_index_is_written_compact(tmp_path):
+    directory = str(tmp_path / 'snapshots')
+    archive = SnapshotArchive(directory)
+    for item in evolving_snapshots(3):
+        archive.save(item)
+    with open(os.path.join(directory, 'index.json')) as f:
+        raw = f.read()
+    assert '\n' not in raw and ': ' not in raw
+    assert json.loads(raw) == read_index(directory)
+
+
+def test_resaving_a_commit_replaces_it(tmp_path):
+    archive = SnapshotArchive(str(tmp_path))
+    first = snapshot(1, {'src/A.php': [10.0, 5, 0]})
+    archive.save(first)
+    archive.save({**first, 'files': {'src/A.php': [90.0, 5, 0]}})
+    assert len(archive) == 1
+    assert archive.load(first['commit'])['files'] == {'src/A.php': [90.0, 5, 0]}
+
+
+def test_changed_fields_start_a_new_keyframe(tmp_path):
+    archive = SnapshotArchive(str(tmp_path))
+    archive.save(snapshot(1, {'src/A.php': [10.0, 5, 0]}))
+    wider = snapshot(2, {'src/A.php': [10.0, 5, 0, 3]}, FIELDS + ['phpcs_violations'])
+    archive.save(wider)
+    assert 'keyframe' not in read_index(str(tmp_path))[wider['commit']]
+    assert archive.load(wider['commit']) == wider
+
+
+def test_pruning_compacts_and_keeps_needed_keyframes(tmp_path):
+    directory = str(tmp_path / 'snapshots')
+    snapshots = evolving_snapshots(3 * KEYFRAME_INTERVAL)
+    archive = SnapshotArchive(directory, max_days=KEYFRAME_INTERVAL + 10)
+    for item in snapshots:
+        archive.save(item)
+
+    kept = [item for item in snapshots if item['commit'] in set(archive.commits())]
+    assert len(kept) < len(snapshots)
+
+    index = read_index(directory)
+    records = {(entry['offset'], entry['length']) for entry in index.values()}
+    keyframes = {tuple(entry['keyframe']) for entry in index.values() if 'keyframe' in entry}
+    # Keyframes of expired commits stay while newer records depend on them
+    assert keyframes - records
+    # Compaction keeps the archive within twice the live records
+    live = sum(length for _, length in records | keyframes)
+    assert os.path.getsize(os.path.join(directory, 'archive.bin')) <= 2 * live
+
+    reopened = SnapshotArchive(directory, max_days=KEYFRAME_INTERVAL + 10)
+    for item in kept:
+        assert reopened.load(item['commit']) == item
+    assert reopened.load(snapshots[0]['commit']) is None
+
+
+def test_migrates_legacy_json_snapshots(tmp_path):
+    directory = tmp_path / 'snapshots'
+    directory.mkdir()
+    snapshots = evolving_snapshots(5)
+    legacy_index = {}
+    for item in snapshots:
+        (directory / f"{item['commit']}.json").write_text(json.dumps(item))
+        legacy_index[item['commit']] = item['timestamp']
+    (directory / 'index.json').write_text(json.dumps(legacy_index, indent=2))
+
+    archive = SnapshotArchive(str(directory))
+    assert archive.commits() == [item['commit'] for item in snapshots]
+    assert not any(name.endswith('.json') and name != 'index.json' for name in os.listdir(directory))
+    for item in snapshots:
+        assert archive.load(item['commit']) == item
+    assert all(isinstance(entry, dict) for entry in read_index(directory).values())
+
+
+def test_previous_skips_the_excluded_commit(tmp_path):
+    archive = SnapshotArchive(str(tmp_path))
+    snapshots = evolving_snapshots(4)
+    for item in snapshots:
+        archive.save(item)
+    found = archive.previous(snapshots[3]['timestamp'], exclude=snapshots[2]['commit'])
+    assert found['commit'] == snapshots[1]['commit']
+    assert archive.load('ffffffff') is None
@@ -0,0 +1,94 @@
+import json
+import os
+
+import pytest
+
+import summary_scan
+from conftest import FIXTURES_DIR
+from parser_registry import PARSERS
+from process_metrics import parse_summaries
+
+FIXTURES = {
+    'coverage': 'coverage.xml',
+    'junit': 'junit.xml',
+    'phpstan': 'phpstan.json',
+    'security': 'security-phpcs.json',
+    'phpcs': 'phpcs.json',
+    'jscpd': 'jscpd.json',
+}
+
+
+def fixture(tool: str) -> str:
+    return os.path.join(FIXTURES_DIR, FIXTURES[tool])
+
+
+def test_every_scanner_has_a_fixture():
+    assert {tool for tool, spec in PARSERS.items() if spec.summary} == set(FIXTURES)
+
+
+@pytest.mark.parametrize('tool', sorted(FIXTURES))
+def test_scan_matches_full_parse(tool):
+    spec = PARSERS[tool]
+    scanned = spec.scan_totals(fixture(tool))
+    assert scanned is not None
+    assert scanned['rating'] is not None
+    assert scanned['badge_url']
+
+    full = spec(fixture(tool))
+    for key, value in scanned.items():
+        assert full.get(key) == value, key
+
+
+def write_json(path, document: dict) -> str:
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2)
+    return str(path)
+
+
+@pytest.mark.parametrize('tool', ['phpstan', 'phpcs', 'security'])
+def test_totals_in_the_middle_fall_back(tool, tmp_path):
+    with open(fixture(tool)) as f:
+        report = json.load(f)
+    # "totals" is neither the first nor the last key
+    reordered = {'files': report['files'], 'totals': report['totals'], 'errors': []}
+    path = write_json(tmp_path / 'report.json', reordered)
+
+    assert PARSERS[tool].scan_totals(path) is None
+    metrics = parse_summaries({tool: path})
+    assert metrics[tool] == PARSERS[tool](path)
+
+
+def test_jscpd_statistics_larger_than_the_window_fall_back(tmp_path):
+    with open(fixture('jscpd')) as f:
+        report = json.load(f)
+    # Per-source statistics of another format push "total" past the scanned head
+    report['statistics']['formats']['typescript'] = {'sources': {
+        f"src/Generated/File{index}.ts": {'lines': 10, 'clones': 0, 'duplicatedLines': 0}
+        for index in range(summary_scan.SCAN_BYTES // 50)
+    }}
+    # statistics first (and not last), larger than the scanned head
+    path = write_json(tmp_path / 'jscpd.json', {'statistics': report['statistics'], 'duplicates': report['duplicates']})
+    assert os.path.getsize(path) > 2 * summary_scan.SCAN_BYTES
+
+    assert summary_scan.scan_jscpd_totals(path) is None
+    metrics = parse_summaries({'jscpd': path})
+    assert metrics['jscpd']['percentage'] == PARSERS['jscpd'](path)['percentage']
+
+
+def test_clover_without_project_totals_falls_back(tmp_path):
+    with open(fixture('coverage')) as f:
+        report = f.read()
+    # Drop the project-level <metrics/> so only per-file ones remain
+    start = report.index('<metrics', report.index('<project'))
+    end = report.index('/>', start) + 2
+    path = tmp_path / 'coverage.xml'
+    path.write_text(report[:start] + report[end:])
+
+    assert summary_scan.scan_coverage_totals(str(path)) is None
+
+
+def test_missing_and_empty_files_fall_back(tmp_path):
+    empty = tmp_path / 'empty.json'
+    empty.write_text('')
+    assert summary_scan.scan_phpstan_totals(str(empty)) is None
+    assert summary_scan.scan_phpstan_totals(str(tmp_path / 'missing.json')) is None
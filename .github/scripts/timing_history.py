@@ -0,0 +1,97 @@
+"""
+Per-test duration history and slow-test regression detection.
+
+history/test_timings.json keeps the last TIMING_WINDOW runs as columns:
+``commits`` lists the runs oldest first, and each test maps to its
+durations in integer milliseconds, right-aligned with ``commits`` (a test
+first seen three runs ago has three values; ``null`` marks a run it did
+not appear in). Tests absent for the whole window are dropped, so the file
+stays proportional to the current suite.
+
+A test is flagged when it takes REGRESSION_RATIO times its rolling median
+and at least REGRESSION_MIN_MS longer, so sub-millisecond jitter on fast
+tests is ignored.
+"""
+
+import json
+import os
+from statistics import median
+
+# Runs kept per test
+TIMING_WINDOW = 20
+
+# Previous durations needed before a test can be flagged
+MIN_SAMPLES = 5
+
+REGRESSION_RATIO = 1.5
+REGRESSION_MIN_MS = 50
+
+# Regressions reported per run
+MAX_REGRESSIONS = 20
+
+
+class TimingHistory:
+    """Rolling window of per-test durations stored in one JSON file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.commits = []
+        self.tests = {}
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+            self.commits = data.get('commits', [])
+            self.tests = data.get('tests', {})
+        except (OSError, json.JSONDecodeError, AttributeError):
+            pass
+
+    def _drop_last_run(self) -> None:
+        self.commits.pop()
+        self.tests = {test: series[:-1] for test, series in self.tests.items() if len(series) > 1}
+
+    def regressions(self, timings: dict) -> list:
+        """Tests in ``timings`` ({test: seconds}) that are slower than their rolling median."""
+        flagged = []
+        for test, seconds in timings.items():
+            samples = [value for value in self.tests.get(test, ()) if value is not None]
+            if len(samples) < MIN_SAMPLES:
+                continue
+            baseline = median(samples)
+            duration = seconds * 1000
+            if duration >= baseline * REGRESSION_RATIO and duration - baseline >= REGRESSION_MIN_MS:
+                flagged.append({
+                    'test': test,
+                    'seconds': round(seconds, 4),
+                    'median_seconds': round(baseline / 1000, 4),
+                    'ratio': round(duration / baseline, 2) if baseline else None,
+                })
+        flagged.sort(key=lambda item: item['seconds'] - item['median_seconds'], reverse=True)
+        return flagged[:MAX_REGRESSIONS]
+
+    def record(self, commit: str, timings: dict) -> list:
+        """Flag regressions in ``timings`` against the window, then append them as a new run.
+
+        Recording the same commit again (e.g. a re-run) replaces its column.
+        """
+        if self.commits and self.commits[-1] == commit:
+            self._drop_last_run()
+        flagged = self.regressions(timings)
+
+        tests = {}
+        for test, series in self.tests.items():
+            seconds = timings.get(test)
+            series = (series + [round(seconds * 1000) if seconds is not None else None])[-TIMING_WINDOW:]
+            if any(value is not None for value in series):
+                tests[test] = series
+        for test, seconds in timings.items():
+            if test not in tests:
+                tests[test] = [round(seconds * 1000)]
+
+        self.commits = (self.commits + [commit])[-TIMING_WINDOW:]
+        self.tests = tests
+        return flagged
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'w') as f:
+            json.dump({'commits': self.commits, 'tests': self.tests}, f, separators=(',', ':'))